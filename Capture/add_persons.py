@@ -5,24 +5,30 @@ import shutil
 import cv2
 import numpy as np
 import torch
-from torchvision import transforms
+import yaml
 
-from face_detection.scrfd.detector import SCRFD
+from face_detection.scrfd.detector import scrfd_from_config
 # from face_detection.yolov5_face.detector import Yolov5Face
-from face_recognition.arcface.model import iresnet_inference
-from face_recognition.arcface.utils import read_features
+from face_recognition.arcface.model import iresnet_from_config
+from face_recognition.arcface.preprocess import FacePreprocessor
+from face_recognition.arcface.gallery_store import GalleryStore
 
 # Check if CUDA is available and set the device accordingly
 device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
+# Detector and recognizer settings live in the tracking config
+with open("./face_tracking/config/config_tracking.yaml", "r") as stream:
+    config = yaml.safe_load(stream)
+
 # Initialize the face detector (Choose one of the detectors)
 # detector = Yolov5Face(model_file="face_detection/yolov5_face/weights/yolov5n-face.pt")
-detector = SCRFD(model_file="face_detection/scrfd/weights/scrfd_2.5g_bnkps.onnx")
+detector = scrfd_from_config(config)
+
+# Initialize the face recognizer selected in the tracking config
+recognizer = iresnet_from_config(config, device=device)
 
-# Initialize the face recognizer
-recognizer = iresnet_inference(
-    model_name="r100", path="face_recognition/arcface/weights/arcface_r100.pth", device=device
-)
+# Reusable preprocessing buffers shared by every recognizer backend
+face_preprocessor = FacePreprocessor()
 
 
 @torch.no_grad()
@@ -36,20 +42,8 @@ def get_feature(face_image):
     Returns:
         numpy.ndarray: Extracted facial features.
     """
-    # Define a series of image preprocessing steps
-    face_preprocess = transforms.Compose(
-        [
-            transforms.ToTensor(),
-            transforms.Resize((112, 112)),
-            transforms.Normalize(mean=[0.5, 0.5, 0.5], std=[0.5, 0.5, 0.5]),
-        ]
-    )
-
-    # Convert the image to RGB format
-    face_image = cv2.cvtColor(face_image, cv2.COLOR_BGR2RGB)
-
-    # Apply the defined preprocessing to the image
-    face_image = face_preprocess(face_image).unsqueeze(0).to(device)
+    # Convert to a normalized RGB NCHW batch of one
+    face_image = torch.from_numpy(face_preprocessor([face_image])).to(device)
 
     # Use the model to obtain facial features
     emb_img_face = recognizer(face_image)[0].cpu().numpy()
@@ -59,7 +53,7 @@ def get_feature(face_image):
     return images_emb
 
 
-def add_persons(backup_dir, add_persons_dir, faces_save_dir, features_path):
+def add_persons(backup_dir, add_persons_dir, faces_save_dir, features_path, gallery_dir):
     """
     Add a new person to the face recognition database.
 
@@ -67,7 +61,8 @@ def add_persons(backup_dir, add_persons_dir, faces_save_dir, features_path):
         backup_dir (str): Directory to save backup data.
         add_persons_dir (str): Directory containing images of the new person.
         faces_save_dir (str): Directory to save the extracted faces.
-        features_path (str): Path to save face features.
+        features_path (str): Legacy features file, migrated on first use.
+        gallery_dir (str): Directory of the gallery store to append to.
     """
     # Initialize lists to store names and features of added images
     images_name = []
@@ -118,21 +113,10 @@ def add_persons(backup_dir, add_persons_dir, faces_save_dir, features_path):
     images_emb = np.array(images_emb)
     images_name = np.array(images_name)
 
-    # Read existing features if available
-    features = read_features(features_path)
-
-    if features is not None:
-        # Unpack existing features
-        old_images_name, old_images_emb = features
-
-        # Combine new features with existing features
-        images_name = np.hstack((old_images_name, images_name))
-        images_emb = np.vstack((old_images_emb, images_emb))
-
-        print("Update features!")
-
-    # Save the combined features
-    np.savez_compressed(features_path, images_name=images_name, images_emb=images_emb)
+    # Append only the new features, the existing gallery is never rewritten
+    store = GalleryStore.open_or_migrate(gallery_dir, features_path=features_path)
+    store.append(images_name, images_emb)
+    print(f"Update features! Gallery version {store.version}, {len(store)} embeddings")
 
     # Move the data of the new person to the backup data directory
     for sub_dir in os.listdir(add_persons_dir):
@@ -167,7 +151,13 @@ if __name__ == "__main__":
         "--features-path",
         type=str,
         default="./datasets/face_features/feature",
-        help="Path to save face features.",
+        help="Legacy features file, migrated to the gallery store on first use.",
+    )
+    parser.add_argument(
+        "--gallery-dir",
+        type=str,
+        default="./datasets/face_features/gallery",
+        help="Directory of the gallery store.",
     )
     opt = parser.parse_args()
 
@@ -4,18 +4,23 @@ import os
 import cv2
 import numpy as np
 import torch
-from torchvision import transforms
 from pymongo import MongoClient
 from werkzeug.utils import secure_filename
 import argparse
 import shutil
-from face_detection.scrfd.detector import SCRFD
-from face_recognition.arcface.model import iresnet_inference
-from face_recognition.arcface.utils import read_features, compare_encodings
+from face_detection.scrfd.detector import scrfd_from_config
+from face_recognition.arcface.model import iresnet_from_config
+from face_recognition.arcface.preprocess import FacePreprocessor
+from face_recognition.arcface.gallery_store import GalleryStore, LiveGallery
 import threading
 import time
 import yaml
-from face_alignment.alignment import norm_crop
+from face_alignment.alignment import norm_crop_batch
+from face_tracking.identity_cache import IdentityCache, retain_keys
+from face_tracking.keyframe import KeyframeScheduler, track_rois
+from face_tracking.metrics import PipelineMetrics
+from face_tracking.motion import MotionGate
+from face_tracking.resolution import ResolutionController
 from face_tracking.tracker.byte_tracker import BYTETracker
 from face_tracking.tracker.visualize import plot_tracking
 import requests
@@ -332,25 +337,63 @@ stop_threads = False
 
 #add_persons.py
 
+def load_config(file_name):
+    """
+    Load a YAML configuration file.
+
+    Args:
+        file_name (str): The path to the YAML configuration file.
+
+    Returns:
+        dict: The loaded configuration as a dictionary.
+    """
+    with open(file_name, "r") as stream:
+        try:
+            return yaml.safe_load(stream)
+        except yaml.YAMLError as exc:
+            print(exc)
+
+
 # Check if CUDA is available and set the device accordingly
 device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
+# Detector, recognizer and gallery settings live in the tracking config
+capture_config = load_config("./face_tracking/config/config_tracking.yaml")
+
 # Initialize the face detector (Choose one of the detectors)
 # detector = Yolov5Face(model_file="face_detection/yolov5_face/weights/yolov5n-face.pt")
-detector = SCRFD(model_file="face_detection/scrfd/weights/scrfd_2.5g_bnkps.onnx")
+detector = scrfd_from_config(capture_config)
 
 # Initialize the face recognizer
-recognizer = iresnet_inference(
-    model_name="r100", path="face_recognition/arcface/weights/arcface_r100.pth", device=device
+recognizer = iresnet_from_config(capture_config, device=device)
+
+# Reusable preprocessing buffers shared by every recognizer backend
+face_preprocessor = FacePreprocessor()
+
+# Append-only store of enrolled embeddings, migrated from feature.npz on first start
+gallery_store = GalleryStore.open_or_migrate(
+    "./datasets/face_features/gallery", features_path="./datasets/face_features/feature"
 )
 
-images_names, images_embs = read_features(feature_path="./datasets/face_features/feature")
+# Enrolled embeddings, sharded by patient; /add publishes new versions while running
+live_gallery = LiveGallery(
+    gallery_store,
+    index=capture_config.get("gallery_index", "exact"),
+    index_params=capture_config.get("gallery_index_params"),
+)
 
 # Mapping of face IDs to names
 id_face_mapping = {}
 
+# Recognition results per track, so known tracks skip the recognizer
+identity_cache = IdentityCache()
+
+# Stage latencies, counters and controller decisions served by /metrics
+pipeline_metrics = PipelineMetrics()
+
 # Data mapping for tracking information
 data_mapping = {
+    "frame_id": 0,
     "raw_image": [],
     "tracking_ids": [],
     "detection_bboxes": [],
@@ -358,6 +401,9 @@ data_mapping = {
     "tracking_bboxes": [],
 }
 
+# Set by the tracking thread whenever it publishes a new keyframe in data_mapping
+frame_ready = threading.Event()
+
 
 
 @torch.no_grad()
@@ -371,20 +417,8 @@ def get_feature(face_image):
     Returns:
         numpy.ndarray: Extracted facial features.
     """
-    # Define a series of image preprocessing steps
-    face_preprocess = transforms.Compose(
-        [
-            transforms.ToTensor(),
-            transforms.Resize((112, 112)),
-            transforms.Normalize(mean=[0.5, 0.5, 0.5], std=[0.5, 0.5, 0.5]),
-        ]
-    )
-
-    # Convert the image to RGB format
-    face_image = cv2.cvtColor(face_image, cv2.COLOR_BGR2RGB)
-
-    # Apply the defined preprocessing to the image
-    face_image = face_preprocess(face_image).unsqueeze(0).to(device)
+    # Convert to a normalized RGB NCHW batch of one
+    face_image = torch.from_numpy(face_preprocessor([face_image])).to(device)
 
     # Use the model to obtain facial features
     emb_img_face = recognizer(face_image)[0].cpu().numpy()
@@ -393,7 +427,7 @@ def get_feature(face_image):
     images_emb = emb_img_face / np.linalg.norm(emb_img_face)
     return images_emb
 
-def add_persons(backup_dir, add_persons_dir, faces_save_dir, features_path):
+def add_persons(backup_dir, add_persons_dir, faces_save_dir, gallery, user_id=None):
     """
     Add a new person to the face recognition database.
 
@@ -401,7 +435,8 @@ def add_persons(backup_dir, add_persons_dir, faces_save_dir, features_path):
         backup_dir (str): Directory to save backup data.
         add_persons_dir (str): Directory containing images of the new person.
         faces_save_dir (str): Directory to save the extracted faces.
-        features_path (str): Path to save face features.
+        gallery (LiveGallery): The served gallery to enroll the new persons in.
+        user_id (str): Patient the new persons are contacts of.
     """
     # Initialize lists to store names and features of added images
     images_name = []
@@ -456,21 +491,10 @@ def add_persons(backup_dir, add_persons_dir, faces_save_dir, features_path):
     if len(images_emb.shape) == 3:
         images_emb = images_emb.squeeze(axis=1)
 
-    # Read existing features if available
-    features = read_features(features_path)
-
-    if features is not None:
-        # Unpack existing features
-        old_images_name, old_images_emb = features
-
-        # Combine new features with existing features
-        images_name = np.hstack((old_images_name, images_name))
-        images_emb = np.vstack((old_images_emb, images_emb))
-
-        print("Update features!")
-
-    # Save the combined features
-    np.savez_compressed(features_path, images_name=images_name, images_emb=images_emb)
+    # Append only the new features, the existing gallery is never rewritten
+    # and running recognizers switch to the new version on their next batch
+    snapshot = gallery.append(images_name, images_emb, user_id or None)
+    print(f"Update features! Gallery version {snapshot.version}, size {len(snapshot.gallery)}")
 
     # Move the data of the new person to the backup data directory
     for sub_dir in os.listdir(add_persons_dir):
@@ -497,6 +521,11 @@ def add():
     if not username:
         return jsonify({"error": "Username is required"}), 400
 
+    # Optional patient the person is a contact of, shard keys are strings
+    user_id = data.get("user_id")
+    if user_id is not None:
+        user_id = str(user_id)
+
     # Get the photo URL from the JSON data
     photo_url = data.get("photo_url")
     if not photo_url:
@@ -524,38 +553,23 @@ def add():
     backup_dir = request.args.get("backup-dir", "./datasets/backup")
     add_persons_dir = request.args.get("add-persons-dir", "./datasets/new_persons")
     faces_save_dir = request.args.get("faces-save-dir", "./datasets/data/")
-    features_path = request.args.get("features-path", "./datasets/face_features/feature")
 
     # Run the main function
     add_persons(
         backup_dir=backup_dir,
         add_persons_dir=add_persons_dir,
         faces_save_dir=faces_save_dir,
-        features_path=features_path,
+        gallery=live_gallery,
+        user_id=user_id,
     )
 
     # Return a valid response
     return jsonify({"message": f"Image saved successfully for user '{username}' and database updated."}), 200
 
 
-def load_config(file_name):
-    """
-    Load a YAML configuration file.
-
-    Args:
-        file_name (str): The path to the YAML configuration file.
-
-    Returns:
-        dict: The loaded configuration as a dictionary.
-    """
-    with open(file_name, "r") as stream:
-        try:
-            return yaml.safe_load(stream)
-        except yaml.YAMLError as exc:
-            print(exc)
-
-
-def process_tracking(frame, detector, tracker, args, frame_id, fps):
+def process_tracking(
+    frame, detector, tracker, args, frame_id, fps, scheduler=None, resolution=None
+):
     """
     Process tracking for a frame.
 
@@ -566,51 +580,101 @@ def process_tracking(frame, detector, tracker, args, frame_id, fps):
         args (dict): Tracking configuration parameters.
         frame_id (int): The frame ID.
         fps (float): Frames per second.
+        scheduler (KeyframeScheduler): Decides which frames run the detector,
+            None to detect on every frame.
+        resolution (ResolutionController): Picks the detector input size of
+            full-frame scans, None for a fixed 128x128 input.
 
     Returns:
         numpy.ndarray: The processed tracking image.
     """
-    # Face detection and tracking
-    outputs, img_info, bboxes, landmarks = detector.detect_tracking(image=frame)
-
-    tracking_tlwhs = []
-    tracking_ids = []
-    tracking_scores = []
-    tracking_bboxes = []
+    start = time.perf_counter()
+    keyframe = scheduler is None or scheduler.is_keyframe(
+        frame_id, tracker.position_uncertainty()
+    )
 
-    if outputs is not None:
+    full_scan = True
+    if keyframe:
+        rois = track_rois(tracker.predicted_tlbrs(), frame.shape, args.get("roi_padding", 0.5))
+        full_scan = scheduler is None or scheduler.needs_full_scan(frame_id, len(rois))
+
+        # Face detection and tracking
+        if full_scan:
+            if resolution is None:
+                input_size = (128, 128)
+            else:
+                input_size = resolution.select(frame.shape, len(rois))
+            outputs, img_info, bboxes, landmarks = detector.detect_tracking(
+                image=frame, input_size=input_size
+            )
+            # The tracker takes the detector input as (height, width)
+            img_size = (input_size[1], input_size[0])
+        else:
+            # Known faces are detected in crops at a higher effective resolution
+            outputs, img_info, bboxes, landmarks = detector.detect_tracking_rois(
+                frame, rois, input_size=(args.get("roi_input_size", 128),) * 2
+            )
+            # ROI detections are already in frame pixels
+            img_size = (img_info["height"], img_info["width"])
         online_targets = tracker.update(
-            outputs, [img_info["height"], img_info["width"]], (128, 128)
+            outputs, [img_info["height"], img_info["width"]], img_size
         )
+    else:
+        # Between keyframes the tracks only move with the Kalman prediction
+        online_targets = tracker.propagate()
 
-        for i in range(len(online_targets)):
-            t = online_targets[i]
-            tlwh = t.tlwh
-            tid = t.track_id
-            vertical = tlwh[2] / tlwh[3] > args["aspect_ratio_thresh"]
-            if tlwh[2] * tlwh[3] > args["min_box_area"] and not vertical:
-                x1, y1, w, h = tlwh
-                tracking_bboxes.append([x1, y1, x1 + w, y1 + h])
-                tracking_tlwhs.append(tlwh)
-                tracking_ids.append(tid)
-                tracking_scores.append(t.score)
-
-        tracking_image = plot_tracking(
-            img_info["raw_img"],
-            tracking_tlwhs,
-            tracking_ids,
-            names=id_face_mapping,
-            frame_id=frame_id + 1,
-            fps=fps,
-        )
+    elapsed_ms = 1000.0 * (time.perf_counter() - start)
+    if not keyframe:
+        stage = "propagate"
     else:
-        tracking_image = img_info["raw_img"]
+        stage = "detect_track" if full_scan else "roi_detect_track"
+    pipeline_metrics.record(stage, elapsed_ms)
+    if keyframe and full_scan and resolution is not None:
+        resolution.record(input_size, elapsed_ms, bboxes[:, 3] - bboxes[:, 1])
+    if scheduler is not None:
+        scheduler.record(frame_id, keyframe, elapsed_ms, full_scan)
+
+    tracking_tlwhs = []
+    tracking_ids = []
+    tracking_scores = []
+    tracking_bboxes = []
 
-    data_mapping["raw_image"] = img_info["raw_img"]
-    data_mapping["detection_bboxes"] = bboxes
-    data_mapping["detection_landmarks"] = landmarks
-    data_mapping["tracking_ids"] = tracking_ids
-    data_mapping["tracking_bboxes"] = tracking_bboxes
+    for i in range(len(online_targets)):
+        t = online_targets[i]
+        tlwh = t.tlwh
+        tid = t.track_id
+        vertical = tlwh[2] / tlwh[3] > args["aspect_ratio_thresh"]
+        if tlwh[2] * tlwh[3] > args["min_box_area"] and not vertical:
+            x1, y1, w, h = tlwh
+            tracking_bboxes.append([x1, y1, x1 + w, y1 + h])
+            tracking_tlwhs.append(tlwh)
+            tracking_ids.append(tid)
+            tracking_scores.append(t.score)
+
+    tracking_image = plot_tracking(
+        frame,
+        tracking_tlwhs,
+        tracking_ids,
+        names=id_face_mapping,
+        frame_id=frame_id + 1,
+        fps=fps,
+    )
+    pipeline_metrics.set("tracks", len(tracking_ids))
+
+    # Recognition needs fresh landmarks, it keeps working on the last keyframe
+    if keyframe:
+        # Forget identities and names of tracks the tracker has dropped
+        alive = [t.track_id for t in tracker.tracked_stracks + tracker.lost_stracks]
+        identity_cache.retain(alive)
+        retain_keys(id_face_mapping, alive)
+
+        data_mapping["frame_id"] = frame_id
+        data_mapping["raw_image"] = img_info["raw_img"]
+        data_mapping["detection_bboxes"] = bboxes
+        data_mapping["detection_landmarks"] = landmarks
+        data_mapping["tracking_ids"] = tracking_ids
+        data_mapping["tracking_bboxes"] = tracking_bboxes
+        frame_ready.set()
 
     return tracking_image
 
@@ -626,19 +690,8 @@ def get_feature(face_image):
     Returns:
         numpy.ndarray: The extracted features.
     """
-    face_preprocess = transforms.Compose(
-        [
-            transforms.ToTensor(),
-            transforms.Resize((112, 112)),
-            transforms.Normalize(mean=[0.5, 0.5, 0.5], std=[0.5, 0.5, 0.5]),
-        ]
-    )
-
-    # Convert to RGB
-    face_image = cv2.cvtColor(face_image, cv2.COLOR_BGR2RGB)
-
-    # Preprocess image (BGR)
-    face_image = face_preprocess(face_image).unsqueeze(0).to(device)
+    # Convert to a normalized RGB NCHW batch of one
+    face_image = torch.from_numpy(face_preprocessor([face_image])).to(device)
 
     # Inference to get feature
     emb_img_face = recognizer(face_image).cpu().numpy()
@@ -649,24 +702,56 @@ def get_feature(face_image):
     return images_emb
 
 
-def recognition(face_image):
+@torch.no_grad()
+def get_features(face_images):
     """
-    Recognize a face image.
+    Extract features from a batch of face images in a single forward pass.
 
     Args:
-        face_image: The input face image.
+        face_images (list): The input face images.
 
     Returns:
-        tuple: A tuple containing the recognition score and name.
+        numpy.ndarray: The extracted features, one normalized row per face.
     """
-    # Get feature from face
-    query_emb = get_feature(face_image)
+    # Convert all faces into one normalized RGB NCHW batch
+    batch = torch.from_numpy(face_preprocessor(face_images)).to(device)
 
-    score, id_min = compare_encodings(query_emb, images_embs)
-    name = images_names[id_min]
-    score = score[0]
+    # Inference to get all features at once
+    emb_img_faces = recognizer(batch).cpu().numpy()
 
-    return score, name
+    # Normalize each row
+    images_emb = emb_img_faces / np.linalg.norm(emb_img_faces, axis=1, keepdims=True)
+
+    return images_emb
+
+
+def recognition_batch(face_images, user_id=None):
+    """
+    Recognize a batch of face images.
+
+    Args:
+        face_images (list): The input face images.
+        user_id (str): Patient whose contacts are searched, None for the default shard.
+
+    Returns:
+        list: A list of (score, name, embedding) tuples, one per face image.
+    """
+    if len(face_images) == 0:
+        return []
+
+    # Get features from all faces
+    query_embs = get_features(face_images)
+
+    # Search only this patient's contacts in the newest published gallery
+    gallery = live_gallery.snapshot.gallery
+    names, scores = gallery.search(query_embs, k=1, user_id=user_id)
+    if names.shape[1] == 0:
+        return [(0.0, None, query_emb) for query_emb in query_embs]
+
+    return [
+        (score, name, query_emb)
+        for score, name, query_emb in zip(scores[:, 0], names[:, 0], query_embs)
+    ]
 
 
 def mapping_bbox(box1, box2):
@@ -722,22 +807,70 @@ def tracking(detector, args):
     tracker = BYTETracker(args=args, frame_rate=30)
     frame_id = 0
 
+    # Run the detector on keyframes only, fitting the per-frame budget
+    scheduler = KeyframeScheduler(
+        frame_budget_ms=args.get("keyframe_budget_ms", 20.0),
+        max_interval=args.get("keyframe_max_interval", 1),
+        max_uncertainty=args.get("keyframe_max_uncertainty", 0.25),
+        full_scan_interval=args.get("roi_full_scan_interval", 1),
+        metrics=pipeline_metrics,
+    )
+
+    # Scan at a higher resolution when faces are small and there is time left
+    resolution = ResolutionController(
+        ladder=args.get("resolution_ladder", [128]),
+        budget_ms=args.get("resolution_budget_ms", 30.0),
+        min_face_px=args.get("resolution_min_face_px", 24),
+        track_cost_ms=args.get("resolution_track_cost_ms", 1.0),
+        metrics=pipeline_metrics,
+    )
+
+    # Skip static frames and slow down while nobody is around
+    gate = None
+    if args.get("motion_gate", False):
+        gate = MotionGate(
+            size=args.get("motion_size", 64),
+            pixel_thresh=args.get("motion_pixel_thresh", 15),
+            on_thresh=args.get("motion_on_thresh", 0.01),
+            off_thresh=args.get("motion_off_thresh", 0.005),
+            hold=args.get("motion_hold", 5),
+            idle_after_s=args.get("idle_after_s", 10.0),
+            idle_fps=args.get("idle_fps", 2.0),
+            metrics=pipeline_metrics,
+        )
+
     cap = cv2.VideoCapture(0)
 
     while not stop_threads:  # Check the stop_threads flag
+        if gate is not None:
+            gate.throttle()
         _, img = cap.read()
 
-        tracking_image = process_tracking(img, detector, tracker, args, frame_id, fps)
+        # On static frames the last detections and tracks still hold
+        if gate is None or gate.update(img):
+            tracking_image = process_tracking(
+                img,
+                detector,
+                tracker,
+                args,
+                frame_id,
+                fps,
+                scheduler=scheduler,
+                resolution=resolution,
+            )
+            frame_id += 1
+            cv2.imshow("Face Recognition", tracking_image)
+        if gate is not None:
+            gate.observe_faces(len(tracker.tracked_stracks))
 
         # Calculate and display the frame rate
         frame_count += 1
         if frame_count >= 30:
             fps = 1e9 * frame_count / (time.time_ns() - start_time)
+            pipeline_metrics.set("fps", round(fps, 2))
             frame_count = 0
             start_time = time.time_ns()
 
-        cv2.imshow("Face Recognition", tracking_image)
-
         # Check for user exit input
         ch = cv2.waitKey(1)
         if ch == 27 or ch == ord("q") or ch == ord("Q"):
@@ -749,6 +882,27 @@ def tracking(detector, args):
     print("Tracking stopped.")
 
 
+@app.route('/gallery', methods=['GET'])
+def gallery_status():
+    """
+    Flask route reporting the gallery version served to the recognizers.
+    """
+    snapshot = live_gallery.snapshot
+    return jsonify({
+        "version": snapshot.version,
+        "size": len(snapshot.gallery),
+        "shards": {user_id: len(shard) for user_id, shard in snapshot.gallery.shards.items()},
+    }), 200
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """
+    Flask route reporting the capture pipeline latencies, counters and settings.
+    """
+    return jsonify(pipeline_metrics.snapshot()), 200
+
+
 @app.route('/stop', methods=['POST'])
 def stop_recognition():
     """
@@ -765,46 +919,76 @@ def stop_recognition():
     return jsonify({"message": "Face recognition and speech-to-text threads stopped successfully."}), 200
 
 
-def recognition_thread():
+def recognition_thread(args, user_id=None):
     """
     Face recognition in a separate thread.
+
+    Args:
+        args (dict): Tracking configuration parameters.
+        user_id (str): Patient whose contacts are recognized, None for the default shard.
     """
     global stop_threads
     current_person = None  # Track the currently recognized person
+    recognition_thresh = args["recognition_thresh"]
 
     while not stop_threads:
+        # Sleep until the tracker publishes a new keyframe instead of spinning
+        if not frame_ready.wait(timeout=0.5):
+            continue
+        frame_ready.clear()
+
+        frame_id = data_mapping["frame_id"]
         raw_image = data_mapping["raw_image"]
         detection_landmarks = data_mapping["detection_landmarks"]
         detection_bboxes = data_mapping["detection_bboxes"]
         tracking_ids = data_mapping["tracking_ids"]
         tracking_bboxes = data_mapping["tracking_bboxes"]
 
+        # Pair each track with its detection
+        matched_ids = []
+        matched_landmarks = []
         for i in range(len(tracking_bboxes)):
+            # Confidently named tracks keep their cached identity
+            if not identity_cache.needs_recognition(tracking_ids[i], frame_id):
+                continue
+
             for j in range(len(detection_bboxes)):
                 mapping_score = mapping_bbox(box1=tracking_bboxes[i], box2=detection_bboxes[j])
                 if mapping_score > 0.9:
-                    face_alignment = norm_crop(img=raw_image, landmark=detection_landmarks[j])
+                    matched_landmarks.append(detection_landmarks[j])
+                    matched_ids.append(tracking_ids[i])
+
+                    detection_bboxes = np.delete(detection_bboxes, j, axis=0)
+                    detection_landmarks = np.delete(detection_landmarks, j, axis=0)
 
-                    score, name = recognition(face_image=face_alignment)
-                    if name is not None:
-                        if score < 0.25:
-                            caption = "UN_KNOWN"
-                        else:
-                            caption = f"{name}:{score:.2f}"
+                    break
+
+        # Nothing to align when every track is cached or none matched
+        if matched_landmarks:
+            # Align every matched face with one vectorized transform estimate
+            face_alignments = norm_crop_batch(
+                img=raw_image, landmarks=np.asarray(matched_landmarks)
+            )
 
-                        # Update the recognized person's name
-                        if name != current_person and score >= 0.25:
-                            current_person = name
-                            deepgram_recognizer.set_recognized_person(current_person)
-                            deepgram_recognizer.start()  # Start speech recognition
-                            print(f"Started speech recognition for {current_person}")
+            # Identify all matched tracks together in one forward pass
+            results = recognition_batch(face_images=face_alignments, user_id=user_id)
+            for tracking_id, (score, name, query_emb) in zip(matched_ids, results):
+                identity_cache.update(tracking_id, query_emb, score, name, frame_id)
 
-                        id_face_mapping[tracking_ids[i]] = caption
+                if name is not None:
+                    if score < recognition_thresh:
+                        caption = "UN_KNOWN"
+                    else:
+                        caption = f"{name}:{score:.2f}"
 
-                        detection_bboxes = np.delete(detection_bboxes, j, axis=0)
-                        detection_landmarks = np.delete(detection_landmarks, j, axis=0)
+                    # Update the recognized person's name
+                    if name != current_person and score >= recognition_thresh:
+                        current_person = name
+                        deepgram_recognizer.set_recognized_person(current_person)
+                        deepgram_recognizer.start()  # Start speech recognition
+                        print(f"Started speech recognition for {current_person}")
 
-                        break
+                    id_face_mapping[tracking_id] = caption
 
         # Stop speech recognition if no person is detected
         if not tracking_bboxes and current_person:
@@ -823,12 +1007,24 @@ def start_recognition():
     """
     Flask route to start face tracking and recognition threads.
     """
-    global stop_threads
+    global stop_threads, identity_cache
     stop_threads = False  # Reset the flag to allow threads to run
 
     file_name = "./face_tracking/config/config_tracking.yaml"
     config_tracking = load_config(file_name)
 
+    # Pick up persons enrolled offline with add_persons.py
+    live_gallery.reload()
+
+    # Metrics of the previous session no longer apply
+    pipeline_metrics.reset()
+
+    # Fresh identity cache for the new tracker's track IDs
+    identity_cache = IdentityCache(
+        score_thresh=config_tracking["recognition_thresh"],
+        refresh_interval=config_tracking["recognition_refresh_interval"],
+    )
+
     # Start tracking thread
     thread_track = threading.Thread(
         target=tracking,
@@ -837,7 +1033,12 @@ def start_recognition():
     thread_track.start()
 
     # Start recognition thread
-    thread_recognize = threading.Thread(target=recognition_thread)
+    # Only search the contacts of the patient this camera serves
+    user_id = request.args.get("user_id")
+
+    thread_recognize = threading.Thread(
+        target=recognition_thread, args=(config_tracking, user_id)
+    )
     thread_recognize.start()
 
     # Return a valid response
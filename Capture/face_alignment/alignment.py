@@ -1,6 +1,7 @@
+import threading
+
 import cv2
 import numpy as np
-from skimage import transform as trans
 
 # Define a standard set of destination landmarks for ArcFace alignment
 arcface_dst = np.array(
@@ -15,20 +16,20 @@ arcface_dst = np.array(
 )
 
 
-def estimate_norm(lmk, image_size=112, mode="arcface"):
+# Preallocated crop buffers used by norm_crop_batch, one set per thread
+_crop_buffers = threading.local()
+
+
+def arcface_destination(image_size=112):
     """
-    Estimate the transformation matrix for aligning facial landmarks.
+    Get the ArcFace destination landmarks for an output size.
 
     Args:
-        lmk (numpy.ndarray): 2D array of shape (5, 2) representing facial landmarks.
         image_size (int): Desired output image size.
-        mode (str): Alignment mode, currently only "arcface" is supported.
 
     Returns:
-        numpy.ndarray: Transformation matrix (2x3) for aligning facial landmarks.
+        numpy.ndarray: Array of shape (5, 2) with the destination landmarks.
     """
-    # Check input conditions
-    assert lmk.shape == (5, 2)
     assert image_size % 112 == 0 or image_size % 128 == 0
 
     # Adjust ratio and x-coordinate difference based on image size
@@ -43,14 +44,87 @@ def estimate_norm(lmk, image_size=112, mode="arcface"):
     dst = arcface_dst * ratio
     dst[:, 0] += diff_x
 
-    # Estimate the similarity transformation
-    tform = trans.SimilarityTransform()
-    tform.estimate(lmk, dst)
-    M = tform.params[0:2, :]
+    return dst
+
+
+def estimate_similarity_batch(src, dst):
+    """
+    Estimate 2D similarity transforms for N point sets at once (Umeyama).
+
+    Closed-form least-squares fit of rotation, uniform scale and translation
+    mapping each `src[i]` onto `dst`, equivalent to
+    `skimage.transform.SimilarityTransform.estimate` but vectorized over N.
+
+    Args:
+        src (numpy.ndarray): Array of shape (N, K, 2) with source points.
+        dst (numpy.ndarray): Array of shape (K, 2) or (N, K, 2) with destination points.
+
+    Returns:
+        numpy.ndarray: Array of shape (N, 2, 3) with the transformation matrices.
+    """
+    src = np.asarray(src, dtype=np.float64)
+    dst = np.broadcast_to(np.asarray(dst, dtype=np.float64), src.shape)
+
+    src_mean = src.mean(axis=1)
+    dst_mean = dst.mean(axis=1)
+    src_demean = src - src_mean[:, np.newaxis]
+    dst_demean = dst - dst_mean[:, np.newaxis]
+
+    # Cross-covariance between destination and source, (N, 2, 2)
+    A = np.einsum("nki,nkj->nij", dst_demean, src_demean) / src.shape[1]
+
+    # Flip the last singular direction to avoid reflections
+    d = np.ones((src.shape[0], 2))
+    d[np.linalg.det(A) < 0, 1] = -1
+
+    U, S, Vt = np.linalg.svd(A)
+    R = np.matmul(U * d[:, np.newaxis, :], Vt)
+
+    scale = np.sum(S * d, axis=1) / src_demean.var(axis=1).sum(axis=1)
+
+    M = np.empty((src.shape[0], 2, 3))
+    M[:, :, :2] = R * scale[:, np.newaxis, np.newaxis]
+    M[:, :, 2] = dst_mean - np.einsum("nij,nj->ni", M[:, :, :2], src_mean)
 
     return M
 
 
+def estimate_norm_batch(lmks, image_size=112, mode="arcface"):
+    """
+    Estimate the alignment matrices for several sets of facial landmarks.
+
+    Args:
+        lmks (numpy.ndarray): Array of shape (N, 5, 2) with facial landmarks.
+        image_size (int): Desired output image size.
+        mode (str): Alignment mode, currently only "arcface" is supported.
+
+    Returns:
+        numpy.ndarray: Array of shape (N, 2, 3) with the transformation matrices.
+    """
+    lmks = np.asarray(lmks)
+    assert lmks.ndim == 3 and lmks.shape[1:] == (5, 2)
+
+    return estimate_similarity_batch(lmks, arcface_destination(image_size))
+
+
+def estimate_norm(lmk, image_size=112, mode="arcface"):
+    """
+    Estimate the transformation matrix for aligning facial landmarks.
+
+    Args:
+        lmk (numpy.ndarray): 2D array of shape (5, 2) representing facial landmarks.
+        image_size (int): Desired output image size.
+        mode (str): Alignment mode, currently only "arcface" is supported.
+
+    Returns:
+        numpy.ndarray: Transformation matrix (2x3) for aligning facial landmarks.
+    """
+    # Check input conditions
+    assert lmk.shape == (5, 2)
+
+    return estimate_norm_batch(lmk[np.newaxis], image_size, mode)[0]
+
+
 def norm_crop(img, landmark, image_size=112, mode="arcface"):
     """
     Normalize and crop a facial image based on provided landmarks.
@@ -71,3 +145,44 @@ def norm_crop(img, landmark, image_size=112, mode="arcface"):
     warped = cv2.warpAffine(img, M, (image_size, image_size), borderValue=0.0)
 
     return warped
+
+
+def norm_crop_batch(img, landmarks, image_size=112, mode="arcface", out=None):
+    """
+    Normalize and crop every face of one image into a single buffer.
+
+    Args:
+        img (numpy.ndarray): Input image.
+        landmarks (numpy.ndarray): Array of shape (N, 5, 2) with facial landmarks.
+        image_size (int): Desired output image size.
+        mode (str): Alignment mode, currently only "arcface" is supported.
+        out (numpy.ndarray): Optional (N, size, size, C) destination. When omitted
+            a per-thread buffer is reused, valid until the next call with the
+            same number of faces.
+
+    Returns:
+        numpy.ndarray: Array of shape (N, size, size, C) with the aligned faces.
+    """
+    landmarks = np.asarray(landmarks)
+    num_faces = len(landmarks)
+    shape = (num_faces, image_size, image_size) + img.shape[2:]
+
+    if out is None:
+        buffers = getattr(_crop_buffers, "buffers", None)
+        if buffers is None:
+            buffers = _crop_buffers.buffers = {}
+        key = (shape, img.dtype)
+        out = buffers.get(key)
+        if out is None:
+            out = buffers[key] = np.empty(shape, dtype=img.dtype)
+    assert out.shape == shape
+
+    if num_faces == 0:
+        return out
+
+    # All matrices in one vectorized solve, then warp straight into the buffer
+    M = estimate_norm_batch(landmarks, image_size, mode)
+    for i in range(num_faces):
+        cv2.warpAffine(img, M[i], (image_size, image_size), dst=out[i], borderValue=0.0)
+
+    return out
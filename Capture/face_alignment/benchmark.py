@@ -0,0 +1,91 @@
+"""
+Check the vectorized similarity estimator against skimage and time both paths.
+
+Run from the Capture directory:
+
+    python -m face_alignment.benchmark --faces 1 4 16
+"""
+import argparse
+import time
+
+import numpy as np
+from skimage import transform as trans
+
+from face_alignment.alignment import (
+    arcface_destination,
+    estimate_norm_batch,
+    norm_crop,
+    norm_crop_batch,
+)
+
+
+def skimage_estimate_norm(lmk, image_size=112):
+    """Reference alignment matrix computed the previous way, with skimage."""
+    tform = trans.SimilarityTransform()
+    tform.estimate(lmk, arcface_destination(image_size))
+    return tform.params[0:2, :]
+
+
+def random_landmarks(num_faces, rng):
+    """Jittered ArcFace landmarks with random scale, rotation and offset."""
+    angles = rng.uniform(-0.5, 0.5, num_faces)
+    cos, sin = np.cos(angles), np.sin(angles)
+    rot = np.stack([np.stack([cos, -sin], -1), np.stack([sin, cos], -1)], 1)
+    scales = rng.uniform(0.5, 3.0, (num_faces, 1, 1))
+    offsets = rng.uniform(0, 400, (num_faces, 1, 2))
+    jitter = rng.normal(0, 2.0, (num_faces, 5, 2))
+    return (arcface_destination(112) + jitter) @ rot * scales + offsets
+
+
+def check_agreement(num_checks, rng):
+    """Assert the vectorized matrices and crops match the skimage path."""
+    lmks = random_landmarks(num_checks, rng)
+    ours = estimate_norm_batch(lmks)
+    ref = np.stack([skimage_estimate_norm(lmk) for lmk in lmks])
+    max_err = np.abs(ours - ref).max()
+    assert np.allclose(ours, ref, rtol=1e-6, atol=1e-5), f"matrices differ by {max_err}"
+
+    img = rng.integers(0, 255, (480, 640, 3), dtype=np.uint8)
+    crops = norm_crop_batch(img, lmks[:8])
+    for i in range(8):
+        assert np.array_equal(crops[i], norm_crop(img, lmks[i]))
+
+    return max_err
+
+
+def time_call(fn, iters):
+    start = time.perf_counter()
+    for _ in range(iters):
+        fn()
+    return 1000.0 * (time.perf_counter() - start) / iters
+
+
+def main(faces, iters, seed):
+    rng = np.random.default_rng(seed)
+    max_err = check_agreement(1000, rng)
+    print(f"Matrices agree with skimage on 1000 faces (max abs diff {max_err:.2e})")
+
+    img = rng.integers(0, 255, (480, 640, 3), dtype=np.uint8)
+    print(f"{'faces':>6} {'skimage':>12} {'batched':>12} {'speedup':>9}  (estimate, ms)")
+    for num_faces in faces:
+        lmks = random_landmarks(num_faces, rng)
+        ref_ms = time_call(lambda: [skimage_estimate_norm(lmk) for lmk in lmks], iters)
+        ours_ms = time_call(lambda: estimate_norm_batch(lmks), iters)
+        print(f"{num_faces:>6} {ref_ms:>12.3f} {ours_ms:>12.3f} {ref_ms / ours_ms:>8.1f}x")
+
+    print(f"{'faces':>6} {'norm_crop':>12} {'batch':>12} {'speedup':>9}  (estimate + warp, ms)")
+    for num_faces in faces:
+        lmks = random_landmarks(num_faces, rng)
+        ref_ms = time_call(lambda: [norm_crop(img, lmk) for lmk in lmks], iters)
+        ours_ms = time_call(lambda: norm_crop_batch(img, lmks), iters)
+        print(f"{num_faces:>6} {ref_ms:>12.3f} {ours_ms:>12.3f} {ref_ms / ours_ms:>8.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--faces", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--iters", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    opt = parser.parse_args()
+
+    main(**vars(opt))
@@ -0,0 +1,80 @@
+"""
+Sweep ONNX Runtime session settings of the SCRFD detector.
+
+Every combination of thread count, execution mode and IO binding is timed on
+the same frame. With `--batch-size` above one, `detect_batch` is timed on that
+many copies of the frame. Run from the Capture directory:
+
+    python -m face_detection.benchmark --threads 1 2 4 --input-sizes 128 640
+"""
+import argparse
+import itertools
+import time
+
+import cv2
+import numpy as np
+
+from face_detection.scrfd.detector import SCRFD
+
+
+def time_detector(detector, image, input_size, iters, batch_size=1, warmup=5):
+    """Return the mean latency per frame in milliseconds."""
+    if batch_size > 1:
+        frames = [image] * batch_size
+
+        def detect():
+            detector.detect_batch(frames, input_size=input_size)
+
+    else:
+
+        def detect():
+            detector.detect_tracking(image, input_size=input_size)
+
+    for _ in range(warmup):
+        detect()
+    start = time.perf_counter()
+    for _ in range(iters):
+        detect()
+    return 1000.0 * (time.perf_counter() - start) / (iters * batch_size)
+
+
+def main(model_file, image, input_sizes, threads, execution_modes, batch_size, iters):
+    frame = cv2.imread(image) if image else None
+    if frame is None:
+        print("No image given, timing a random 640x480 frame")
+        frame = np.random.default_rng(0).integers(0, 255, (480, 640, 3), dtype=np.uint8)
+
+    print(f"{'input':>7} {'threads':>7} {'mode':>10} {'binding':>7} {'ms/frame':>9}")
+    for num_threads, mode, io_binding in itertools.product(
+        threads, execution_modes, (False, True)
+    ):
+        detector = SCRFD(
+            model_file=model_file,
+            session_options={"intra_op_threads": num_threads, "execution_mode": mode},
+            io_binding=io_binding,
+        )
+        for size in input_sizes:
+            ms = time_detector(detector, frame, (size, size), iters, batch_size)
+            print(f"{size:>7} {num_threads:>7} {mode:>10} {str(io_binding):>7} {ms:>9.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--model-file",
+        type=str,
+        default="face_detection/scrfd/weights/scrfd_2.5g_bnkps.onnx",
+    )
+    parser.add_argument("--image", type=str, default=None, help="Frame to detect faces in.")
+    parser.add_argument("--input-sizes", type=int, nargs="+", default=[128, 320, 640])
+    parser.add_argument(
+        "--threads", type=int, nargs="+", default=[0, 1, 2], help="0 is the ORT default."
+    )
+    parser.add_argument(
+        "--execution-modes", type=str, nargs="+", default=["sequential", "parallel"]
+    )
+    parser.add_argument("--batch-size", type=int, default=1, help="Frames per detect_batch call.")
+    parser.add_argument("--iters", type=int, default=50)
+    opt = parser.parse_args()
+
+    main(**vars(opt))
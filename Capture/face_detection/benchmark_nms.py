@@ -0,0 +1,63 @@
+"""
+Check the NMS backends against the greedy reference and time them.
+
+Candidates are drawn as jittered copies of a few faces, like the dense
+overlapping proposals SCRFD produces around each face at low thresholds.
+Run from the Capture directory:
+
+    python -m face_detection.benchmark_nms --counts 10 100 1000 5000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from face_detection.nms import NMS_METHODS, nms_greedy
+
+
+def random_candidates(count, num_faces, rng):
+    """Jittered boxes around `num_faces` faces with random scores."""
+    centers = rng.uniform(50, 590, (num_faces, 2))
+    sizes = rng.uniform(20, 120, (num_faces, 1))
+    face = rng.integers(0, num_faces, count)
+    jitter = rng.normal(0, 0.15, (count, 4)) * sizes[face]
+    boxes = np.hstack((centers[face] - sizes[face] / 2, centers[face] + sizes[face] / 2))
+    boxes += jitter
+    scores = rng.uniform(0.02, 1.0, (count, 1))
+    return np.hstack((boxes, scores)).astype(np.float32)
+
+
+def time_method(fn, dets, thresh, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn(dets.copy(), thresh)
+    return 1000.0 * (time.perf_counter() - start) / repeats
+
+
+def main(counts, faces, thresh, repeats, seed):
+    rng = np.random.default_rng(seed)
+
+    print(f"{'count':>6} " + " ".join(f"{name:>9}" for name in NMS_METHODS) + "  (ms)")
+    for count in counts:
+        dets = random_candidates(count, faces, rng)
+
+        # Hard NMS backends must keep exactly the reference detections
+        reference = sorted(nms_greedy(dets, thresh))
+        for name in ("matrix", "opencv"):
+            keep = sorted(NMS_METHODS[name](dets.copy(), thresh))
+            assert keep == reference, f"{name} disagrees with greedy NMS at {count} candidates"
+
+        times = [time_method(fn, dets, thresh, repeats) for fn in NMS_METHODS.values()]
+        print(f"{count:>6} " + " ".join(f"{t:>9.3f}" for t in times))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--counts", type=int, nargs="+", default=[10, 100, 500, 1000, 5000])
+    parser.add_argument("--faces", type=int, default=20, help="Faces the candidates cluster around.")
+    parser.add_argument("--thresh", type=float, default=0.4, help="IoU threshold.")
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    opt = parser.parse_args()
+
+    main(**vars(opt))
@@ -1,9 +1,13 @@
 import os.path as osp
+import threading
 
 import cv2
 import numpy as np
 import onnxruntime
-import torch
+
+from face_detection.nms import get_nms
+from face_detection.scrfd.session import create_session, session_config_from
+from face_tracking.tracker.detections import Detections
 
 
 def softmax(z):
@@ -16,56 +20,25 @@ def softmax(z):
     return e_x / div
 
 
-def distance2bbox(points, distance, max_shape=None):
-    """Decode distance prediction to bounding box.
-
-    Args:
-        points (Tensor): Shape (n, 2), [x, y].
-        distance (Tensor): Distance from the given point to 4
-            boundaries (left, top, right, bottom).
-        max_shape (tuple): Shape of the image.
-
-    Returns:
-        Tensor: Decoded bboxes.
-    """
-    x1 = points[:, 0] - distance[:, 0]
-    y1 = points[:, 1] - distance[:, 1]
-    x2 = points[:, 0] + distance[:, 2]
-    y2 = points[:, 1] + distance[:, 3]
-    if max_shape is not None:
-        x1 = x1.clamp(min=0, max=max_shape[1])
-        y1 = y1.clamp(min=0, max=max_shape[0])
-        x2 = x2.clamp(min=0, max=max_shape[1])
-        y2 = y2.clamp(min=0, max=max_shape[0])
-    return np.stack([x1, y1, x2, y2], axis=-1)
-
+class _RunBuffers:
+    """Preallocated input blob and, with IO binding, the bound output arrays."""
 
-def distance2kps(points, distance, max_shape=None):
-    """Decode distance prediction to bounding box.
-
-    Args:
-        points (Tensor): Shape (n, 2), [x, y].
-        distance (Tensor): Distance from the given point to 4
-            boundaries (left, top, right, bottom).
-        max_shape (tuple): Shape of the image.
-
-    Returns:
-        Tensor: Decoded bboxes.
-    """
-    preds = []
-    for i in range(0, distance.shape[1], 2):
-        px = points[:, i % 2] + distance[:, i]
-        py = points[:, i % 2 + 1] + distance[:, i + 1]
-        if max_shape is not None:
-            px = px.clamp(min=0, max=max_shape[1])
-            py = py.clamp(min=0, max=max_shape[0])
-        preds.append(px)
-        preds.append(py)
-    return np.stack(preds, axis=-1)
+    def __init__(self, blob):
+        self.blob = blob
+        self.binding = None
+        self.outputs = None
+        self.ort_values = None
 
 
 class SCRFD:
-    def __init__(self, model_file=None, session=None):
+    def __init__(
+        self,
+        model_file=None,
+        session=None,
+        nms_method="greedy",
+        session_options=None,
+        io_binding=False,
+    ):
         self.model_file = model_file
         self.session = session
         self.taskname = "detection"
@@ -73,9 +46,18 @@ class SCRFD:
         if self.session is None:
             assert self.model_file is not None
             assert osp.exists(self.model_file)
-            self.session = onnxruntime.InferenceSession(self.model_file, None)
+            if session_options is None:
+                self.session = onnxruntime.InferenceSession(self.model_file, None)
+            else:
+                self.session = create_session(self.model_file, **session_options)
+        self.io_binding = io_binding
         self.center_cache = {}
         self.nms_thresh = 0.4
+        self.nms_method = nms_method
+        self._nms = get_nms(nms_method)
+        # Per-thread letterbox canvases and run buffers, tracking and enrollment
+        # share a detector
+        self._local = threading.local()
 
         self._init_vars()
 
@@ -86,6 +68,8 @@ class SCRFD:
             self.input_size = None
         else:
             self.input_size = tuple(input_shape[2:4][::-1])
+        # Fixed batch size of the model input, None if the batch dim is dynamic
+        self.input_batch = input_shape[0] if isinstance(input_shape[0], int) else None
         input_name = input_cfg.name
         outputs = self.session.get_outputs()
         if len(outputs[0].shape) == 3:
@@ -116,55 +100,46 @@ class SCRFD:
             self._num_anchors = 1
             self.use_kps = True
 
+        # Anchor centers of the fixed model input, or of the default detection size
+        self.anchor_centers(self.input_size or (128, 128))
+
     def prepare(self, ctx_id, **kwargs):
         if ctx_id < 0:
             self.session.set_providers(["CPUExecutionProvider"])
+            # The session was rebuilt, IO bindings of the old one cannot be reused
+            self._local = threading.local()
         nms_thresh = kwargs.get("nms_thresh", None)
         if nms_thresh is not None:
             self.nms_thresh = nms_thresh
+        nms_method = kwargs.get("nms_method", None)
+        if nms_method is not None:
+            self.nms_method = nms_method
+            self._nms = get_nms(nms_method)
         input_size = kwargs.get("input_size", None)
         if input_size is not None:
             if self.input_size is not None:
                 print("warning: det_size is already set in scrfd model, ignore")
             else:
                 self.input_size = input_size
-
-    def forward(self, img, thresh):
-        scores_list = []
-        bboxes_list = []
-        kpss_list = []
-        input_size = tuple(img.shape[0:2][::-1])
-        blob = cv2.dnn.blobFromImage(
-            img, 1.0 / 128, input_size, (127.5, 127.5, 127.5), swapRB=True
-        )
-        net_outs = self.session.run(self.output_names, {self.input_name: blob})
-
-        input_height = blob.shape[2]
-        input_width = blob.shape[3]
-        fmc = self.fmc
-        for idx, stride in enumerate(self._feat_stride_fpn):
-            # If model support batch dim, take first output
-            if self.batched:
-                scores = net_outs[idx][0]
-                bbox_preds = net_outs[idx + fmc][0]
-                bbox_preds = bbox_preds * stride
-                if self.use_kps:
-                    kps_preds = net_outs[idx + fmc * 2][0] * stride
-            # If model doesn't support batching take output as is
-            else:
-                scores = net_outs[idx]
-                bbox_preds = net_outs[idx + fmc]
-                bbox_preds = bbox_preds * stride
-                if self.use_kps:
-                    kps_preds = net_outs[idx + fmc * 2] * stride
-
-            height = input_height // stride
-            width = input_width // stride
-            K = height * width
-            key = (height, width, stride)
-            if key in self.center_cache:
-                anchor_centers = self.center_cache[key]
-            else:
+                self.anchor_centers(tuple(input_size))
+
+    def anchor_centers(self, input_size):
+        """
+        Anchor centers of every stride for an input size, built once and cached.
+
+        Args:
+            input_size (tuple): Model input as (width, height).
+
+        Returns:
+            list: One float32 array of shape (K * num_anchors, 2) with the x, y
+            centers per stride.
+        """
+        centers = self.center_cache.get(input_size)
+        if centers is None:
+            centers = []
+            for stride in self._feat_stride_fpn:
+                height = input_size[1] // stride
+                width = input_size[0] // stride
                 anchor_centers = np.stack(
                     np.mgrid[:height, :width][::-1], axis=-1
                 ).astype(np.float32)
@@ -174,59 +149,176 @@ class SCRFD:
                     anchor_centers = np.stack(
                         [anchor_centers] * self._num_anchors, axis=1
                     ).reshape((-1, 2))
-                if len(self.center_cache) < 100:
-                    self.center_cache[key] = anchor_centers
-
-            pos_inds = np.where(scores >= thresh)[0]
-            bboxes = distance2bbox(anchor_centers, bbox_preds)
-            pos_scores = scores[pos_inds]
-            pos_bboxes = bboxes[pos_inds]
-            scores_list.append(pos_scores)
-            bboxes_list.append(pos_bboxes)
+                centers.append(anchor_centers)
+            if len(self.center_cache) < 100:
+                self.center_cache[input_size] = centers
+        return centers
+
+    def decode(self, net_outs, thresh, input_size, index=0):
+        """
+        Decode the raw outputs of one image, keeping only anchors above `thresh`.
+
+        Scores are filtered first, then the boxes and keypoints of the surviving
+        anchors of all strides are decoded together.
+
+        Args:
+            net_outs (list): Session outputs, ordered scores, boxes, keypoints.
+            thresh (float): Score threshold.
+            input_size (tuple): Model input as (width, height).
+            index (int): Image of the batch, for batched models.
+
+        Returns:
+            tuple: Scores (N, 1), boxes (N, 4) and keypoints (N, 5, 2) or None, in
+            input pixels and in stride order.
+        """
+        fmc = self.fmc
+        scores_list, bbox_list, kps_list, centers_list, strides_list = [], [], [], [], []
+        for idx, (stride, centers) in enumerate(
+            zip(self._feat_stride_fpn, self.anchor_centers(input_size))
+        ):
+            outs = [net_outs[idx], net_outs[idx + fmc]]
             if self.use_kps:
-                kpss = distance2kps(anchor_centers, kps_preds)
-                # kpss = kps_preds
-                kpss = kpss.reshape((kpss.shape[0], -1, 2))
-                pos_kpss = kpss[pos_inds]
-                kpss_list.append(pos_kpss)
-        return scores_list, bboxes_list, kpss_list
-
-    def nms(self, dets):
-        thresh = self.nms_thresh
-        x1 = dets[:, 0]
-        y1 = dets[:, 1]
-        x2 = dets[:, 2]
-        y2 = dets[:, 3]
-        scores = dets[:, 4]
-
-        areas = (x2 - x1 + 1) * (y2 - y1 + 1)
-        order = scores.argsort()[::-1]
-
-        keep = []
-        while order.size > 0:
-            i = order[0]
-            keep.append(i)
-            xx1 = np.maximum(x1[i], x1[order[1:]])
-            yy1 = np.maximum(y1[i], y1[order[1:]])
-            xx2 = np.minimum(x2[i], x2[order[1:]])
-            yy2 = np.minimum(y2[i], y2[order[1:]])
-
-            w = np.maximum(0.0, xx2 - xx1 + 1)
-            h = np.maximum(0.0, yy2 - yy1 + 1)
-            inter = w * h
-            ovr = inter / (areas[i] + areas[order[1:]] - inter)
-
-            inds = np.where(ovr <= thresh)[0]
-            order = order[inds + 1]
+                outs.append(net_outs[idx + fmc * 2])
+            # If model support batch dim, take the requested image
+            if self.batched:
+                outs = [out[index] for out in outs]
 
-        return keep
+            pos_inds = np.flatnonzero(outs[0].ravel() >= thresh)
+            scores_list.append(outs[0][pos_inds])
+            bbox_list.append(outs[1][pos_inds])
+            if self.use_kps:
+                kps_list.append(outs[2][pos_inds])
+            centers_list.append(centers[pos_inds])
+            strides_list.append(np.full(len(pos_inds), stride, dtype=np.float32))
 
-    def detect(
-        self, image, thresh=0.5, input_size=(128, 128), max_num=0, metric="default"
-    ):
-        assert input_size is not None or self.input_size is not None
+        scores = np.concatenate(scores_list)
+        centers = np.concatenate(centers_list)
+        strides = np.concatenate(strides_list)[:, None]
+
+        # x1, y1 = center - distance and x2, y2 = center + distance
+        distances = np.concatenate(bbox_list) * strides
+        bboxes = np.hstack((centers - distances[:, :2], centers + distances[:, 2:]))
 
-        input_size = self.input_size if input_size is None else input_size
+        kpss = None
+        if self.use_kps:
+            kps_preds = np.concatenate(kps_list) * strides
+            kps_preds = kps_preds.reshape((len(kps_preds), kps_preds.shape[1] // 2, 2))
+            kpss = centers[:, None, :] + kps_preds
+
+        return scores, bboxes, kpss
+
+    def _run_buffers(self, input_size, batch_size):
+        runs = getattr(self._local, "runs", None)
+        if runs is None:
+            runs = self._local.runs = {}
+        key = (input_size, batch_size)
+        run = runs.get(key)
+        if run is None:
+            blob = np.zeros((batch_size, 3, input_size[1], input_size[0]), dtype=np.float32)
+            run = runs[key] = _RunBuffers(blob)
+        return run
+
+    def blob(self, images, input_size=None):
+        """
+        Convert BGR images into the reused NCHW input blob.
+
+        Same as `cv2.dnn.blobFromImage(img, 1 / 128, size, 127.5, swapRB=True)`,
+        written into a buffer kept per input size, batch size and thread.
+
+        Args:
+            images (list): BGR uint8 images. Without `input_size` they must
+                already be letterboxed to the same size.
+            input_size (tuple): Letterbox each image to this (width, height) first.
+
+        Returns:
+            tuple: The `_RunBuffers` holding the filled blob and the scale from
+            image to canvas pixels of each image.
+        """
+        if input_size is None:
+            input_size = tuple(images[0].shape[0:2][::-1])
+        else:
+            input_size = tuple(input_size)
+        # A model with a fixed batch always gets that many rows, the rest padding
+        run = self._run_buffers(input_size, self.input_batch or len(images))
+
+        det_scales = []
+        for i, image in enumerate(images):
+            det_scale = 1.0
+            if image.shape[0:2] != (input_size[1], input_size[0]):
+                image, det_scale = self._letterbox(image, input_size)
+            run.blob[i] = image[:, :, ::-1].transpose(2, 0, 1)
+            det_scales.append(det_scale)
+        run.blob -= 127.5
+        run.blob *= 1.0 / 128
+
+        return run, det_scales
+
+    def run(self, run):
+        """
+        Run the session on a filled blob.
+
+        With IO binding the first run of an input size records the output
+        shapes and binds preallocated arrays; later runs write into them, so
+        the returned arrays are only valid until the next run of that size.
+
+        Args:
+            run (_RunBuffers): Buffers returned by `blob`.
+
+        Returns:
+            list: The raw session outputs.
+        """
+        if not self.io_binding:
+            return self.session.run(self.output_names, {self.input_name: run.blob})
+
+        if run.binding is None:
+            net_outs = self.session.run(self.output_names, {self.input_name: run.blob})
+            run.outputs = [np.empty_like(out) for out in net_outs]
+            # OrtValues share memory with the numpy buffers, keep them alive
+            run.ort_values = [onnxruntime.OrtValue.ortvalue_from_numpy(run.blob)]
+            run.ort_values += [onnxruntime.OrtValue.ortvalue_from_numpy(o) for o in run.outputs]
+            run.binding = self.session.io_binding()
+            run.binding.bind_ortvalue_input(self.input_name, run.ort_values[0])
+            for name, value in zip(self.output_names, run.ort_values[1:]):
+                run.binding.bind_ortvalue_output(name, value)
+            return net_outs
+
+        self.session.run_with_iobinding(run.binding)
+        return run.outputs
+
+    def forward(self, img, thresh):
+        input_size = tuple(img.shape[0:2][::-1])
+        net_outs = self.run(self.blob([img])[0])
+        return self.decode(net_outs, thresh, input_size)
+
+    def nms(self, dets, score_thresh=None):
+        keep = np.asarray(self._nms(dets, self.nms_thresh), dtype=np.int64)
+        if score_thresh is not None:
+            # Soft-NMS keeps overlapping boxes with decayed scores, drop the weak ones
+            keep = keep[dets[keep, 4] >= score_thresh]
+        return keep
+
+    def _letterbox(self, image, input_size):
+        """
+        Resize an image into the reused letterbox canvas of the model input.
+
+        One canvas is kept per input size and thread; the image is resized
+        straight into its top-left corner and only the padding is cleared.
+
+        Args:
+            image (numpy.ndarray): BGR image of any size.
+            input_size (tuple): Model input as (width, height).
+
+        Returns:
+            tuple: The (height, width, 3) uint8 canvas, valid until the next call
+            with the same input size, and the scale from image to canvas pixels.
+        """
+        canvases = getattr(self._local, "canvases", None)
+        if canvases is None:
+            canvases = self._local.canvases = {}
+        canvas = canvases.get(input_size)
+        if canvas is None:
+            canvas = np.zeros((input_size[1], input_size[0], 3), dtype=np.uint8)
+            canvases[input_size] = canvas
 
         im_ratio = float(image.shape[0]) / image.shape[1]
         model_ratio = float(input_size[1]) / input_size[0]
@@ -237,34 +329,31 @@ class SCRFD:
             new_width = input_size[0]
             new_height = int(new_width * im_ratio)
         det_scale = float(new_height) / image.shape[0]
-        resized_img = cv2.resize(image, (new_width, new_height))
-        det_img = np.zeros((input_size[1], input_size[0], 3), dtype=np.uint8)
-        det_img[:new_height, :new_width, :] = resized_img
 
-        scores_list, bboxes_list, kpss_list = self.forward(det_img, thresh)
+        cv2.resize(image, (new_width, new_height), dst=canvas[:new_height, :new_width])
+        canvas[new_height:] = 0
+        canvas[:new_height, new_width:] = 0
 
-        scores = np.vstack(scores_list)
-        scores_ravel = scores.ravel()
-        order = scores_ravel.argsort()[::-1]
-        bboxes = np.vstack(bboxes_list) / det_scale
-        if self.use_kps:
-            kpss = np.vstack(kpss_list) / det_scale
+        return canvas, det_scale
+
+    def _select(self, scores, bboxes, kpss, det_scale, image_shape, thresh, max_num, metric):
+        """Sort, suppress and optionally cap the decoded detections of one image."""
+        order = scores.ravel().argsort()[::-1]
         pre_det = np.hstack((bboxes, scores)).astype(np.float32, copy=False)
         pre_det = pre_det[order, :]
-        keep = self.nms(pre_det)
+        keep = self.nms(pre_det, score_thresh=thresh)
         det = pre_det[keep, :]
-        if self.use_kps:
-            kpss = kpss[order, :, :]
-            kpss = kpss[keep, :, :]
-        else:
-            kpss = None
+        if kpss is not None:
+            kpss = kpss[order, :, :][keep, :, :]
+
         if max_num > 0 and det.shape[0] > max_num:
-            area = (det[:, 2] - det[:, 0]) * (det[:, 3] - det[:, 1])
-            img_center = image.shape[0] // 2, image.shape[1] // 2
+            boxes = det[:, :4] / det_scale
+            area = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+            img_center = image_shape[0] // 2, image_shape[1] // 2
             offsets = np.vstack(
                 [
-                    (det[:, 0] + det[:, 2]) / 2 - img_center[1],
-                    (det[:, 1] + det[:, 3]) / 2 - img_center[0],
+                    (boxes[:, 0] + boxes[:, 2]) / 2 - img_center[1],
+                    (boxes[:, 1] + boxes[:, 3]) / 2 - img_center[0],
                 ]
             )
             offset_dist_squared = np.sum(np.power(offsets, 2.0), 0)
@@ -280,76 +369,205 @@ class SCRFD:
             if kpss is not None:
                 kpss = kpss[bindex, :]
 
+        return det, kpss
+
+    def _detect(self, image, thresh, input_size, max_num, metric):
+        """
+        Letterbox, run and decode a single image.
+
+        Returns:
+            tuple: Detections (N, 5) as x1, y1, x2, y2, score and keypoints
+            (N, 5, 2) or None, both in canvas pixels and sorted by score, and
+            the scale from image to canvas pixels.
+        """
+        assert input_size is not None or self.input_size is not None
+        input_size = tuple(self.input_size if input_size is None else input_size)
+
+        det_img, det_scale = self._letterbox(image, input_size)
+        scores, bboxes, kpss = self.forward(det_img, thresh)
+        det, kpss = self._select(
+            scores, bboxes, kpss, det_scale, image.shape, thresh, max_num, metric
+        )
+
+        return det, kpss, det_scale
+
+    def _detect_batch(self, images, thresh, input_size, max_num, metric):
+        """Same as `_detect` for several images, with one session call if batched."""
+        assert input_size is not None or self.input_size is not None
+        input_size = tuple(self.input_size if input_size is None else input_size)
+
+        # Models exported without a batch dim, or with a fixed batch smaller than
+        # the images, run image by image
+        fits = self.input_batch is None or self.input_batch >= len(images)
+        if not self.batched or not fits or len(images) <= 1:
+            return [self._detect(image, thresh, input_size, max_num, metric) for image in images]
+
+        run, det_scales = self.blob(images, input_size)
+        net_outs = self.run(run)
+
+        results = []
+        for i, (image, det_scale) in enumerate(zip(images, det_scales)):
+            scores, bboxes, kpss = self.decode(net_outs, thresh, input_size, index=i)
+            det, kpss = self._select(
+                scores, bboxes, kpss, det_scale, image.shape, thresh, max_num, metric
+            )
+            results.append((det, kpss, det_scale))
+        return results
+
+    def detect(
+        self, image, thresh=0.5, input_size=(128, 128), max_num=0, metric="default"
+    ):
+        det, kpss, det_scale = self._detect(image, thresh, input_size, max_num, metric)
+
+        # Boxes back to image pixels, the score column is truncated like before
+        det[:, :4] /= det_scale
         bboxes = np.int32(det)
-        landmarks = np.int32(kpss)
+        landmarks = np.int32(kpss / det_scale)
 
         return bboxes, landmarks
 
+    def detect_batch(
+        self, images, thresh=0.5, input_size=(128, 128), max_num=0, metric="default"
+    ):
+        """
+        Detect faces in several frames, e.g. recorded sessions or several cameras.
+
+        Batched models letterbox all frames into one NCHW blob and run the
+        session once; other models fall back to one call per frame.
+
+        Args:
+            images (list): BGR frames, of any sizes.
+            thresh (float): Detection score threshold.
+            input_size (tuple): Model input as (width, height).
+            max_num (int): Maximum faces per frame, 0 for all.
+            metric (str): How to rank faces when capping, "default" or "max".
+
+        Returns:
+            list: One (bboxes, landmarks) pair per frame, as returned by `detect`.
+        """
+        results = []
+        for det, kpss, det_scale in self._detect_batch(
+            images, thresh, input_size, max_num, metric
+        ):
+            det[:, :4] /= det_scale
+            results.append((np.int32(det), np.int32(kpss / det_scale)))
+        return results
+
     def detect_tracking(
         self, image, thresh=0.5, input_size=(128, 128), max_num=0, metric="default"
     ):
-        assert input_size is not None or self.input_size is not None
+        """
+        Detect faces for the tracker.
+
+        Returns:
+            tuple: `Detections` in detector input pixels, the frame info, and
+            the int32 boxes with scores and the landmarks in frame pixels.
+        """
         height, width = image.shape[:2]
         img_info = {"id": 0}
         img_info["height"] = height
         img_info["width"] = width
         img_info["raw_img"] = image
 
-        input_size = self.input_size if input_size is None else input_size
+        det, kpss, det_scale = self._detect(image, thresh, input_size, max_num, metric)
 
-        im_ratio = float(image.shape[0]) / image.shape[1]
-        model_ratio = float(input_size[1]) / input_size[0]
-        if im_ratio > model_ratio:
-            new_height = input_size[1]
-            new_width = int(new_height / im_ratio)
-        else:
-            new_width = input_size[0]
-            new_height = int(new_width * im_ratio)
-        det_scale = float(new_height) / image.shape[0]
-        resized_img = cv2.resize(image, (new_width, new_height))
-        det_img = np.zeros((input_size[1], input_size[0], 3), dtype=np.uint8)
-        det_img[:new_height, :new_width, :] = resized_img
+        bboxes = np.int32(det / det_scale)
+        landmarks = np.int32(kpss / det_scale)
 
-        scores_list, bboxes_list, kpss_list = self.forward(det_img, thresh)
+        return Detections.from_array(det), img_info, bboxes, landmarks
 
-        scores = np.vstack(scores_list)
-        scores_ravel = scores.ravel()
-        order = scores_ravel.argsort()[::-1]
-        bboxes = np.vstack(bboxes_list)
-        if self.use_kps:
-            kpss = np.vstack(kpss_list)
-        pre_det = np.hstack((bboxes, scores)).astype(np.float32, copy=False)
-        pre_det = pre_det[order, :]
-        keep = self.nms(pre_det)
-        det = pre_det[keep, :]
-        if self.use_kps:
-            kpss = kpss[order, :, :]
-            kpss = kpss[keep, :, :]
-        else:
-            kpss = None
-        if max_num > 0 and det.shape[0] > max_num:
-            area = (det[:, 2] - det[:, 0]) * (det[:, 3] - det[:, 1])
-            img_center = image.shape[0] // 2, image.shape[1] // 2
-            offsets = np.vstack(
-                [
-                    (det[:, 0] + det[:, 2]) / 2 - img_center[1],
-                    (det[:, 1] + det[:, 3]) / 2 - img_center[0],
-                ]
-            )
-            offset_dist_squared = np.sum(np.power(offsets, 2.0), 0)
-            if metric == "max":
-                values = area
-            else:
-                values = (
-                    area - offset_dist_squared * 2.0
-                )  # some extra weight on the centering
-            bindex = np.argsort(values)[::-1]  # some extra weight on the centering
-            bindex = bindex[0:max_num]
-            det = det[bindex, :]
+    def detect_rois(self, image, rois, thresh=0.5, input_size=(128, 128)):
+        """
+        Detect faces inside regions of a frame, e.g. around tracked faces.
+
+        Every crop is letterboxed to `input_size` on its own, so a face is seen
+        at a much higher resolution than in a full-frame scan of the same
+        input size. The crops go through the batched detection path, and the
+        detections are mapped back to frame pixels and suppressed across crops.
+
+        Args:
+            image (numpy.ndarray): The BGR frame.
+            rois (numpy.ndarray): Array of shape (R, 4) with x1, y1, x2, y2 regions
+                in frame pixels, clipped to the frame.
+            thresh (float): Detection score threshold.
+            input_size (tuple): Model input of each crop as (width, height).
+
+        Returns:
+            tuple: Detections (N, 5) and keypoints (N, 5, 2) or None, in frame
+            pixels and sorted by score.
+        """
+        height, width = image.shape[:2]
+        rois = np.asarray(rois, dtype=np.float64).reshape(-1, 4)
+        rois = np.round(rois).astype(np.int64)
+        np.clip(rois[:, 0::2], 0, width, out=rois[:, 0::2])
+        np.clip(rois[:, 1::2], 0, height, out=rois[:, 1::2])
+        rois = rois[(rois[:, 2] > rois[:, 0]) & (rois[:, 3] > rois[:, 1])]
+
+        crops = [image[y1:y2, x1:x2] for x1, y1, x2, y2 in rois]
+        dets_list, kpss_list = [], []
+        for (det, kpss, det_scale), (x1, y1) in zip(
+            self._detect_batch(crops, thresh, input_size, 0, "default"), rois[:, :2]
+        ):
+            # Crop canvas pixels -> frame pixels
+            det[:, :4] /= det_scale
+            det[:, :4] += (x1, y1, x1, y1)
+            dets_list.append(det)
             if kpss is not None:
-                kpss = kpss[bindex, :]
+                kpss_list.append(kpss / det_scale + (x1, y1))
+
+        if not dets_list:
+            kpss = np.empty((0, 5, 2), dtype=np.float32) if self.use_kps else None
+            return np.empty((0, 5), dtype=np.float32), kpss
+
+        # Overlapping crops see the same face, keep the best detection of each
+        det = np.vstack(dets_list)
+        order = det[:, 4].argsort()[::-1]
+        det = det[order]
+        keep = self.nms(det, score_thresh=thresh)
+        kpss = np.vstack(kpss_list)[order][keep] if kpss_list else None
+        return det[keep], kpss
+
+    def detect_tracking_rois(self, image, rois, thresh=0.5, input_size=(128, 128)):
+        """
+        `detect_rois` with the outputs of `detect_tracking`.
+
+        The detections are already in frame pixels, so the tracker must be
+        updated with `img_size` equal to the frame (height, width).
+        """
+        height, width = image.shape[:2]
+        img_info = {"id": 0}
+        img_info["height"] = height
+        img_info["width"] = width
+        img_info["raw_img"] = image
 
-        bboxes = np.int32(det / det_scale)
-        landmarks = np.int32(kpss / det_scale)
+        det, kpss = self.detect_rois(image, rois, thresh, input_size)
+        landmarks = np.int32(kpss) if kpss is not None else None
+
+        return Detections.from_array(det), img_info, np.int32(det), landmarks
 
-        return torch.tensor(det), img_info, bboxes, landmarks
+
+def scrfd_from_config(config, model_file=None):
+    """
+    Build the SCRFD detector described by the tracking configuration.
+
+    Args:
+        config (dict): The tracking configuration, see `detector_model`,
+            `detector_nms` and `detector_session`.
+        model_file (str): Path to the SCRFD ONNX model, overrides `detector_model`.
+
+    Returns:
+        SCRFD: The detector.
+    """
+    if model_file is None:
+        # The registry times detectors, so it imports this module
+        from face_detection.scrfd.registry import resolve_model_file
+
+        model_file = resolve_model_file(config)
+
+    session_options, io_binding = session_config_from(config)
+    return SCRFD(
+        model_file=model_file,
+        nms_method=config.get("detector_nms", "greedy"),
+        session_options=session_options,
+        io_binding=io_binding,
+    )
@@ -0,0 +1,223 @@
+"""
+Registry of the SCRFD detector weights and a latency-budget auto-tuner.
+
+The tracking YAML selects the model with `detector_model`, one of the
+registry names or `auto`. With `auto`, every model whose weights are present
+is timed on this machine, and the most accurate one that detects a frame
+within `detector_budget_ms` is used. The choice is saved next to the weights
+and reused until the machine, the ONNX Runtime version or the budget
+changes. Tune again from the Capture directory with:
+
+    python -m face_detection.scrfd.registry --budget-ms 15
+"""
+import argparse
+import json
+import os
+import os.path as osp
+import platform
+import time
+
+import cv2
+import numpy as np
+import onnxruntime
+import yaml
+
+from face_detection.scrfd.detector import SCRFD
+from face_detection.scrfd.session import session_config_from
+
+WEIGHTS_DIR = "face_detection/scrfd/weights"
+CHOICE_FILE = "detector_choice.json"
+
+# Weights with keypoints, which face alignment needs, and their WIDER FACE
+# hard-set AP as reported by the SCRFD authors. The AP ranks the models.
+SCRFD_MODELS = {
+    "500m": {"file": "scrfd_500m_bnkps.onnx", "wider_hard_ap": 69.49},
+    "2.5g": {"file": "scrfd_2.5g_bnkps.onnx", "wider_hard_ap": 77.13},
+    "10g": {"file": "scrfd_10g_bnkps.onnx", "wider_hard_ap": 82.80},
+}
+
+
+def model_path(name, weights_dir=WEIGHTS_DIR):
+    """Path of a registered model's weights."""
+    if name not in SCRFD_MODELS:
+        raise ValueError(f"unknown SCRFD model: {name}")
+    return osp.join(weights_dir, SCRFD_MODELS[name]["file"])
+
+
+def available_models(weights_dir=WEIGHTS_DIR):
+    """
+    Registered models whose weights are present.
+
+    Args:
+        weights_dir (str): Directory holding the ONNX files.
+
+    Returns:
+        list: Model names, most accurate first.
+    """
+    names = [name for name in SCRFD_MODELS if osp.exists(model_path(name, weights_dir))]
+    return sorted(names, key=lambda name: SCRFD_MODELS[name]["wider_hard_ap"], reverse=True)
+
+
+def machine_fingerprint():
+    """What a saved choice is only valid for."""
+    return {
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "onnxruntime": onnxruntime.__version__,
+    }
+
+
+def load_choice(weights_dir=WEIGHTS_DIR):
+    """The saved auto-tuner choice, or None."""
+    path = osp.join(weights_dir, CHOICE_FILE)
+    if not osp.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_choice(choice, weights_dir=WEIGHTS_DIR):
+    path = osp.join(weights_dir, CHOICE_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(choice, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def time_model(
+    name, config, frame, input_size=(128, 128), iters=20, warmup=5, weights_dir=WEIGHTS_DIR
+):
+    """
+    Mean latency of one model detecting a frame, in milliseconds.
+
+    The detector is built with the session settings of the tracking YAML,
+    so the timing matches what the capture pipeline will see.
+    """
+    session_options, io_binding = session_config_from(config)
+    detector = SCRFD(
+        model_file=model_path(name, weights_dir),
+        nms_method=config.get("detector_nms", "greedy"),
+        session_options=session_options,
+        io_binding=io_binding,
+    )
+    for _ in range(warmup):
+        detector.detect_tracking(frame, input_size=input_size)
+    start = time.perf_counter()
+    for _ in range(iters):
+        detector.detect_tracking(frame, input_size=input_size)
+    return 1000.0 * (time.perf_counter() - start) / iters
+
+
+def autotune(
+    config, budget_ms, input_size=(128, 128), frame=None, iters=20, weights_dir=WEIGHTS_DIR
+):
+    """
+    Time every available model and pick the most accurate one within budget.
+
+    If no model fits the budget, the fastest one is picked. The choice is
+    saved next to the weights.
+
+    Args:
+        config (dict): The tracking configuration, for the session settings.
+        budget_ms (float): Latency allowed for detecting one frame.
+        input_size (tuple): Detector input as (width, height).
+        frame (numpy.ndarray): Frame to time on, a random 640x480 frame if None.
+        iters (int): Timed detections per model.
+        weights_dir (str): Directory holding the ONNX files.
+
+    Returns:
+        dict: The saved choice with the model name and all timings.
+    """
+    names = available_models(weights_dir)
+    if not names:
+        raise FileNotFoundError(f"no SCRFD weights found in {weights_dir}")
+    if frame is None:
+        frame = np.random.default_rng(0).integers(0, 255, (480, 640, 3), dtype=np.uint8)
+
+    latency_ms = {
+        name: time_model(name, config, frame, input_size, iters, weights_dir=weights_dir)
+        for name in names
+    }
+    # `names` is sorted most accurate first
+    fitting = [name for name in names if latency_ms[name] <= budget_ms]
+    model = fitting[0] if fitting else min(names, key=latency_ms.get)
+
+    choice = {
+        "model": model,
+        "budget_ms": budget_ms,
+        "input_size": list(input_size),
+        "latency_ms": {name: round(ms, 3) for name, ms in latency_ms.items()},
+        "fingerprint": machine_fingerprint(),
+    }
+    save_choice(choice, weights_dir)
+    return choice
+
+
+def resolve_model_file(config, weights_dir=WEIGHTS_DIR):
+    """
+    Weights selected by the `detector_model` key of the tracking YAML.
+
+    Args:
+        config (dict): The tracking configuration.
+        weights_dir (str): Directory holding the ONNX files.
+
+    Returns:
+        str: Path to the ONNX model.
+    """
+    name = config.get("detector_model", "2.5g")
+    if name != "auto":
+        return model_path(name, weights_dir)
+
+    budget_ms = config.get("detector_budget_ms", 15.0)
+    input_size = tuple(config.get("detector_tune_input_size", (128, 128)))
+    choice = load_choice(weights_dir)
+    stale = (
+        choice is None
+        or choice["fingerprint"] != machine_fingerprint()
+        or choice["budget_ms"] != budget_ms
+        or tuple(choice["input_size"]) != input_size
+        or choice["model"] not in available_models(weights_dir)
+    )
+    if stale:
+        choice = autotune(config, budget_ms, input_size, weights_dir=weights_dir)
+        print(f"Detector auto-tuned to SCRFD {choice['model']}: {choice['latency_ms']} ms")
+    return model_path(choice["model"], weights_dir)
+
+
+def main(config, budget_ms, input_size, image, iters, weights_dir):
+    with open(config) as f:
+        config = yaml.safe_load(f)
+    if budget_ms is None:
+        budget_ms = config.get("detector_budget_ms", 15.0)
+    if input_size is None:
+        input_size = tuple(config.get("detector_tune_input_size", (128, 128)))
+    else:
+        input_size = (input_size, input_size)
+    frame = cv2.imread(image) if image else None
+
+    choice = autotune(config, budget_ms, input_size, frame, iters, weights_dir)
+    print(f"{'model':>6} {'hard AP':>8} {'ms/frame':>9}")
+    for name, ms in choice["latency_ms"].items():
+        marker = "  <- chosen" if name == choice["model"] else ""
+        print(f"{name:>6} {SCRFD_MODELS[name]['wider_hard_ap']:>8.2f} {ms:>9.3f}{marker}")
+    print(f"Saved to {osp.join(weights_dir, CHOICE_FILE)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--config", type=str, default="face_tracking/config/config_tracking.yaml"
+    )
+    parser.add_argument(
+        "--budget-ms", type=float, default=None, help="Defaults to detector_budget_ms."
+    )
+    parser.add_argument(
+        "--input-size", type=int, default=None, help="Defaults to detector_tune_input_size."
+    )
+    parser.add_argument("--image", type=str, default=None, help="Frame to time on.")
+    parser.add_argument("--iters", type=int, default=20)
+    parser.add_argument("--weights-dir", type=str, default=WEIGHTS_DIR)
+    opt = parser.parse_args()
+
+    main(**vars(opt))
@@ -0,0 +1,108 @@
+"""
+ONNX Runtime session setup for the SCRFD detector.
+
+The tracking YAML configures the session through a `detector_session`
+mapping, for example:
+
+    detector_session:
+      intra_op_threads: 2      # 0 lets ONNX Runtime pick one per physical core
+      inter_op_threads: 1
+      execution_mode: sequential  # or parallel
+      enable_mem_arena: true
+      optimized_cache: true    # save the optimized graph next to the model
+      io_binding: true         # run into preallocated input/output buffers
+"""
+import os
+import os.path as osp
+
+import onnxruntime
+
+EXECUTION_MODES = {
+    "sequential": onnxruntime.ExecutionMode.ORT_SEQUENTIAL,
+    "parallel": onnxruntime.ExecutionMode.ORT_PARALLEL,
+}
+
+
+def optimized_path_for(model_file):
+    """Path of the cached, already optimized copy of a model."""
+    return osp.splitext(model_file)[0] + ".ort.onnx"
+
+
+def create_session(
+    model_file,
+    intra_op_threads=0,
+    inter_op_threads=1,
+    execution_mode="sequential",
+    enable_mem_arena=True,
+    optimized_cache=True,
+    providers=None,
+):
+    """
+    Create a tuned inference session.
+
+    With `optimized_cache` the graph is optimized with ORT_ENABLE_EXTENDED
+    once and saved next to the model; later sessions load the saved graph and
+    only run the layout passes of ORT_ENABLE_ALL. Those passes fuse nodes for
+    the local CPU, so they are never saved and the cache stays valid when the
+    weights directory is copied to another machine. The cache is rebuilt when
+    the model is newer.
+
+    Args:
+        model_file (str): Path to the ONNX model.
+        intra_op_threads (int): Threads used inside an operator, 0 for the default.
+        inter_op_threads (int): Threads used across operators in parallel mode.
+        execution_mode (str): "sequential" or "parallel".
+        enable_mem_arena (bool): Keep ONNX Runtime's CPU memory arena.
+        optimized_cache (bool): Save and reuse the optimized graph.
+        providers (list): Execution providers, CPU by default.
+
+    Returns:
+        onnxruntime.InferenceSession: The session.
+    """
+    options = onnxruntime.SessionOptions()
+    options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+    options.execution_mode = EXECUTION_MODES[execution_mode]
+    options.intra_op_num_threads = intra_op_threads
+    options.inter_op_num_threads = inter_op_threads
+    options.enable_cpu_mem_arena = enable_mem_arena
+
+    if providers is None:
+        providers = ["CPUExecutionProvider"]
+
+    if not optimized_cache:
+        return onnxruntime.InferenceSession(model_file, sess_options=options, providers=providers)
+
+    cached_file = optimized_path_for(model_file)
+    if not osp.exists(cached_file) or osp.getmtime(cached_file) < osp.getmtime(model_file):
+        # Save the portable optimizations only, written to a temporary file so
+        # a crash never leaves a truncated cache
+        tmp_file = cached_file + ".tmp"
+        save_options = onnxruntime.SessionOptions()
+        save_options.graph_optimization_level = (
+            onnxruntime.GraphOptimizationLevel.ORT_ENABLE_EXTENDED
+        )
+        save_options.optimized_model_filepath = tmp_file
+        onnxruntime.InferenceSession(model_file, sess_options=save_options, providers=providers)
+        if not osp.exists(tmp_file):
+            return onnxruntime.InferenceSession(
+                model_file, sess_options=options, providers=providers
+            )
+        os.replace(tmp_file, cached_file)
+
+    # The remaining passes of ORT_ENABLE_ALL are the hardware specific ones
+    return onnxruntime.InferenceSession(cached_file, sess_options=options, providers=providers)
+
+
+def session_config_from(config):
+    """
+    Split the `detector_session` mapping of the tracking YAML.
+
+    Args:
+        config (dict): The tracking configuration.
+
+    Returns:
+        tuple: Keyword arguments for `create_session` and the IO binding flag.
+    """
+    session_config = dict(config.get("detector_session") or {})
+    io_binding = bool(session_config.pop("io_binding", False))
+    return session_config, io_binding
@@ -0,0 +1,308 @@
+"""
+Nearest-neighbour indexes over L2-normalized face embeddings.
+
+Every index maps integer ids to embeddings and shares one small API:
+`add(ids, embs)`, `remove(ids)`, `search(queries, k)`, `save(path)` and
+`load(path)`. Scores are cosine similarities, best first.
+
+- `ExactIndex`: brute-force matmul, the reference for recall.
+- `IVFFlatIndex`: inverted file with a k-means coarse quantizer, built in-repo.
+- `HNSWIndex`: graph index backed by the optional `hnswlib` package.
+"""
+import numpy as np
+
+try:
+    import hnswlib
+except ImportError:  # pragma: no cover - optional dependency
+    hnswlib = None
+
+
+def _topk(ids, scores, k):
+    """Sort the best k (id, score) pairs of one query, padding with -1."""
+    out_ids = np.full(k, -1, dtype=np.int64)
+    out_scores = np.full(k, -np.inf, dtype=np.float32)
+    n = min(k, len(scores))
+    if n > 0:
+        top = np.argpartition(-scores, n - 1)[:n] if n < len(scores) else np.arange(n)
+        top = top[np.argsort(-scores[top])]
+        out_ids[:n] = ids[top]
+        out_scores[:n] = scores[top]
+    return out_ids, out_scores
+
+
+class ExactIndex:
+    """Brute-force inner product search."""
+
+    kind = "exact"
+
+    def __init__(self, dim=512):
+        self.dim = dim
+        self.ids = np.empty(0, dtype=np.int64)
+        self.embs = np.empty((0, dim), dtype=np.float32)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, ids, embs):
+        self.ids = np.concatenate([self.ids, np.asarray(ids, dtype=np.int64)])
+        self.embs = np.ascontiguousarray(
+            np.concatenate([self.embs, np.asarray(embs, dtype=np.float32)])
+        )
+
+    def remove(self, ids):
+        keep = ~np.isin(self.ids, ids)
+        self.ids, self.embs = self.ids[keep], self.embs[keep]
+
+    def search(self, queries, k=1):
+        sims = np.asarray(queries, dtype=np.float32) @ self.embs.T
+        results = [_topk(self.ids, row, k) for row in sims]
+        return np.array([r[0] for r in results]), np.array([r[1] for r in results])
+
+    def save(self, path):
+        # A file object keeps numpy from appending ".npz" to the path
+        with open(path, "wb") as f:
+            np.savez(f, kind=self.kind, dim=self.dim, ids=self.ids, embs=self.embs)
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        index = cls(int(data["dim"]))
+        index.add(data["ids"], data["embs"])
+        return index
+
+
+class IVFFlatIndex:
+    """Inverted file index with uncompressed (flat) lists.
+
+    A spherical k-means quantizer splits the gallery into `nlist` cells and a
+    query only scans the `nprobe` closest cells. Until `min_train_size`
+    embeddings have been added the index holds a single cell, i.e. it behaves
+    like exact search, and it trains itself automatically once enough data is
+    available.
+    """
+
+    kind = "ivf"
+
+    def __init__(self, dim=512, nlist=64, nprobe=8, min_train_size=None, seed=0):
+        self.dim = dim
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.min_train_size = 39 * nlist if min_train_size is None else min_train_size
+        self.seed = seed
+        self.centroids = None
+        self.list_ids = [np.empty(0, dtype=np.int64)]
+        self.list_embs = [np.empty((0, dim), dtype=np.float32)]
+        self.id_to_list = {}
+
+    def __len__(self):
+        return len(self.id_to_list)
+
+    @property
+    def is_trained(self):
+        return self.centroids is not None
+
+    def train(self, embs, iters=10):
+        """Fit the coarse quantizer with spherical k-means and re-bucket all lists."""
+        embs = np.asarray(embs, dtype=np.float32)
+        rng = np.random.default_rng(self.seed)
+        nlist = min(self.nlist, len(embs))
+        centroids = embs[rng.choice(len(embs), nlist, replace=False)].copy()
+        for _ in range(iters):
+            assign = np.argmax(embs @ centroids.T, axis=1)
+            for c in range(nlist):
+                members = embs[assign == c]
+                if len(members):
+                    centroids[c] = members.sum(axis=0)
+            centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+
+        ids = np.concatenate(self.list_ids)
+        all_embs = np.concatenate(self.list_embs)
+        self.centroids = centroids
+        self.list_ids = [np.empty(0, dtype=np.int64) for _ in range(nlist)]
+        self.list_embs = [np.empty((0, self.dim), dtype=np.float32) for _ in range(nlist)]
+        self.id_to_list = {}
+        if len(ids):
+            self._insert(ids, all_embs)
+
+    def _assign(self, embs):
+        if self.centroids is None:
+            return np.zeros(len(embs), dtype=np.int64)
+        return np.argmax(embs @ self.centroids.T, axis=1)
+
+    def _insert(self, ids, embs):
+        assign = self._assign(embs)
+        for c in np.unique(assign):
+            mask = assign == c
+            self.list_ids[c] = np.concatenate([self.list_ids[c], ids[mask]])
+            self.list_embs[c] = np.concatenate([self.list_embs[c], embs[mask]])
+            self.id_to_list.update(dict.fromkeys(ids[mask].tolist(), int(c)))
+
+    def add(self, ids, embs):
+        ids = np.asarray(ids, dtype=np.int64)
+        embs = np.asarray(embs, dtype=np.float32)
+        self._insert(ids, embs)
+        if not self.is_trained and len(self) >= self.min_train_size:
+            self.train(np.concatenate(self.list_embs))
+
+    def remove(self, ids):
+        for c in {self.id_to_list.pop(int(i)) for i in ids if int(i) in self.id_to_list}:
+            keep = ~np.isin(self.list_ids[c], ids)
+            self.list_ids[c] = self.list_ids[c][keep]
+            self.list_embs[c] = self.list_embs[c][keep]
+
+    def search(self, queries, k=1):
+        queries = np.asarray(queries, dtype=np.float32)
+        if self.centroids is None:
+            probes = np.zeros((len(queries), 1), dtype=np.int64)
+        else:
+            nprobe = min(self.nprobe, len(self.centroids))
+            probes = np.argpartition(-(queries @ self.centroids.T), nprobe - 1, axis=1)
+            probes = probes[:, :nprobe]
+
+        out_ids = np.empty((len(queries), k), dtype=np.int64)
+        out_scores = np.empty((len(queries), k), dtype=np.float32)
+        for i, query in enumerate(queries):
+            ids = np.concatenate([self.list_ids[c] for c in probes[i]])
+            embs = np.concatenate([self.list_embs[c] for c in probes[i]])
+            out_ids[i], out_scores[i] = _topk(ids, embs @ query, k)
+        return out_ids, out_scores
+
+    def save(self, path):
+        sizes = np.array([len(ids) for ids in self.list_ids], dtype=np.int64)
+        params = np.array([self.dim, self.nlist, self.nprobe, self.min_train_size, self.seed])
+        centroids = self.centroids
+        if centroids is None:
+            centroids = np.empty((0, self.dim), dtype=np.float32)
+        with open(path, "wb") as f:
+            np.savez(
+                f,
+                kind=self.kind,
+                params=params,
+                centroids=centroids,
+                sizes=sizes,
+                ids=np.concatenate(self.list_ids),
+                embs=np.concatenate(self.list_embs),
+            )
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        dim, nlist, nprobe, min_train_size, seed = (int(v) for v in data["params"])
+        index = cls(dim, nlist, nprobe, min_train_size, seed)
+        if len(data["centroids"]):
+            index.centroids = data["centroids"]
+        bounds = np.cumsum(data["sizes"])[:-1]
+        index.list_ids = np.split(data["ids"], bounds)
+        index.list_embs = np.split(data["embs"], bounds)
+        for c, ids in enumerate(index.list_ids):
+            index.id_to_list.update(dict.fromkeys(ids.tolist(), c))
+        return index
+
+
+class HNSWIndex:
+    """Hierarchical navigable small world graph backed by `hnswlib`.
+
+    Deleted ids are only marked deleted in the graph; their ids are kept in a
+    sidecar `<path>.deleted.npy` file when the index is saved.
+    """
+
+    kind = "hnsw"
+
+    def __init__(self, dim=512, M=16, ef_construction=200, ef=64, capacity=1024):
+        if hnswlib is None:
+            raise ImportError("HNSWIndex requires the optional 'hnswlib' package")
+        self.dim = dim
+        self.ef = ef
+        self.deleted = set()
+        self.index = hnswlib.Index(space="ip", dim=dim)
+        self.index.init_index(max_elements=capacity, M=M, ef_construction=ef_construction)
+        self.index.set_ef(ef)
+
+    def __len__(self):
+        return self.index.element_count - len(self.deleted)
+
+    def add(self, ids, embs):
+        ids = np.asarray(ids, dtype=np.int64)
+        for i in self.deleted.intersection(ids.tolist()):
+            self.index.unmark_deleted(i)
+            self.deleted.discard(i)
+        needed = self.index.element_count + len(ids)
+        if needed > self.index.max_elements:
+            self.index.resize_index(max(needed, 2 * self.index.max_elements))
+        self.index.add_items(np.asarray(embs, dtype=np.float32), ids)
+
+    def remove(self, ids):
+        for i in np.asarray(ids, dtype=np.int64).tolist():
+            if i not in self.deleted:
+                self.index.mark_deleted(i)
+                self.deleted.add(i)
+
+    def search(self, queries, k=1):
+        k_avail = min(k, len(self))
+        out_ids = np.full((len(queries), k), -1, dtype=np.int64)
+        out_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        if k_avail > 0:
+            self.index.set_ef(max(self.ef, k_avail))
+            labels, distances = self.index.knn_query(np.asarray(queries, np.float32), k=k_avail)
+            out_ids[:, :k_avail] = labels
+            # hnswlib's "ip" space returns 1 - inner product
+            out_scores[:, :k_avail] = 1.0 - distances
+        return out_ids, out_scores
+
+    def save(self, path):
+        self.index.save_index(path)
+        np.save(path + ".deleted.npy", np.array(sorted(self.deleted), dtype=np.int64))
+
+    @classmethod
+    def load(cls, path, dim=512, ef=64):
+        if hnswlib is None:
+            raise ImportError("HNSWIndex requires the optional 'hnswlib' package")
+        index = cls.__new__(cls)
+        index.dim = dim
+        index.ef = ef
+        index.index = hnswlib.Index(space="ip", dim=dim)
+        index.index.load_index(path)
+        index.index.set_ef(ef)
+        index.deleted = set(np.load(path + ".deleted.npy").tolist())
+        return index
+
+
+INDEXES = {
+    ExactIndex.kind: ExactIndex,
+    IVFFlatIndex.kind: IVFFlatIndex,
+    HNSWIndex.kind: HNSWIndex,
+}
+
+
+def make_index(kind="exact", dim=512, **kwargs):
+    """
+    Create an empty nearest-neighbour index.
+
+    Args:
+        kind (str): "exact", "ivf" or "hnsw".
+        dim (int): Embedding dimension.
+        **kwargs: Index specific parameters.
+
+    Returns:
+        The index.
+    """
+    if kind not in INDEXES:
+        raise ValueError(f"unknown index kind: {kind}")
+    return INDEXES[kind](dim=dim, **kwargs)
+
+
+def load_index(path, kind, **kwargs):
+    """
+    Load an index saved with `save`.
+
+    Args:
+        path (str): Path the index was saved to.
+        kind (str): "exact", "ivf" or "hnsw".
+        **kwargs: Extra load parameters (`dim`, `ef` for HNSW).
+
+    Returns:
+        The index.
+    """
+    if kind not in INDEXES:
+        raise ValueError(f"unknown index kind: {kind}")
+    return INDEXES[kind].load(path, **kwargs)
@@ -0,0 +1,84 @@
+"""
+Compare ArcFace recognizer latency per face between the torch and ONNX backends.
+
+Run from the Capture directory:
+
+    python -m face_recognition.arcface.benchmark --model-name r100 --batch-sizes 1 4
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import torch
+
+from face_recognition.arcface.model import iresnet_build, iresnet_inference
+
+
+def time_backend(recognizer, batch, iters, warmup=3):
+    """
+    Time a recognizer on a fixed batch.
+
+    Args:
+        recognizer: The torch model or ONNX recognizer.
+        batch (torch.Tensor): Input batch of shape (N, 3, 112, 112).
+        iters (int): Number of timed iterations.
+        warmup (int): Number of untimed iterations.
+
+    Returns:
+        float: Mean latency per face in milliseconds.
+    """
+    with torch.no_grad():
+        for _ in range(warmup):
+            recognizer(batch)
+        start = time.perf_counter()
+        for _ in range(iters):
+            recognizer(batch)
+        elapsed = time.perf_counter() - start
+
+    return 1000.0 * elapsed / (iters * batch.shape[0])
+
+
+def main(model_name, weights, batch_sizes, threads, iters):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if weights is None or not os.path.exists(weights):
+            # Latency does not depend on the weight values
+            print(f"Weights not found, benchmarking a randomly initialized {model_name}")
+            weights = os.path.join(tmp_dir, f"arcface_{model_name}.pth")
+            torch.save(iresnet_build(model_name).state_dict(), weights)
+
+        if threads > 0:
+            torch.set_num_threads(threads)
+
+        backends = {
+            "torch": iresnet_inference(model_name, weights, device="cpu"),
+            "onnx": iresnet_inference(
+                model_name, weights, device="cpu", backend="onnx", num_threads=threads
+            ),
+        }
+
+        print(f"{'batch':>6} " + " ".join(f"{name:>12}" for name in backends) + "  (ms/face)")
+        for batch_size in batch_sizes:
+            batch = torch.from_numpy(
+                np.random.uniform(-1, 1, (batch_size, 3, 112, 112)).astype(np.float32)
+            )
+            latencies = [time_backend(r, batch, iters) for r in backends.values()]
+            print(f"{batch_size:>6} " + " ".join(f"{ms:>12.2f}" for ms in latencies))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model-name", type=str, default="r100", help="r18, r34, r50 or r100.")
+    parser.add_argument(
+        "--weights",
+        type=str,
+        default=None,
+        help="Path to the .pth weights (random weights are used if missing).",
+    )
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--threads", type=int, default=0, help="Intra-op threads, 0 = default.")
+    parser.add_argument("--iters", type=int, default=20)
+    opt = parser.parse_args()
+
+    main(**vars(opt))
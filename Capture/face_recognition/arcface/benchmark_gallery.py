@@ -0,0 +1,107 @@
+"""
+Recall@1 vs. latency of the ANN gallery backends against exact search.
+
+The embeddings enrolled in the gallery store seed a synthetic gallery:
+each seed and each extra random identity gets several noisy samples, and
+queries are fresh noisy samples of random identities. Run from the Capture
+directory:
+
+    python -m face_recognition.arcface.benchmark_gallery --sizes 10000 50000
+"""
+import argparse
+import os.path as osp
+import time
+
+import numpy as np
+
+from face_recognition.arcface.ann import hnswlib
+from face_recognition.arcface.gallery import FaceGallery, l2_normalize
+from face_recognition.arcface.gallery_store import MANIFEST_FILE, GalleryStore
+
+
+def synthetic_gallery(seed_embs, size, samples_per_person, noise, rng):
+    """
+    Build a gallery of `size` embeddings around the seed identities.
+
+    Returns:
+        tuple: Person centers (P, D), names (size,) and embeddings (size, D).
+    """
+    num_persons = max(size // samples_per_person, len(seed_embs))
+    extra = rng.normal(size=(num_persons - len(seed_embs), seed_embs.shape[1]))
+    centers = l2_normalize(np.vstack([seed_embs, extra]))
+
+    person_idx = np.arange(size) % num_persons
+    embs = centers[person_idx] + noise * rng.normal(size=(size, centers.shape[1]))
+    names = np.array([f"person_{i}" for i in person_idx])
+    return centers, names, l2_normalize(embs)
+
+
+def time_search(gallery, queries, batch):
+    """Return the top-1 names and the mean latency per query batch in ms."""
+    names = []
+    start = time.perf_counter()
+    for i in range(0, len(queries), batch):
+        names.append(gallery.search(queries[i : i + batch], k=1)[0][:, 0])
+    elapsed = time.perf_counter() - start
+    return np.concatenate(names), 1000.0 * elapsed / -(-len(queries) // batch)
+
+
+def main(gallery_dir, sizes, queries, batch, noise, nlist, nprobes, seed):
+    rng = np.random.default_rng(seed)
+    store = None
+    if osp.exists(osp.join(gallery_dir, MANIFEST_FILE)):
+        store = GalleryStore.open(gallery_dir)
+    if store is not None and len(store):
+        seed_embs = np.array(store.embeddings)
+    else:
+        print(f"No enrolled faces in {gallery_dir}, using random seeds")
+        seed_embs = rng.normal(size=(4, 512))
+
+    configs = [(f"ivf nprobe={p}", "ivf", {"nlist": nlist, "nprobe": p}) for p in nprobes]
+    if hnswlib is not None:
+        configs.append(("hnsw", "hnsw", {}))
+    else:
+        print("hnswlib not installed, skipping the HNSW backend")
+
+    print(f"{'size':>8} {'backend':>16} {'build s':>9} {'ms/batch':>9} {'recall@1':>9}")
+    for size in sizes:
+        centers, names, embs = synthetic_gallery(seed_embs, size, 5, noise, rng)
+        person = rng.integers(0, len(centers), queries)
+        query_embs = l2_normalize(centers[person] + noise * rng.normal(size=(queries, embs.shape[1])))
+
+        exact = FaceGallery()
+        exact.add(names, embs)
+        truth, exact_ms = time_search(exact, query_embs, batch)
+        print(f"{size:>8} {'exact':>16} {'':>9} {exact_ms:>9.3f} {1.0:>9.3f}")
+
+        for label, kind, params in configs:
+            start = time.perf_counter()
+            gallery = FaceGallery(index=kind, index_params=params)
+            # Insert incrementally, the way enrollment grows the gallery
+            for i in range(0, size, 1000):
+                gallery.add(names[i : i + 1000], embs[i : i + 1000])
+            build_s = time.perf_counter() - start
+
+            found, ms = time_search(gallery, query_embs, batch)
+            recall = np.mean(found == truth)
+            print(f"{size:>8} {label:>16} {build_s:>9.2f} {ms:>9.3f} {recall:>9.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--gallery-dir",
+        type=str,
+        default="./datasets/face_features/gallery",
+        help="Gallery store whose enrolled faces are the seed identities.",
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 50000])
+    parser.add_argument("--queries", type=int, default=400)
+    parser.add_argument("--batch", type=int, default=4, help="Faces searched per call.")
+    parser.add_argument("--noise", type=float, default=0.04, help="Per-dimension sample noise.")
+    parser.add_argument("--nlist", type=int, default=256)
+    parser.add_argument("--nprobes", type=int, nargs="+", default=[4, 16])
+    parser.add_argument("--seed", type=int, default=0)
+    opt = parser.parse_args()
+
+    main(**vars(opt))
@@ -0,0 +1,299 @@
+import copy
+
+import numpy as np
+
+from face_recognition.arcface.ann import load_index, make_index
+
+# Shard used for embeddings enrolled without a patient / user_id
+DEFAULT_SHARD = "default"
+
+
+def l2_normalize(embs):
+    """Return a contiguous float32 copy of `embs` with unit-length rows."""
+    embs = np.array(embs, dtype=np.float32, ndmin=2, order="C")
+    norms = np.linalg.norm(embs, axis=1, keepdims=True)
+    np.maximum(norms, 1e-12, out=norms)
+    embs /= norms
+    return embs
+
+
+class GalleryShard:
+    """Exact search over the embeddings of one patient's contacts.
+
+    Rows are grouped by person so per-person max pooling is a single
+    `np.maximum.reduceat` over the similarity matrix.
+    """
+
+    def __init__(self, names, embs):
+        names = np.asarray(names).astype(str)
+        embs = l2_normalize(embs)
+        assert len(names) == len(embs)
+
+        # Group rows of the same person together, keeping enrollment order
+        self.person_names, person_idx = np.unique(names, return_inverse=True)
+        order = np.argsort(person_idx, kind="stable")
+        self.names = names[order]
+        self.embs = np.ascontiguousarray(embs[order])
+        self.person_starts = np.searchsorted(person_idx[order], np.arange(len(self.person_names)))
+
+    def __len__(self):
+        return len(self.embs)
+
+    @property
+    def dim(self):
+        return self.embs.shape[1]
+
+    def add(self, names, embs):
+        """Enroll more embeddings, rebuilding the grouped arrays."""
+        self.__init__(np.concatenate([self.names, names]), np.concatenate([self.embs, embs]))
+
+    def remove(self, name):
+        """Drop every embedding of a person."""
+        keep = self.names != name
+        self.__init__(self.names[keep], self.embs[keep])
+
+    def person_scores(self, queries):
+        """
+        Score every query against every person of the shard.
+
+        Args:
+            queries (numpy.ndarray): Array of shape (M, D) with normalized embeddings.
+
+        Returns:
+            numpy.ndarray: Array of shape (M, P) with the best cosine per person.
+        """
+        sims = queries @ self.embs.T
+        return np.maximum.reduceat(sims, self.person_starts, axis=1)
+
+    def search(self, queries, k=1):
+        """
+        Find the k best matching persons for each query.
+
+        Args:
+            queries (numpy.ndarray): Array of shape (M, D) with normalized embeddings.
+            k (int): Number of persons to return per query.
+
+        Returns:
+            tuple: Names of shape (M, k') and scores of shape (M, k'), best first,
+            where k' = min(k, number of persons).
+        """
+        if len(self) == 0:
+            return np.empty((len(queries), 0), dtype=str), np.empty((len(queries), 0), np.float32)
+
+        pooled = self.person_scores(queries)
+        k = min(k, pooled.shape[1])
+        if k < pooled.shape[1]:
+            top = np.argpartition(-pooled, k - 1, axis=1)[:, :k]
+        else:
+            top = np.broadcast_to(np.arange(k), (len(pooled), k))
+        top_scores = np.take_along_axis(pooled, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        return self.person_names[top], np.take_along_axis(top_scores, order, axis=1)
+
+
+class ANNGalleryShard:
+    """Approximate search over one patient's contacts through an ANN index.
+
+    The index returns the best `candidates` embeddings per query, which are
+    then max pooled per person. Inserts and deletes are incremental.
+    """
+
+    def __init__(self, names, embs, index="ivf", candidates=32, **index_params):
+        embs = l2_normalize(embs)
+        self.index = make_index(index, dim=embs.shape[1], **index_params)
+        self.candidates = candidates
+        self.id_names = np.empty(0, dtype=str)
+        self.add(names, embs)
+
+    def __len__(self):
+        return len(self.index)
+
+    @property
+    def dim(self):
+        return self.index.dim
+
+    @property
+    def person_names(self):
+        return np.unique(self.id_names[self.id_names != ""])
+
+    def add(self, names, embs):
+        """Enroll more embeddings into the index."""
+        names = np.asarray(names).astype(str)
+        ids = np.arange(len(self.id_names), len(self.id_names) + len(names))
+        self.id_names = np.concatenate([self.id_names, names])
+        if len(names):
+            self.index.add(ids, l2_normalize(embs))
+
+    def remove(self, name):
+        """Drop every embedding of a person."""
+        ids = np.flatnonzero(self.id_names == name)
+        self.index.remove(ids)
+        # Ids are never reused, a blank name marks them as deleted
+        self.id_names[ids] = ""
+
+    def search(self, queries, k=1):
+        """Same contract as `GalleryShard.search`."""
+        ids, scores = self.index.search(queries, min(len(self), max(self.candidates, k)))
+
+        out_names = np.full((len(queries), k), "", dtype=object)
+        out_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        k_found = 0
+        for i in range(len(queries)):
+            best = {}
+            for idx, score in zip(ids[i], scores[i]):
+                if idx >= 0:
+                    name = self.id_names[idx]
+                    if score > best.get(name, -np.inf):
+                        best[name] = score
+            ranked = sorted(best.items(), key=lambda item: -item[1])[:k]
+            k_found = max(k_found, len(ranked))
+            for j, (name, score) in enumerate(ranked):
+                out_names[i, j], out_scores[i, j] = name, score
+
+        return out_names[:, :k_found].astype(str), out_scores[:, :k_found]
+
+    def save(self, path):
+        """Persist the index and the id to name table under a path prefix."""
+        self.index.save(path + ".index")
+        np.savez(
+            path,
+            id_names=self.id_names,
+            kind=self.index.kind,
+            candidates=self.candidates,
+            dim=self.dim,
+        )
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path + ".npz")
+        shard = cls.__new__(cls)
+        shard.id_names = data["id_names"]
+        shard.candidates = int(data["candidates"])
+        kind = str(data["kind"])
+        # Exact and IVF files carry their dimension, an HNSW file does not
+        kwargs = {"dim": int(data["dim"])} if kind == "hnsw" else {}
+        shard.index = load_index(path + ".index", kind, **kwargs)
+        return shard
+
+
+class FaceGallery:
+    """Enrolled face embeddings sharded by patient (`user_id`).
+
+    A camera serving one patient only searches that patient's shard, so query
+    cost does not grow with the number of patients served by the service.
+    """
+
+    def __init__(self, dim=512, index="exact", index_params=None):
+        self.dim = dim
+        self.index = index
+        self.index_params = index_params or {}
+        self.shards = {}
+
+    def _make_shard(self, names, embs):
+        if self.index == "exact":
+            return GalleryShard(names, embs)
+        return ANNGalleryShard(names, embs, index=self.index, **self.index_params)
+
+    def __len__(self):
+        return sum(len(shard) for shard in self.shards.values())
+
+    def __contains__(self, user_id):
+        return user_id in self.shards
+
+    @classmethod
+    def from_store(cls, store, index="exact", index_params=None):
+        """
+        Build a gallery from a `GalleryStore`.
+
+        The store's embeddings are memory-mapped, only the shards hold copies.
+
+        Args:
+            store (GalleryStore): The opened gallery store.
+            index (str): Search backend, "exact", "ivf" or "hnsw".
+            index_params (dict): Parameters of the ANN index.
+
+        Returns:
+            FaceGallery: The gallery.
+        """
+        gallery = cls(dim=store.dim, index=index, index_params=index_params)
+        if len(store):
+            gallery.add(store.names, store.embeddings, store.user_ids)
+        return gallery
+
+    def add(self, names, embs, user_ids=DEFAULT_SHARD):
+        """
+        Enroll embeddings into their patients' shards.
+
+        Args:
+            names (array-like): Person name of each embedding.
+            embs (numpy.ndarray): Array of shape (N, D) with the embeddings.
+            user_ids (str | array-like): Shard of each embedding, or one for all.
+        """
+        names = np.asarray(names).astype(str)
+        embs = np.asarray(embs).reshape(len(names), -1)
+        user_ids = np.broadcast_to(np.asarray(user_ids, dtype=object), names.shape)
+
+        for user_id in set(user_ids):
+            mask = user_ids == user_id
+            shard = self.shards.get(user_id)
+            if shard is not None:
+                shard.add(names[mask], embs[mask])
+            else:
+                self.shards[user_id] = self._make_shard(names[mask], embs[mask])
+
+    def added(self, names, embs, user_ids=DEFAULT_SHARD):
+        """
+        Return a copy of the gallery with more embeddings, leaving this one as is.
+
+        Shards that receive no embeddings are shared with the copy, so running
+        searches on this gallery are never affected.
+
+        Args:
+            names (array-like): Person name of each embedding.
+            embs (numpy.ndarray): Array of shape (N, D) with the embeddings.
+            user_ids (str | array-like): Shard of each embedding, or one for all.
+
+        Returns:
+            FaceGallery: The new gallery.
+        """
+        gallery = copy.copy(self)
+        gallery.shards = dict(self.shards)
+        touched = np.broadcast_to(np.asarray(user_ids, dtype=object), (len(names),))
+        for user_id in set(touched):
+            if user_id in gallery.shards:
+                gallery.shards[user_id] = copy.deepcopy(gallery.shards[user_id])
+        gallery.add(names, embs, user_ids)
+        return gallery
+
+    def remove(self, name, user_id=None):
+        """
+        Delete every embedding of a person from a patient's shard.
+
+        Args:
+            name (str): The person to delete.
+            user_id (str): Patient shard, None for the default shard.
+        """
+        shard = self.shards.get(DEFAULT_SHARD if user_id is None else user_id)
+        if shard is not None:
+            shard.remove(name)
+
+    def search(self, queries, k=1, user_id=None):
+        """
+        Find the k best matching persons for a batch of queries.
+
+        Args:
+            queries (numpy.ndarray): Array of shape (M, D) or (D,) with embeddings.
+            k (int): Number of persons to return per query.
+            user_id (str): Patient whose contacts are searched, None for the
+                default shard.
+
+        Returns:
+            tuple: Names of shape (M, k') and scores of shape (M, k'), best first.
+            Both are empty when the shard does not exist.
+        """
+        queries = l2_normalize(queries)
+        shard = self.shards.get(DEFAULT_SHARD if user_id is None else user_id)
+        if shard is None:
+            return np.empty((len(queries), 0), dtype=str), np.empty((len(queries), 0), np.float32)
+        return shard.search(queries, k)
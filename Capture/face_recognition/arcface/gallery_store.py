@@ -0,0 +1,322 @@
+"""
+Append-only on-disk store of enrolled face embeddings.
+
+A store is a directory with three files:
+
+- `embeddings.f32`: raw little-endian float32 rows of L2-normalized
+  embeddings, only ever appended to and opened with `np.memmap`.
+- `table.tsv`: one `name<TAB>user_id` line per embedding row.
+- `manifest.json`: format, dimension, committed row count, table size in
+  bytes and a version that increases with every append.
+
+The manifest is replaced atomically after the data has been written, so a
+reader always sees a consistent prefix of the files and a crash in the middle
+of an enrollment loses only that enrollment. Migrate an existing
+`feature.npz` with:
+
+    python -m face_recognition.arcface.gallery_store \
+        --features-path ./datasets/face_features/feature \
+        --gallery-dir ./datasets/face_features/gallery
+"""
+import argparse
+import json
+import os
+import os.path as osp
+import threading
+
+import numpy as np
+
+from face_recognition.arcface.gallery import DEFAULT_SHARD, FaceGallery, l2_normalize
+
+FORMAT_VERSION = 1
+EMBEDDINGS_FILE = "embeddings.f32"
+TABLE_FILE = "table.tsv"
+MANIFEST_FILE = "manifest.json"
+
+
+class GalleryStore:
+    """Read and append enrolled embeddings in a gallery directory."""
+
+    def __init__(self, gallery_dir, manifest):
+        self.gallery_dir = gallery_dir
+        self.manifest = manifest
+        self._lock = threading.Lock()
+        self._load()
+
+    @property
+    def dim(self):
+        return self.manifest["dim"]
+
+    @property
+    def version(self):
+        return self.manifest["version"]
+
+    def __len__(self):
+        return self.manifest["count"]
+
+    @classmethod
+    def create(cls, gallery_dir, dim=512):
+        """Create an empty store, or open it if it already exists."""
+        if osp.exists(osp.join(gallery_dir, MANIFEST_FILE)):
+            return cls.open(gallery_dir)
+
+        os.makedirs(gallery_dir, exist_ok=True)
+        open(osp.join(gallery_dir, EMBEDDINGS_FILE), "wb").close()
+        open(osp.join(gallery_dir, TABLE_FILE), "wb").close()
+        manifest = {
+            "format": FORMAT_VERSION,
+            "dim": dim,
+            "dtype": "float32",
+            "count": 0,
+            "table_bytes": 0,
+            "version": 0,
+        }
+        _write_manifest(gallery_dir, manifest)
+        return cls(gallery_dir, manifest)
+
+    @classmethod
+    def open(cls, gallery_dir):
+        """Open an existing store without copying the embeddings."""
+        return cls(gallery_dir, _read_manifest(gallery_dir))
+
+    @classmethod
+    def open_or_migrate(cls, gallery_dir, features_path=None):
+        """
+        Open the store, migrating a legacy `feature.npz` the first time.
+
+        Args:
+            gallery_dir (str): The store directory.
+            features_path (str): Legacy features file without extension.
+
+        Returns:
+            GalleryStore: The opened store (empty if there was nothing to migrate).
+        """
+        if osp.exists(osp.join(gallery_dir, MANIFEST_FILE)):
+            return cls.open(gallery_dir)
+        if features_path is not None and osp.exists(features_path + ".npz"):
+            return migrate_npz(features_path, gallery_dir)
+        return cls.create(gallery_dir)
+
+    def _load(self):
+        """Map the committed rows and read the name table."""
+        count, dim = self.manifest["count"], self.manifest["dim"]
+        if count > 0:
+            self.embeddings = np.memmap(
+                osp.join(self.gallery_dir, EMBEDDINGS_FILE),
+                dtype=np.float32,
+                mode="r",
+                shape=(count, dim),
+            )
+        else:
+            self.embeddings = np.empty((0, dim), dtype=np.float32)
+
+        with open(osp.join(self.gallery_dir, TABLE_FILE), "rb") as f:
+            table = f.read(self.manifest["table_bytes"]).decode("utf-8")
+        rows = [line.split("\t") for line in table.splitlines()]
+        self.names = np.array([row[0] for row in rows], dtype=str)
+        self.user_ids = np.array([row[1] for row in rows], dtype=str)
+
+    def refresh(self):
+        """Re-read the manifest to pick up rows appended by another writer."""
+        with self._lock:
+            manifest = _read_manifest(self.gallery_dir)
+            if manifest["version"] != self.manifest["version"]:
+                self.manifest = manifest
+                self._load()
+
+    def append(self, names, embs, user_id=None):
+        """
+        Enroll new embeddings in O(new rows).
+
+        Args:
+            names (array-like): Person name of each embedding.
+            embs (numpy.ndarray): Array of shape (N, D) with the embeddings.
+            user_id (str | array-like): Patient of each embedding, or one for all.
+
+        Returns:
+            int: The new store version.
+        """
+        names = [str(name) for name in np.asarray(names).reshape(-1)]
+        embs = l2_normalize(np.asarray(embs).reshape(len(names), -1))
+        assert embs.shape[1] == self.dim
+        user_ids = np.broadcast_to(
+            np.asarray(DEFAULT_SHARD if user_id is None else user_id, dtype=object), (len(names),)
+        )
+        for value in names + [str(u) for u in user_ids]:
+            if "\t" in value or "\n" in value:
+                raise ValueError(f"names and user ids cannot contain tabs or newlines: {value!r}")
+
+        table = "".join(f"{name}\t{uid}\n" for name, uid in zip(names, user_ids)).encode("utf-8")
+
+        with self._lock:
+            # Start from the committed state on disk, another process may have appended
+            manifest = _read_manifest(self.gallery_dir)
+            emb_path = osp.join(self.gallery_dir, EMBEDDINGS_FILE)
+            table_path = osp.join(self.gallery_dir, TABLE_FILE)
+
+            # Drop any tail left by an append that crashed before its commit
+            for path, size in (
+                (emb_path, manifest["count"] * manifest["dim"] * 4),
+                (table_path, manifest["table_bytes"]),
+            ):
+                if osp.getsize(path) != size:
+                    os.truncate(path, size)
+
+            with open(emb_path, "ab") as f:
+                f.write(embs.astype("<f4", copy=False).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            with open(table_path, "ab") as f:
+                f.write(table)
+                f.flush()
+                os.fsync(f.fileno())
+
+            # Commit: readers only trust rows counted in the manifest
+            manifest["count"] += len(names)
+            manifest["table_bytes"] += len(table)
+            manifest["version"] += 1
+            _write_manifest(self.gallery_dir, manifest)
+
+            self.manifest = manifest
+            self._load()
+
+        return manifest["version"]
+
+
+class GallerySnapshot:
+    """A built gallery together with the store version it was built from."""
+
+    def __init__(self, gallery, version):
+        self.gallery = gallery
+        self.version = version
+
+
+class LiveGallery:
+    """
+    Serve the newest `FaceGallery` of a store to running recognizers.
+
+    Recognizers read `snapshot` once per batch and search that gallery; they
+    never take a lock. Enrollment builds the next gallery on the side and
+    publishes it by rebinding a single reference, so a batch always searches
+    one consistent version and the next batch sees the new one.
+    """
+
+    def __init__(self, store, index="exact", index_params=None):
+        self.store = store
+        self.index = index
+        self.index_params = index_params
+        self._lock = threading.Lock()
+        self._snapshot = self._build()
+
+    @property
+    def snapshot(self):
+        return self._snapshot
+
+    def _build(self):
+        gallery = FaceGallery.from_store(self.store, self.index, self.index_params)
+        return GallerySnapshot(gallery, self.store.version)
+
+    def append(self, names, embs, user_id=None):
+        """
+        Enroll embeddings in the store and publish the updated gallery.
+
+        Args:
+            names (array-like): Person name of each embedding.
+            embs (numpy.ndarray): Array of shape (N, D) with the embeddings.
+            user_id (str): Patient the persons are contacts of, None for the default shard.
+
+        Returns:
+            GallerySnapshot: The published snapshot.
+        """
+        # The store writes shard keys as text, the snapshot must use the same keys
+        if user_id is not None:
+            user_id = str(user_id)
+        with self._lock:
+            current = self._snapshot
+            version = self.store.append(names, embs, user_id)
+            if version == current.version + 1:
+                # Only our rows are new, extend a copy of the current gallery
+                user_ids = DEFAULT_SHARD if user_id is None else user_id
+                gallery = current.gallery.added(names, embs, user_ids)
+                self._snapshot = GallerySnapshot(gallery, version)
+            else:
+                # Another writer appended as well, rebuild from the store
+                self._snapshot = self._build()
+            return self._snapshot
+
+    def reload(self):
+        """
+        Publish rows appended to the store by another process, if any.
+
+        Returns:
+            GallerySnapshot: The current snapshot.
+        """
+        with self._lock:
+            self.store.refresh()
+            if self.store.version != self._snapshot.version:
+                self._snapshot = self._build()
+            return self._snapshot
+
+
+def _read_manifest(gallery_dir):
+    with open(osp.join(gallery_dir, MANIFEST_FILE), "r") as f:
+        manifest = json.load(f)
+    if manifest.get("format") != FORMAT_VERSION:
+        raise ValueError(f"unsupported gallery store format: {manifest.get('format')}")
+    return manifest
+
+
+def _write_manifest(gallery_dir, manifest):
+    """Atomically replace the manifest."""
+    path = osp.join(gallery_dir, MANIFEST_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def migrate_npz(features_path, gallery_dir):
+    """
+    Convert a legacy `feature.npz` into a gallery store.
+
+    Args:
+        features_path (str): Legacy features file without extension.
+        gallery_dir (str): The new store directory, must not hold a store yet.
+
+    Returns:
+        GalleryStore: The populated store.
+    """
+    if osp.exists(osp.join(gallery_dir, MANIFEST_FILE)):
+        raise FileExistsError(f"a gallery store already exists in {gallery_dir}")
+
+    data = np.load(features_path + ".npz", allow_pickle=True)
+    images_name = np.asarray(data["images_name"]).astype(str)
+    images_emb = np.asarray(data["images_emb"], dtype=np.float32).reshape(len(images_name), -1)
+    images_user = data["images_user"] if "images_user" in data else DEFAULT_SHARD
+
+    store = GalleryStore.create(gallery_dir, dim=images_emb.shape[1])
+    if len(images_name):
+        store.append(images_name, images_emb, images_user)
+    return store
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--features-path",
+        type=str,
+        default="./datasets/face_features/feature",
+        help="Legacy features file to migrate, without extension.",
+    )
+    parser.add_argument(
+        "--gallery-dir",
+        type=str,
+        default="./datasets/face_features/gallery",
+        help="Directory of the new gallery store.",
+    )
+    opt = parser.parse_args()
+
+    store = migrate_npz(opt.features_path, opt.gallery_dir)
+    print(f"Migrated {len(store)} embeddings to {opt.gallery_dir} (version {store.version})")
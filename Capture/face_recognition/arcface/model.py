@@ -1,7 +1,12 @@
+import os
+import os.path as osp
+
 import torch
 import torch.nn.functional as F
 from torch import nn
 
+from face_recognition.arcface.onnx_backend import ArcFaceONNX
+
 
 def conv3x3(in_planes, out_planes, stride=1, groups=1, dilation=1):
     """3x3 convolution with padding"""
@@ -220,7 +225,7 @@ def iresnet200(pretrained=False, progress=True, **kwargs):
     return _iresnet("iresnet200", IBasicBlock, [6, 26, 60, 6], pretrained, progress, **kwargs)
 
 
-def iresnet_inference(model_name, path, device="cuda"):
+def iresnet_build(model_name):
     if model_name == "r18":
         model = iresnet18()
     elif model_name == "r34":
@@ -232,9 +237,83 @@ def iresnet_inference(model_name, path, device="cuda"):
     else:
         raise ValueError()
 
+    return model
+
+
+def onnx_path_for(path):
+    """ONNX artifact cached next to the `.pth` weights."""
+    return osp.splitext(path)[0] + ".onnx"
+
+
+def export_onnx(model_name, path, onnx_path=None, opset_version=13):
+    """Export iresnet weights to ONNX once and reuse the cached artifact.
+
+    The graph is exported with a dynamic batch axis so the batched
+    recognition path can run every face of a frame in one call. The artifact
+    is re-exported only when it is missing or older than the weights.
+    """
+    onnx_path = onnx_path_for(path) if onnx_path is None else onnx_path
+    if osp.exists(onnx_path) and osp.getmtime(onnx_path) >= osp.getmtime(path):
+        return onnx_path
+
+    model = iresnet_inference(model_name, path, device="cpu")
+    dummy = torch.zeros((1, 3, 112, 112), dtype=torch.float32)
+
+    # Write to a temporary file first so a crash never leaves a broken cache
+    tmp_path = onnx_path + ".tmp"
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            dummy,
+            tmp_path,
+            input_names=["input"],
+            output_names=["embedding"],
+            dynamic_axes={"input": {0: "batch"}, "embedding": {0: "batch"}},
+            opset_version=opset_version,
+            dynamo=False,
+        )
+    os.replace(tmp_path, onnx_path)
+
+    return onnx_path
+
+
+def iresnet_inference(
+    model_name,
+    path,
+    device="cuda",
+    backend="torch",
+    num_threads=0,
+    calibration_dir="./datasets/data",
+):
+    if backend == "onnx":
+        return ArcFaceONNX(export_onnx(model_name, path), num_threads=num_threads)
+    elif backend == "onnx_int8":
+        # onnxruntime.quantization needs the onnx package, only load it here
+        from face_recognition.arcface.quantize import quantize_onnx
+
+        int8_path = quantize_onnx(export_onnx(model_name, path), calibration_dir)
+        return ArcFaceONNX(int8_path, num_threads=num_threads)
+    elif backend != "torch":
+        raise ValueError(f"unknown recognizer backend: {backend}")
+
+    model = iresnet_build(model_name)
+
     weight = torch.load(path, map_location=device)
 
     model.load_state_dict(weight)
     model.to(device)
 
     return model.eval()
+
+
+def iresnet_from_config(config, device="cuda", weights_dir="face_recognition/arcface/weights"):
+    """Load the recognizer selected by the `recognizer_*` tracking config keys."""
+    model_name = config.get("recognizer_model", "r100")
+
+    return iresnet_inference(
+        model_name=model_name,
+        path=osp.join(weights_dir, f"arcface_{model_name}.pth"),
+        device=device,
+        backend=config.get("recognizer_backend", "torch"),
+        num_threads=config.get("recognizer_threads", 0),
+    )
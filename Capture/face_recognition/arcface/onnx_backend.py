@@ -0,0 +1,46 @@
+import numpy as np
+import onnxruntime
+import torch
+
+
+class ArcFaceONNX:
+    """ArcFace recognizer running an exported iresnet graph on ONNX Runtime.
+
+    Calling the instance mirrors the torch model: it takes an (N, 3, 112, 112)
+    batch, as a tensor or a float32 array, and returns the (N, 512) embeddings
+    as a CPU tensor, so it is a drop-in replacement in the recognition code.
+    """
+
+    def __init__(self, model_file, num_threads=0, providers=None):
+        self.model_file = model_file
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = onnxruntime.ExecutionMode.ORT_SEQUENTIAL
+        # 0 lets ONNX Runtime use one thread per physical core
+        options.intra_op_num_threads = num_threads
+        options.inter_op_num_threads = 1
+
+        if providers is None:
+            providers = ["CPUExecutionProvider"]
+        self.session = onnxruntime.InferenceSession(
+            self.model_file, sess_options=options, providers=providers
+        )
+        self.input_name = self.session.get_inputs()[0].name
+        self.output_names = [o.name for o in self.session.get_outputs()]
+
+    def run(self, images):
+        """Run the graph on a float32 NCHW array and return numpy embeddings."""
+        images = np.ascontiguousarray(images, dtype=np.float32)
+        return self.session.run(self.output_names, {self.input_name: images})[0]
+
+    def __call__(self, images):
+        if torch.is_tensor(images):
+            images = images.detach().cpu().numpy()
+        return torch.from_numpy(self.run(images))
+
+    def eval(self):
+        return self
+
+    def to(self, device):
+        return self
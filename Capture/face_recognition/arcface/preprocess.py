@@ -0,0 +1,69 @@
+import threading
+
+import cv2
+import numpy as np
+
+
+class FacePreprocessor:
+    """Convert aligned BGR uint8 face crops into the ArcFace input batch.
+
+    The output is a float32 (N, 3, size, size) RGB array normalized to
+    [-1, 1], the same as ToTensor + Normalize(0.5, 0.5). One buffer is kept
+    per batch size and reused on every call, so the returned array is only
+    valid until the next call with the same batch size. Buffers are
+    thread-local, which lets enrollment and recognition share an instance.
+
+    The array can be fed to the ONNX backend as is, or wrapped without a copy
+    with `torch.from_numpy` for the torch backend.
+    """
+
+    def __init__(self, image_size=112):
+        self.image_size = image_size
+        self._local = threading.local()
+
+    def _buffer(self, batch_size):
+        buffers = getattr(self._local, "buffers", None)
+        if buffers is None:
+            buffers = self._local.buffers = {}
+        buffer = buffers.get(batch_size)
+        if buffer is None:
+            buffer = np.empty(
+                (batch_size, 3, self.image_size, self.image_size), dtype=np.float32
+            )
+            buffers[batch_size] = buffer
+        return buffer
+
+    def __call__(self, face_images):
+        """
+        Preprocess a batch of face crops.
+
+        Args:
+            face_images (list | numpy.ndarray): BGR uint8 face images, ideally
+                already aligned to image_size x image_size by `norm_crop`, or an
+                (N, size, size, 3) array from `norm_crop_batch`.
+
+        Returns:
+            numpy.ndarray: The reused (N, 3, size, size) float32 buffer.
+        """
+        size = self.image_size
+        batch = self._buffer(len(face_images))
+
+        # Aligned crops from norm_crop_batch are converted in a single copy
+        if isinstance(face_images, np.ndarray) and face_images.shape[1:3] == (size, size):
+            batch[:] = face_images[..., ::-1].transpose(0, 3, 1, 2)
+            batch *= 1.0 / 127.5
+            batch -= 1.0
+            return batch
+
+        for i, face_image in enumerate(face_images):
+            # Aligned crops are already the right size, only raw crops are resized
+            if face_image.shape[0] != size or face_image.shape[1] != size:
+                face_image = cv2.resize(face_image, (size, size))
+
+            # BGR -> RGB and HWC -> CHW in one strided copy into the buffer
+            batch[i] = face_image[:, :, ::-1].transpose(2, 0, 1)
+
+        batch *= 1.0 / 127.5
+        batch -= 1.0
+
+        return batch
@@ -0,0 +1,261 @@
+"""
+Static INT8 quantization of the exported ArcFace ONNX graph.
+
+Calibration faces are drawn from `datasets/data/<person>/*.jpg`. Running this
+module builds the quantized artifact and checks it against the float model on
+enrolled faces held out from calibration:
+
+    python -m face_recognition.arcface.quantize --model-name r100 \
+        --weights face_recognition/arcface/weights/arcface_r100.pth
+"""
+import argparse
+import glob
+import os
+import os.path as osp
+import time
+
+import cv2
+import numpy as np
+from onnxruntime.quantization import (
+    CalibrationDataReader,
+    CalibrationMethod,
+    QuantFormat,
+    QuantType,
+    quantize_static,
+)
+from onnxruntime.quantization.shape_inference import quant_pre_process
+
+from face_recognition.arcface.onnx_backend import ArcFaceONNX
+from face_recognition.arcface.preprocess import FacePreprocessor
+
+_preprocessor = FacePreprocessor()
+
+
+def int8_path_for(onnx_path):
+    """Quantized artifact cached next to the float ONNX graph."""
+    return osp.splitext(onnx_path)[0] + ".int8.onnx"
+
+
+def list_faces(data_dir):
+    """
+    List the enrolled face images.
+
+    Args:
+        data_dir (str): Directory laid out as `<person>/<image>.jpg`.
+
+    Returns:
+        list: (person name, image path) pairs sorted by path.
+    """
+    paths = sorted(glob.glob(osp.join(data_dir, "*", "*.jpg")))
+    return [(osp.basename(osp.dirname(p)), p) for p in paths]
+
+
+def split_faces(entries, eval_every=3):
+    """
+    Hold out faces of every person from calibration for the accuracy check.
+
+    Args:
+        entries (list): (person name, image path) pairs, see `list_faces`.
+        eval_every (int): Every `eval_every`-th face of a person is held out.
+
+    Returns:
+        tuple: The calibration pairs and the disjoint evaluation pairs.
+    """
+    calibration, evaluation = [], []
+    counts = {}
+    for name, path in entries:
+        index = counts.get(name, 0)
+        counts[name] = index + 1
+        if index % eval_every == eval_every - 1:
+            evaluation.append((name, path))
+        else:
+            calibration.append((name, path))
+    return calibration, evaluation
+
+
+def load_face(path):
+    """Read a face image as the (1, 3, 112, 112) float32 recognizer input."""
+    return _preprocessor([cv2.imread(path)]).copy()
+
+
+class FaceCalibrationReader(CalibrationDataReader):
+    """Feed enrolled faces to the ONNX Runtime calibrator one at a time."""
+
+    def __init__(self, input_name, data_dir, max_samples=200, eval_every=3):
+        self.input_name = input_name
+        calibration, _ = split_faces(list_faces(data_dir), eval_every)
+        self.paths = [p for _, p in calibration][:max_samples]
+        if not self.paths:
+            raise FileNotFoundError(f"no calibration faces found in {data_dir}")
+        self._iter = iter(self.paths)
+
+    def get_next(self):
+        path = next(self._iter, None)
+        if path is None:
+            return None
+        return {self.input_name: load_face(path)}
+
+    def rewind(self):
+        self._iter = iter(self.paths)
+
+
+def quantize_onnx(
+    onnx_path, data_dir="./datasets/data", int8_path=None, max_samples=200, eval_every=3
+):
+    """
+    Quantize the float ArcFace graph to static INT8 and cache the artifact.
+
+    Weights are quantized per channel and activations per tensor, with ranges
+    calibrated on the enrolled faces minus those `split_faces` holds out. The
+    artifact is rebuilt only when it is missing or older than the float graph.
+
+    Args:
+        onnx_path (str): Path to the float ONNX graph.
+        data_dir (str): Directory with the calibration faces.
+        int8_path (str): Output path, defaults to `<model>.int8.onnx`.
+        max_samples (int): Maximum number of calibration faces.
+        eval_every (int): Every `eval_every`-th face of a person is held out.
+
+    Returns:
+        str: Path to the quantized graph.
+    """
+    int8_path = int8_path_for(onnx_path) if int8_path is None else int8_path
+    if osp.exists(int8_path) and osp.getmtime(int8_path) >= osp.getmtime(onnx_path):
+        return int8_path
+
+    reader = FaceCalibrationReader(
+        ArcFaceONNX(onnx_path).input_name,
+        data_dir,
+        max_samples=max_samples,
+        eval_every=eval_every,
+    )
+
+    # Fold constants and infer shapes first, as ONNX Runtime recommends
+    pre_path = int8_path + ".pre.onnx"
+    quant_pre_process(onnx_path, pre_path)
+
+    tmp_path = int8_path + ".tmp"
+    quantize_static(
+        pre_path,
+        tmp_path,
+        reader,
+        quant_format=QuantFormat.QDQ,
+        per_channel=True,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        calibrate_method=CalibrationMethod.MinMax,
+    )
+    os.replace(tmp_path, int8_path)
+    os.remove(pre_path)
+
+    return int8_path
+
+
+def embed_faces(recognizer, faces):
+    """Embed every face one at a time and return the timing per face."""
+    embs = []
+    if faces:
+        recognizer.run(faces[0])
+    start = time.perf_counter()
+    for face in faces:
+        embs.append(recognizer.run(face)[0])
+    elapsed = time.perf_counter() - start
+    embs = np.asarray(embs, dtype=np.float32)
+    embs /= np.linalg.norm(embs, axis=1, keepdims=True)
+    return embs, 1000.0 * elapsed / max(len(faces), 1)
+
+
+def accuracy_check(
+    onnx_path, int8_path, data_dir="./datasets/data", num_threads=0, eval_every=3
+):
+    """
+    Compare the INT8 recognizer against the float one on held-out faces.
+
+    Only the faces `split_faces` kept out of calibration are queried, once
+    with their float embedding and once with their INT8 embedding, against a
+    float gallery of the calibration faces.
+
+    Returns:
+        dict: Top-1 agreement, cosine statistics and latency per face.
+    """
+    calibration, evaluation = split_faces(list_faces(data_dir), eval_every)
+    if not evaluation or not calibration:
+        raise ValueError(
+            f"need a person with at least {eval_every} faces in {data_dir} to hold some out"
+        )
+    gallery_names = np.array([name for name, _ in calibration])
+    gallery_faces = [load_face(path) for _, path in calibration]
+    faces = [load_face(path) for _, path in evaluation]
+
+    float_recognizer = ArcFaceONNX(onnx_path, num_threads)
+    gallery_embs, _ = embed_faces(float_recognizer, gallery_faces)
+    float_embs, float_ms = embed_faces(float_recognizer, faces)
+    int8_embs, int8_ms = embed_faces(ArcFaceONNX(int8_path, num_threads), faces)
+
+    # Cosine between the float and INT8 embedding of the same face
+    self_cos = np.sum(float_embs * int8_embs, axis=1)
+
+    float_sims = float_embs @ gallery_embs.T
+    int8_sims = int8_embs @ gallery_embs.T
+    float_top1 = np.argmax(float_sims, axis=1)
+    int8_top1 = np.argmax(int8_sims, axis=1)
+
+    rows = np.arange(len(evaluation))
+    return {
+        "faces": len(evaluation),
+        "top1_agreement": float(
+            np.mean(gallery_names[float_top1] == gallery_names[int8_top1])
+        ),
+        "cosine_mean": float(np.mean(self_cos)),
+        "cosine_min": float(np.min(self_cos)),
+        "top1_score_abs_diff": float(
+            np.mean(np.abs(float_sims[rows, float_top1] - int8_sims[rows, int8_top1]))
+        ),
+        "float_ms_per_face": float_ms,
+        "int8_ms_per_face": int8_ms,
+    }
+
+
+def main(model_name, weights, data_dir, max_samples, eval_every, threads):
+    from face_recognition.arcface.model import export_onnx
+
+    onnx_path = export_onnx(model_name, weights)
+    int8_path = quantize_onnx(
+        onnx_path, data_dir, max_samples=max_samples, eval_every=eval_every
+    )
+    print(f"Quantized model: {int8_path}")
+
+    report = accuracy_check(
+        onnx_path, int8_path, data_dir, num_threads=threads, eval_every=eval_every
+    )
+    for key, value in report.items():
+        print(f"{key:>22}: {value:.4f}" if isinstance(value, float) else f"{key:>22}: {value}")
+    print(f"{'speedup':>22}: {report['float_ms_per_face'] / report['int8_ms_per_face']:.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model-name", type=str, default="r100", help="r18, r34, r50 or r100.")
+    parser.add_argument(
+        "--weights",
+        type=str,
+        default="face_recognition/arcface/weights/arcface_r100.pth",
+        help="Path to the .pth weights.",
+    )
+    parser.add_argument(
+        "--data-dir",
+        type=str,
+        default="./datasets/data",
+        help="Enrolled faces used for calibration and the accuracy check.",
+    )
+    parser.add_argument("--max-samples", type=int, default=200)
+    parser.add_argument(
+        "--eval-every",
+        type=int,
+        default=3,
+        help="Hold every Nth face of a person out of calibration for the check.",
+    )
+    parser.add_argument("--threads", type=int, default=0, help="Intra-op threads, 0 = default.")
+    opt = parser.parse_args()
+
+    main(**vars(opt))
@@ -17,3 +17,10 @@ def compare_encodings(encoding, encodings):
     pare_index = np.argmax(sims)
     score = sims[pare_index]
     return score, pare_index
+
+
+def compare_encodings_batch(query_encodings, encodings):
+    sims = np.dot(query_encodings, encodings.T)
+    pare_indices = np.argmax(sims, axis=1)
+    scores = sims[np.arange(len(pare_indices)), pare_indices]
+    return scores, pare_indices
@@ -0,0 +1,129 @@
+"""
+Soak test of the tracker's memory over a long synthetic session.
+
+A few faces walk through a 1280x720 frame at a time. Each one stays for a
+random number of frames and is then replaced by a new face, so the tracker
+keeps creating, losing and removing tracks and the track IDs keep growing.
+Every frame, the tracked faces get a name and a cache entry the way the
+recognition thread gives them one, and dropped tracks are evicted the way
+`capture.process_tracking` does on keyframes.
+
+The table shows the size of every per-track structure and the process
+memory. Each should level off after the first report. Run from the Capture
+directory:
+
+    python -m face_tracking.benchmark_soak --frames 1000000
+"""
+import argparse
+import resource
+import time
+import tracemalloc
+
+import numpy as np
+
+from face_tracking.identity_cache import IdentityCache, retain_keys
+from face_tracking.tracker.basetrack import BaseTrack
+from face_tracking.tracker.byte_tracker import BYTETracker
+from face_tracking.tracker.detections import Detections
+
+
+def rss_mb():
+    """Resident memory of the process, the peak where /proc is missing."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * resource.getpagesize() / 2**20
+    except OSError:
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2**10
+
+
+class Crowd(object):
+    """Faces that enter, drift across the frame and leave."""
+
+    def __init__(self, num_faces, min_life, max_life, rng):
+        self.rng = rng
+        self.min_life = min_life
+        self.max_life = max_life
+        self.boxes = np.zeros((num_faces, 4))
+        self.velocity = np.zeros((num_faces, 4))
+        self.life = np.zeros(num_faces, dtype=np.int64)
+        self.spawn(np.arange(num_faces))
+
+    def spawn(self, slots):
+        count = len(slots)
+        sizes = self.rng.uniform(30, 120, (count, 1))
+        corners = self.rng.uniform(0, 1, (count, 2)) * (np.array([1280, 720]) - sizes)
+        self.boxes[slots] = np.hstack((corners, corners + sizes))
+        self.velocity[slots] = np.tile(self.rng.normal(0, 2, (count, 2)), 2)
+        self.life[slots] = self.rng.integers(self.min_life, self.max_life, count)
+
+    def step(self):
+        """Move the faces on one frame and return their detections."""
+        self.life -= 1
+        self.spawn(np.flatnonzero(self.life <= 0))
+        self.boxes += self.velocity
+        # Faces are missed now and then, which makes tracks go lost
+        seen = self.rng.uniform(0, 1, len(self.boxes)) > 0.05
+        jitter = self.rng.normal(0, 1.0, self.boxes.shape)
+        scores = self.rng.uniform(0.6, 1.0, len(self.boxes))
+        return Detections((self.boxes + jitter)[seen], scores[seen])
+
+
+def main(frames, faces, min_life, max_life, report_every, trace, seed):
+    rng = np.random.default_rng(seed)
+    args = {
+        "track_thresh": 0.5,
+        "track_buffer": 30,
+        "match_thresh": 0.8,
+        "removed_track_retention": 100,
+    }
+    tracker = BYTETracker(args=args, frame_rate=30)
+    crowd = Crowd(faces, min_life, max_life, rng)
+    identity_cache = IdentityCache()
+    id_face_mapping = {}
+    embedding = np.zeros(512, dtype=np.float32)
+
+    if trace:
+        tracemalloc.start()
+    print(
+        f"{'frame':>9} {'ids':>8} {'table':>6} {'removed':>8} {'names':>6} {'cache':>6}"
+        f" {'rss MB':>8} {'traced MB':>10} {'ms/frame':>9}"
+    )
+    start = time.perf_counter()
+    for frame_id in range(1, frames + 1):
+        online_targets = tracker.update(crowd.step(), [720, 1280], (720, 1280))
+
+        for t in online_targets:
+            if identity_cache.needs_recognition(t.track_id, frame_id):
+                identity_cache.update(t.track_id, embedding, 0.9, "person", frame_id)
+                id_face_mapping[t.track_id] = "person:0.90"
+        alive = [t.track_id for t in tracker.tracked_stracks + tracker.lost_stracks]
+        identity_cache.retain(alive)
+        retain_keys(id_face_mapping, alive)
+
+        if frame_id % report_every == 0 or frame_id == frames:
+            elapsed_ms = 1000.0 * (time.perf_counter() - start) / frame_id
+            traced = tracemalloc.get_traced_memory()[0] / 2**20 if trace else float("nan")
+            print(
+                f"{frame_id:>9} {BaseTrack._count:>8} {tracker.tracks.capacity:>6}"
+                f" {len(tracker.removed_stracks):>8} {len(id_face_mapping):>6}"
+                f" {len(identity_cache):>6} {rss_mb():>8.1f} {traced:>10.2f}"
+                f" {elapsed_ms:>9.3f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=1000000)
+    parser.add_argument("--faces", type=int, default=8, help="Faces in the frame at once.")
+    parser.add_argument("--min-life", type=int, default=30, help="Shortest stay in frames.")
+    parser.add_argument("--max-life", type=int, default=300, help="Longest stay in frames.")
+    parser.add_argument("--report-every", type=int, default=100000)
+    parser.add_argument(
+        "--trace", action="store_true", help="Also count Python allocations, slower."
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    opt = parser.parse_args()
+
+    main(**vars(opt))
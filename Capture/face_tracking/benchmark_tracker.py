@@ -0,0 +1,102 @@
+"""
+Check the vectorized IoU kernel against the per-pair reference and time the
+tracker as the number of faces grows.
+
+Faces are random boxes drifting across a 1280x720 frame, with jittered
+detections of each one every frame. For every count, the table shows the
+IoU matrix with the old double loop and the broadcast kernel, the track to
+detection IoU cost, and a whole `BYTETracker.update`. Run from the Capture
+directory:
+
+    python -m face_tracking.benchmark_tracker --counts 1 10 100 500
+"""
+import argparse
+import time
+
+import numpy as np
+
+from face_tracking.tracker.basetrack import TrackState
+
+# byte_tracker puts its directory on sys.path, which `matching` needs
+from face_tracking.tracker.byte_tracker import BYTETracker, matching
+from face_tracking.tracker.detections import Detections
+
+
+def loop_ious(atlbrs, btlbrs):
+    """The original per-pair IoU matrix."""
+    ious = np.zeros((len(atlbrs), len(btlbrs)), dtype=np.float64)
+    for i, box1 in enumerate(atlbrs):
+        for j, box2 in enumerate(btlbrs):
+            ious[i, j] = matching.bbox_iou(box1, box2)
+    return ious
+
+
+def random_faces(count, rng):
+    """Face boxes as x1, y1, x2, y2 and their per-frame motion."""
+    sizes = rng.uniform(30, 120, (count, 1))
+    corners = rng.uniform(0, 1, (count, 2)) * (np.array([1280, 720]) - sizes)
+    boxes = np.hstack((corners, corners + sizes))
+    velocity = np.tile(rng.normal(0, 2, (count, 2)), 2)
+    return boxes, velocity
+
+
+def detections(boxes, rng):
+    """Jittered detections of every face with high scores."""
+    jitter = rng.normal(0, 1.0, boxes.shape)
+    scores = rng.uniform(0.6, 1.0, (len(boxes), 1))
+    return Detections(boxes + jitter, scores)
+
+
+def time_ms(fn, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return 1000.0 * (time.perf_counter() - start) / repeats
+
+
+def main(counts, frames, repeats, seed):
+    rng = np.random.default_rng(seed)
+    args = {"track_thresh": 0.5, "track_buffer": 30, "match_thresh": 0.8}
+
+    print(f"{'faces':>6} {'loop iou':>9} {'iou':>9} {'iou cost':>9} {'update':>9}  (ms)")
+    for count in counts:
+        boxes, velocity = random_faces(count, rng)
+        dets = detections(boxes, rng).boxes.astype(np.float64)
+
+        # The broadcast kernel must match the reference pair by pair
+        reference = loop_ious(boxes, dets)
+        assert np.allclose(matching.ious(boxes, dets), reference), f"IoU differs at {count}"
+
+        # Let the tracker confirm every face before timing it
+        tracker = BYTETracker(args=args, frame_rate=30)
+        for _ in range(frames):
+            boxes += velocity
+            tracker.update(detections(boxes, rng), [720, 1280], (720, 1280))
+        rows = tracker.tracks.rows(TrackState.Tracked)
+
+        loop_ms = time_ms(lambda: loop_ious(boxes, dets), max(1, repeats // count))
+        iou_ms = time_ms(lambda: matching.ious(boxes, dets), repeats)
+        cost_ms = time_ms(
+            lambda: matching.iou_distance(tracker.tracks.tlbr(rows), dets), repeats
+        )
+
+        update_ms = 0.0
+        for _ in range(repeats):
+            boxes += velocity
+            frame_dets = detections(boxes, rng)
+            start = time.perf_counter()
+            tracker.update(frame_dets, [720, 1280], (720, 1280))
+            update_ms += 1000.0 * (time.perf_counter() - start) / repeats
+
+        print(f"{count:>6} {loop_ms:>9.3f} {iou_ms:>9.3f} {cost_ms:>9.3f} {update_ms:>9.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--counts", type=int, nargs="+", default=[1, 10, 50, 100, 250, 500])
+    parser.add_argument("--frames", type=int, default=10, help="Warm-up frames per count.")
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    opt = parser.parse_args()
+
+    main(**vars(opt))
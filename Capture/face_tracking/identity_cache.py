@@ -0,0 +1,121 @@
+import threading
+
+
+class IdentityEntry(object):
+    """Last recognition result of a single track."""
+
+    def __init__(self, embedding, score, name, frame_id):
+        self.embedding = embedding
+        self.score = score
+        self.name = name
+        self.frame_id = frame_id
+
+
+class IdentityCache(object):
+    """
+    Cache of recognition results keyed by tracker track ID.
+
+    A track is sent to the recognizer only when it is new, when its last score
+    is below `score_thresh`, or when `refresh_interval` frames have passed
+    since it was last recognized. Entries are dropped once the tracker no
+    longer keeps the track.
+    """
+
+    def __init__(self, score_thresh=0.25, refresh_interval=30):
+        self.score_thresh = score_thresh
+        self.refresh_interval = refresh_interval
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, track_id):
+        return track_id in self._entries
+
+    def get(self, track_id):
+        """
+        Get the cached entry of a track.
+
+        Args:
+            track_id (int): The tracker track ID.
+
+        Returns:
+            IdentityEntry: The cached entry, or None if the track is unknown.
+        """
+        return self._entries.get(track_id)
+
+    def needs_recognition(self, track_id, frame_id):
+        """
+        Check whether a track has to go through the recognizer again.
+
+        Args:
+            track_id (int): The tracker track ID.
+            frame_id (int): The current frame ID.
+
+        Returns:
+            bool: True if the track is new, uncertain or due for a refresh.
+        """
+        entry = self._entries.get(track_id)
+        if entry is None:
+            return True
+        if entry.score < self.score_thresh:
+            return True
+        return frame_id - entry.frame_id >= self.refresh_interval
+
+    def update(self, track_id, embedding, score, name, frame_id):
+        """
+        Store the latest recognition result of a track.
+
+        Args:
+            track_id (int): The tracker track ID.
+            embedding (numpy.ndarray): The normalized face embedding.
+            score (float): The recognition score.
+            name (str): The recognized name.
+            frame_id (int): The frame ID the face was taken from.
+        """
+        with self._lock:
+            self._entries[track_id] = IdentityEntry(embedding, score, name, frame_id)
+
+    def retain(self, track_ids):
+        """
+        Evict every entry whose track is no longer kept by the tracker.
+
+        Args:
+            track_ids (iterable): IDs of the tracks still alive (tracked or lost).
+
+        Returns:
+            list: The evicted track IDs.
+        """
+        alive = set(track_ids)
+        with self._lock:
+            evicted = [tid for tid in self._entries if tid not in alive]
+            for tid in evicted:
+                del self._entries[tid]
+        return evicted
+
+    def clear(self):
+        """Drop all cached entries."""
+        with self._lock:
+            self._entries.clear()
+
+
+def retain_keys(mapping, track_ids):
+    """
+    Delete the entries of a dict keyed by track ID whose tracks are gone.
+
+    Safe while another thread adds entries: keys are copied before the scan
+    and removed with `pop`.
+
+    Args:
+        mapping (dict): Values keyed by track ID, such as the names to draw.
+        track_ids (iterable): IDs of the tracks still alive (tracked or lost).
+
+    Returns:
+        list: The evicted track IDs.
+    """
+    alive = set(track_ids)
+    evicted = [tid for tid in list(mapping) if tid not in alive]
+    for tid in evicted:
+        mapping.pop(tid, None)
+    return evicted
@@ -0,0 +1,141 @@
+import math
+
+import numpy as np
+
+
+def track_rois(tlbrs, frame_shape, padding=0.5):
+    """
+    Square detection regions around predicted track boxes.
+
+    Args:
+        tlbrs (numpy.ndarray): Array of shape (N, 4) as x1, y1, x2, y2.
+        frame_shape (tuple): Shape of the frame, (height, width, ...).
+        padding (float): Margin added on each side, relative to the box size.
+
+    Returns:
+        numpy.ndarray: Array of shape (N, 4) with the regions clipped to the frame.
+    """
+    tlbrs = np.asarray(tlbrs, dtype=np.float64).reshape(-1, 4)
+    centers = (tlbrs[:, :2] + tlbrs[:, 2:]) / 2
+    sizes = np.max(tlbrs[:, 2:] - tlbrs[:, :2], axis=1, keepdims=True)
+    half = sizes * (0.5 + padding)
+    rois = np.hstack([centers - half, centers + half])
+    np.clip(rois[:, 0::2], 0, frame_shape[1], out=rois[:, 0::2])
+    np.clip(rois[:, 1::2], 0, frame_shape[0], out=rois[:, 1::2])
+    return rois
+
+
+class KeyframeScheduler(object):
+    """
+    Decide on which frames the face detector runs.
+
+    Detection runs on keyframes; in between, the tracker only propagates its
+    tracks with the Kalman filter. The keyframe interval N adapts to the
+    measured costs so that the average time per frame spent on detection and
+    tracking fits `frame_budget_ms`:
+
+        (detect + (N - 1) * propagate) / N <= budget
+
+    A keyframe is forced early when the tracker's predicted positions become
+    too uncertain, e.g. after fast motion.
+
+    With `full_scan_interval` above one, keyframes detect only in regions
+    around the tracked faces, and the whole frame is scanned for new faces
+    every `full_scan_interval` frames or whenever there is nothing tracked.
+    """
+
+    def __init__(
+        self,
+        frame_budget_ms=20.0,
+        max_interval=5,
+        max_uncertainty=0.25,
+        full_scan_interval=1,
+        metrics=None,
+    ):
+        self.frame_budget_ms = frame_budget_ms
+        self.max_interval = max(1, int(max_interval))
+        self.max_uncertainty = max_uncertainty
+        self.full_scan_interval = max(1, int(full_scan_interval))
+        self.metrics = metrics
+        self.interval = 1
+        self.last_keyframe = None
+        self.last_full_scan = None
+        self._detect_ms = None
+        self._propagate_ms = None
+
+    def is_keyframe(self, frame_id, uncertainty=0.0):
+        """
+        Check whether the detector has to run on a frame.
+
+        Args:
+            frame_id (int): The current frame ID.
+            uncertainty (float): Tracker position uncertainty, see
+                `BYTETracker.position_uncertainty`.
+
+        Returns:
+            bool: True to detect, False to propagate the tracks.
+        """
+        if self.last_keyframe is None:
+            return True
+        if frame_id - self.last_keyframe >= self.interval:
+            return True
+        return uncertainty > self.max_uncertainty
+
+    def needs_full_scan(self, frame_id, num_tracks):
+        """
+        Check whether a keyframe has to scan the whole frame.
+
+        Args:
+            frame_id (int): The current frame ID.
+            num_tracks (int): Number of tracks regions could be cut around.
+
+        Returns:
+            bool: True for a full-frame scan, False to detect around the tracks.
+        """
+        if self.full_scan_interval <= 1 or num_tracks == 0 or self.last_full_scan is None:
+            return True
+        return frame_id - self.last_full_scan >= self.full_scan_interval
+
+    def record(self, frame_id, keyframe, elapsed_ms, full_scan=True):
+        """
+        Report the cost of a processed frame and adapt the interval.
+
+        Args:
+            frame_id (int): The processed frame ID.
+            keyframe (bool): Whether the detector ran on it.
+            elapsed_ms (float): Time spent on detection and tracking.
+            full_scan (bool): Whether a keyframe scanned the whole frame.
+
+        Returns:
+            int: The new keyframe interval.
+        """
+        if keyframe:
+            self.last_keyframe = frame_id
+            if full_scan:
+                self.last_full_scan = frame_id
+            self._detect_ms = self._smooth(self._detect_ms, elapsed_ms)
+        else:
+            self._propagate_ms = self._smooth(self._propagate_ms, elapsed_ms)
+
+        self.interval = self._adapt()
+        if self.metrics is not None:
+            self.metrics.set("keyframe_interval", self.interval)
+            if not keyframe:
+                self.metrics.increment("propagated_frames")
+            else:
+                self.metrics.increment("full_scans" if full_scan else "roi_scans")
+        return self.interval
+
+    @staticmethod
+    def _smooth(average, value, smoothing=0.2):
+        return value if average is None else average + smoothing * (value - average)
+
+    def _adapt(self):
+        if self._detect_ms is None:
+            return 1
+        propagate_ms = self._propagate_ms or 0.0
+        spare_ms = self.frame_budget_ms - propagate_ms
+        if spare_ms <= 0:
+            return self.max_interval
+        interval = math.ceil((self._detect_ms - propagate_ms) / spare_ms)
+        return min(max(interval, 1), self.max_interval)
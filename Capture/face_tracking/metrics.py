@@ -0,0 +1,70 @@
+import threading
+
+
+class PipelineMetrics(object):
+    """
+    Thread-safe counters, gauges and stage latencies of the capture pipeline.
+
+    Latencies are exponential moving averages in milliseconds, so the
+    snapshot reflects the last few seconds rather than the whole session.
+    """
+
+    def __init__(self, smoothing=0.1):
+        self.smoothing = smoothing
+        self._latencies = {}
+        self._counters = {}
+        self._gauges = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage, elapsed_ms):
+        """
+        Fold one measurement into the moving average of a stage.
+
+        Args:
+            stage (str): Name of the pipeline stage, e.g. "detect".
+            elapsed_ms (float): Time spent in the stage in milliseconds.
+
+        Returns:
+            float: The updated average.
+        """
+        with self._lock:
+            average = self._latencies.get(stage)
+            if average is None:
+                average = elapsed_ms
+            else:
+                average += self.smoothing * (elapsed_ms - average)
+            self._latencies[stage] = average
+        return average
+
+    def latency(self, stage):
+        """Average latency of a stage in milliseconds, or None if never recorded."""
+        return self._latencies.get(stage)
+
+    def increment(self, counter, value=1):
+        with self._lock:
+            self._counters[counter] = self._counters.get(counter, 0) + value
+
+    def set(self, gauge, value):
+        with self._lock:
+            self._gauges[gauge] = value
+
+    def reset(self):
+        """Forget everything, e.g. when a new capture session starts."""
+        with self._lock:
+            self._latencies.clear()
+            self._counters.clear()
+            self._gauges.clear()
+
+    def snapshot(self):
+        """
+        Copy of the current metrics.
+
+        Returns:
+            dict: "latency_ms", "counters" and "gauges" mappings.
+        """
+        with self._lock:
+            return {
+                "latency_ms": {k: round(v, 3) for k, v in self._latencies.items()},
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+            }
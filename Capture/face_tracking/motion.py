@@ -0,0 +1,128 @@
+import time
+
+import cv2
+import numpy as np
+
+
+class MotionGate(object):
+    """
+    Cheap scene-change test that runs before detection and tracking.
+
+    Every frame is shrunk to a small grayscale thumbnail and compared with a
+    reference thumbnail. The score is the fraction of thumbnail pixels that
+    changed by more than `pixel_thresh` gray levels. The reference only moves
+    on while the scene is moving, so slow drift still adds up until it counts
+    as motion.
+
+    Hysteresis keeps the state stable: the scene turns moving as soon as the
+    score exceeds `on_thresh`, and only turns static after `hold` frames in a
+    row below `off_thresh`.
+
+    Once no face has been seen for `idle_after_s` seconds, the gate goes idle
+    and `throttle` sleeps the capture loop down to `idle_fps`. Motion ends
+    idling at once.
+    """
+
+    def __init__(
+        self,
+        size=64,
+        pixel_thresh=15,
+        on_thresh=0.01,
+        off_thresh=0.005,
+        hold=5,
+        idle_after_s=10.0,
+        idle_fps=2.0,
+        metrics=None,
+    ):
+        self.size = size
+        self.pixel_thresh = pixel_thresh
+        self.on_thresh = on_thresh
+        self.off_thresh = off_thresh
+        self.hold = hold
+        self.idle_after_s = idle_after_s
+        self.idle_fps = idle_fps
+        self.metrics = metrics
+        self.moving = True
+        self.idle = False
+        self._reference = None
+        self._static_count = 0
+        self._last_face = time.monotonic()
+        self._last_frame = None
+
+    def _thumbnail(self, frame):
+        height, width = frame.shape[:2]
+        scale = self.size / max(height, width)
+        size = (max(1, round(width * scale)), max(1, round(height * scale)))
+        # Shrink first so the color conversion only touches a few thousand pixels
+        thumbnail = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        if thumbnail.ndim == 3:
+            thumbnail = cv2.cvtColor(thumbnail, cv2.COLOR_BGR2GRAY)
+        return thumbnail
+
+    def update(self, frame):
+        """
+        Compare a frame with the reference and update the motion state.
+
+        Args:
+            frame (numpy.ndarray): The BGR frame.
+
+        Returns:
+            bool: True if the scene is moving and the frame has to be processed.
+        """
+        thumbnail = self._thumbnail(frame)
+        if self._reference is None or self._reference.shape != thumbnail.shape:
+            self._reference = thumbnail
+            self.moving = True
+            return True
+
+        changed = cv2.absdiff(thumbnail, self._reference) > self.pixel_thresh
+        score = np.count_nonzero(changed) / changed.size
+
+        if score > self.on_thresh:
+            self.moving = True
+            self._static_count = 0
+        elif score < self.off_thresh:
+            self._static_count += 1
+            if self._static_count >= self.hold:
+                self.moving = False
+        if self.moving:
+            self._reference = thumbnail
+            self.idle = False
+
+        if self.metrics is not None:
+            self.metrics.set("motion_score", round(float(score), 4))
+            self.metrics.set("motion", self.moving)
+            if not self.moving:
+                self.metrics.increment("static_frames")
+        return self.moving
+
+    def observe_faces(self, num_faces):
+        """
+        Report how many faces the tracker currently follows.
+
+        Args:
+            num_faces (int): Number of tracked faces.
+
+        Returns:
+            bool: True if the gate is idle.
+        """
+        now = time.monotonic()
+        if num_faces > 0:
+            self._last_face = now
+            self.idle = False
+        elif not self.moving and now - self._last_face >= self.idle_after_s:
+            self.idle = True
+
+        if self.metrics is not None:
+            self.metrics.set("idle", self.idle)
+        return self.idle
+
+    def throttle(self):
+        """Sleep out the rest of the idle frame period, a no-op while active."""
+        now = time.monotonic()
+        if self.idle and self._last_frame is not None:
+            delay = 1.0 / self.idle_fps - (now - self._last_frame)
+            if delay > 0:
+                time.sleep(delay)
+                now = time.monotonic()
+        self._last_frame = now
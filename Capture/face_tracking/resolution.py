@@ -0,0 +1,136 @@
+from collections import deque
+
+import numpy as np
+
+
+class ResolutionController(object):
+    """
+    Pick the detector input size of each full-frame scan from a small ladder.
+
+    SCRFD's smallest anchors are 16 pixels, so a face much smaller than that
+    in the letterboxed input is missed. The controller picks the smallest
+    rung at which the smallest recently seen face still covers `min_face_px`
+    input pixels. While nothing is tracked, it picks the largest rung that
+    fits the budget so distant faces can be found.
+
+    The choice is capped by the budget. Rung latencies are measured as
+    moving averages, and rungs that were never run are extrapolated from the
+    nearest measured rung by pixel count; the first run of a rung is not
+    counted. Every track takes `track_cost_ms` of the budget for tracking
+    and recognition.
+
+    The controller moves up or drops an over-budget rung at once, but only
+    moves down for smaller faces after wanting a smaller rung for `hold`
+    scans in a row, so it does not flap between two sizes.
+    """
+
+    def __init__(
+        self,
+        ladder=(128, 192, 256, 320),
+        budget_ms=20.0,
+        min_face_px=24,
+        track_cost_ms=1.0,
+        window=30,
+        hold=10,
+        metrics=None,
+    ):
+        self.ladder = sorted(int(size) for size in ladder)
+        self.budget_ms = budget_ms
+        self.min_face_px = min_face_px
+        self.track_cost_ms = track_cost_ms
+        self.hold = hold
+        self.metrics = metrics
+        self.rung = 0
+        self._latency_ms = [None] * len(self.ladder)
+        self._warmed_up = [False] * len(self.ladder)
+        self._face_heights = deque(maxlen=window)
+        self._lower_count = 0
+
+    @property
+    def input_size(self):
+        """The current detector input as (width, height)."""
+        size = self.ladder[self.rung]
+        return (size, size)
+
+    def estimate_ms(self, rung):
+        """
+        Expected detection latency of a rung.
+
+        Args:
+            rung (int): Index into the ladder.
+
+        Returns:
+            float: Latency in milliseconds, None until any rung was measured.
+        """
+        if self._latency_ms[rung] is not None:
+            return self._latency_ms[rung]
+        measured = [i for i, ms in enumerate(self._latency_ms) if ms is not None]
+        if not measured:
+            return None
+        nearest = min(measured, key=lambda i: abs(i - rung))
+        return self._latency_ms[nearest] * (self.ladder[rung] / self.ladder[nearest]) ** 2
+
+    def select(self, frame_shape, num_tracks):
+        """
+        Choose the input size of the next full-frame scan.
+
+        Args:
+            frame_shape (tuple): Shape of the frame, (height, width, ...).
+            num_tracks (int): Number of currently tracked faces.
+
+        Returns:
+            tuple: Detector input as (width, height).
+        """
+        budget_ms = self.budget_ms - self.track_cost_ms * num_tracks
+        affordable = 0
+        for rung in range(len(self.ladder)):
+            estimate = self.estimate_ms(rung)
+            if estimate is None or estimate <= budget_ms:
+                affordable = rung
+            else:
+                break
+
+        if num_tracks == 0 or len(self._face_heights) == 0:
+            wanted = affordable
+        else:
+            # The letterbox scales the long side of the frame to the input size
+            needed = self.min_face_px * max(frame_shape[:2]) / min(self._face_heights)
+            wanted = int(np.searchsorted(self.ladder, needed))
+            wanted = min(wanted, affordable, len(self.ladder) - 1)
+
+        if wanted >= self.rung or self.rung > affordable:
+            self.rung = wanted
+            self._lower_count = 0
+        else:
+            self._lower_count += 1
+            if self._lower_count >= self.hold:
+                self.rung = wanted
+                self._lower_count = 0
+
+        if self.metrics is not None:
+            self.metrics.set("detector_input_size", self.ladder[self.rung])
+        return self.input_size
+
+    def record(self, input_size, elapsed_ms, face_heights, smoothing=0.2):
+        """
+        Report a full-frame scan.
+
+        Args:
+            input_size (tuple): Detector input the scan ran at.
+            elapsed_ms (float): Time spent on detection and tracking.
+            face_heights (iterable): Heights in frame pixels of the detected faces.
+            smoothing (float): Weight of the new latency in the moving average.
+        """
+        rung = self.ladder.index(input_size[0])
+        average = self._latency_ms[rung]
+        if not self._warmed_up[rung]:
+            # The first run at a new size also allocates buffers and anchors
+            self._warmed_up[rung] = True
+        elif average is None:
+            self._latency_ms[rung] = elapsed_ms
+        else:
+            self._latency_ms[rung] = average + smoothing * (elapsed_ms - average)
+
+        face_heights = [height for height in face_heights if height > 0]
+        if face_heights:
+            self._face_heights.append(min(face_heights))
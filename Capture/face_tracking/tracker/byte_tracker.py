@@ -1,7 +1,6 @@
 import os
 import sys
-
-import torch
+from collections import deque
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(BASE_DIR)
@@ -10,153 +9,25 @@ import matching
 import numpy as np
 
 from .basetrack import BaseTrack, TrackState
-from .kalman_filter import KalmanFilter
-
-
-class STrack(BaseTrack):
-    shared_kalman = KalmanFilter()
-
-    def __init__(self, tlwh, score):
-        # wait activate
-        self._tlwh = np.asarray(tlwh, dtype=np.float64)
-        self.kalman_filter = None
-        self.mean, self.covariance = None, None
-        self.is_activated = False
-
-        self.score = score
-        self.tracklet_len = 0
-
-    def predict(self):
-        mean_state = self.mean.copy()
-        if self.state != TrackState.Tracked:
-            mean_state[7] = 0
-        self.mean, self.covariance = self.kalman_filter.predict(
-            mean_state, self.covariance
-        )
-
-    @staticmethod
-    def multi_predict(stracks):
-        if len(stracks) > 0:
-            multi_mean = np.asarray([st.mean.copy() for st in stracks])
-            multi_covariance = np.asarray([st.covariance for st in stracks])
-            for i, st in enumerate(stracks):
-                if st.state != TrackState.Tracked:
-                    multi_mean[i][7] = 0
-            multi_mean, multi_covariance = STrack.shared_kalman.multi_predict(
-                multi_mean, multi_covariance
-            )
-            for i, (mean, cov) in enumerate(zip(multi_mean, multi_covariance)):
-                stracks[i].mean = mean
-                stracks[i].covariance = cov
-
-    def activate(self, kalman_filter, frame_id):
-        """Start a new tracklet"""
-        self.kalman_filter = kalman_filter
-        self.track_id = self.next_id()
-        self.mean, self.covariance = self.kalman_filter.initiate(
-            self.tlwh_to_xyah(self._tlwh)
-        )
-
-        self.tracklet_len = 0
-        self.state = TrackState.Tracked
-        if frame_id == 1:
-            self.is_activated = True
-        # self.is_activated = True
-        self.frame_id = frame_id
-        self.start_frame = frame_id
-
-    def re_activate(self, new_track, frame_id, new_id=False):
-        self.mean, self.covariance = self.kalman_filter.update(
-            self.mean, self.covariance, self.tlwh_to_xyah(new_track.tlwh)
-        )
-        self.tracklet_len = 0
-        self.state = TrackState.Tracked
-        self.is_activated = True
-        self.frame_id = frame_id
-        if new_id:
-            self.track_id = self.next_id()
-        self.score = new_track.score
-
-    def update(self, new_track, frame_id):
-        """
-        Update a matched track
-        :type new_track: STrack
-        :type frame_id: int
-        :type update_feature: bool
-        :return:
-        """
-        self.frame_id = frame_id
-        self.tracklet_len += 1
-
-        new_tlwh = new_track.tlwh
-        self.mean, self.covariance = self.kalman_filter.update(
-            self.mean, self.covariance, self.tlwh_to_xyah(new_tlwh)
-        )
-        self.state = TrackState.Tracked
-        self.is_activated = True
-
-        self.score = new_track.score
-
-    @property
-    # @jit(nopython=True)
-    def tlwh(self):
-        """Get current position in bounding box format `(top left x, top left y,
-        width, height)`.
-        """
-        if self.mean is None:
-            return self._tlwh.copy()
-        ret = self.mean[:4].copy()
-        ret[2] *= ret[3]
-        ret[:2] -= ret[2:] / 2
-        return ret
-
-    @property
-    # @jit(nopython=True)
-    def tlbr(self):
-        """Convert bounding box to format `(min x, min y, max x, max y)`, i.e.,
-        `(top left, bottom right)`.
-        """
-        ret = self.tlwh.copy()
-        ret[2:] += ret[:2]
-        return ret
-
-    @staticmethod
-    # @jit(nopython=True)
-    def tlwh_to_xyah(tlwh):
-        """Convert bounding box to format `(center x, center y, aspect ratio,
-        height)`, where the aspect ratio is `width / height`.
-        """
-        ret = np.asarray(tlwh).copy()
-        ret[:2] += ret[2:] / 2
-        ret[2] /= ret[3]
-        return ret
-
-    def to_xyah(self):
-        return self.tlwh_to_xyah(self.tlwh)
-
-    @staticmethod
-    # @jit(nopython=True)
-    def tlbr_to_tlwh(tlbr):
-        ret = np.asarray(tlbr).copy()
-        ret[2:] -= ret[:2]
-        return ret
-
-    @staticmethod
-    # @jit(nopython=True)
-    def tlwh_to_tlbr(tlwh):
-        ret = np.asarray(tlwh).copy()
-        ret[2:] += ret[:2]
-        return ret
-
-    def __repr__(self):
-        return "OT_{}_({}-{})".format(self.track_id, self.start_frame, self.end_frame)
+from .detections import Detections
+from .kalman_filter import KalmanFilter, chi2inv95
+from .track_table import (
+    TrackTable,
+    tlbr_to_tlwh,
+    tlwh_to_tlbr,
+    tlwh_to_xyah,
+    xyah_to_tlwh,
+)
 
 
 class BYTETracker(object):
     def __init__(self, args, frame_rate=30):
-        self.tracked_stracks = []  # type: list[STrack]
-        self.lost_stracks = []  # type: list[STrack]
-        self.removed_stracks = []  # type: list[STrack]
+        # Tracked and lost tracks live in one table, see `tracked_stracks`
+        self.tracks = TrackTable()
+        # Only the most recently removed tracks are kept, the service runs for days
+        self.removed_stracks = deque(
+            maxlen=args.get("removed_track_retention", 100)
+        )  # type: deque[TrackView]
 
         self.frame_id = 0
         self.args = args
@@ -166,193 +37,244 @@ class BYTETracker(object):
         self.max_time_lost = self.buffer_size
         self.kalman_filter = KalmanFilter()
 
+    @property
+    def tracked_stracks(self):
+        """Views of the tracked tracks, confirmed or not."""
+        return [self.tracks.views[row] for row in self.tracks.rows(TrackState.Tracked)]
+
+    @property
+    def lost_stracks(self):
+        """Views of the lost tracks that may still be re-found."""
+        return [self.tracks.views[row] for row in self.tracks.rows(TrackState.Lost)]
+
     def update(self, output_results, img_info, img_size):
+        """
+        Associate one frame's detections with the tracks.
+
+        Args:
+            output_results (Detections): The detections. An (N, 5) array of
+                x1, y1, x2, y2, score, or (N, 6) with a class score, also works.
+            img_info (list): The frame as [height, width].
+            img_size (tuple): The detector input as (height, width).
+
+        Returns:
+            list: Views of the confirmed tracked tracks.
+        """
         self.frame_id += 1
-        activated_starcks = []
-        refind_stracks = []
-        lost_stracks = []
-        removed_stracks = []
+        tracks = self.tracks
 
-        if output_results.shape[1] == 5:
-            scores = output_results[:, 4]
-            bboxes = output_results[:, :4]
+        if isinstance(output_results, Detections):
+            scores = output_results.scores
+            bboxes = output_results.boxes
         else:
-            output_results = output_results.cpu().numpy()
-            scores = output_results[:, 4] * output_results[:, 5]
-            bboxes = output_results[:, :4]  # x1y1x2y2
+            scores, bboxes = self._split(output_results)
         img_h, img_w = img_info[0], img_info[1]
         scale = min(img_size[0] / float(img_h), img_size[1] / float(img_w))
-        bboxes /= scale
+        bboxes = bboxes / scale
 
         remain_inds = scores > self.args["track_thresh"]
         inds_low = scores > 0.1
         inds_high = scores < self.args["track_thresh"]
 
         inds_second = np.logical_and(inds_low, inds_high)
-        dets_second = bboxes[inds_second.to(torch.bool)]
-        dets = bboxes[remain_inds]
+        """Detections"""
+        dets = tlbr_to_tlwh(bboxes[remain_inds])
         scores_keep = scores[remain_inds]
-        scores_second = scores[inds_second.to(torch.bool)]
-
-        if len(dets) > 0:
-            """Detections"""
-            detections = [
-                STrack(STrack.tlbr_to_tlwh(tlbr), s)
-                for (tlbr, s) in zip(dets, scores_keep)
-            ]
-        else:
-            detections = []
+        dets_second = tlbr_to_tlwh(bboxes[inds_second])
+        scores_second = scores[inds_second]
 
         """ Add newly detected tracklets to tracked_stracks"""
-        unconfirmed = []
-        tracked_stracks = []  # type: list[STrack]
-        for track in self.tracked_stracks:
-            if not track.is_activated:
-                unconfirmed.append(track)
-            else:
-                tracked_stracks.append(track)
+        unconfirmed = tracks.rows(TrackState.Tracked, activated=False)
+        tracked_stracks = tracks.rows(TrackState.Tracked, activated=True)
+        lost_stracks = tracks.rows(TrackState.Lost)
 
         """ Step 2: First association, with high score detection boxes"""
-        strack_pool = joint_stracks(tracked_stracks, self.lost_stracks)
+        strack_pool = np.concatenate([tracked_stracks, lost_stracks])
         # Predict the current location with KF
-        STrack.multi_predict(strack_pool)
-        dists = matching.iou_distance(strack_pool, detections)
-        # if not self.args.mot20:
-        #     dists = matching.fuse_score(dists, detections)
+        tracks.predict(strack_pool, self.kalman_filter)
+        dists = self._distance(strack_pool, dets)
         matches, u_track, u_detection = matching.linear_assignment(
             dists, thresh=self.args["match_thresh"]
         )
-
-        for itracked, idet in matches:
-            track = strack_pool[itracked]
-            det = detections[idet]
-            if track.state == TrackState.Tracked:
-                track.update(detections[idet], self.frame_id)
-                activated_starcks.append(track)
-            else:
-                track.re_activate(det, self.frame_id, new_id=False)
-                refind_stracks.append(track)
+        matches = np.asarray(matches, dtype=np.int64).reshape(-1, 2)
+        refind_stracks = strack_pool[matches[:, 0]]
+        refind_stracks = refind_stracks[tracks.state[refind_stracks] == TrackState.Lost]
+        # One Kalman correction for every match of the stage
+        tracks.correct(
+            strack_pool[matches[:, 0]],
+            dets[matches[:, 1]],
+            scores_keep[matches[:, 1]],
+            self.frame_id,
+            self.kalman_filter,
+        )
 
         """ Step 3: Second association, with low score detection boxes"""
         # association the untrack to the low score detections
-        if len(dets_second) > 0:
-            """Detections"""
-            detections_second = [
-                STrack(STrack.tlbr_to_tlwh(tlbr), s)
-                for (tlbr, s) in zip(dets_second, scores_second)
-            ]
-        else:
-            detections_second = []
-        r_tracked_stracks = [
-            strack_pool[i]
-            for i in u_track
-            if strack_pool[i].state == TrackState.Tracked
+        r_tracked_stracks = strack_pool[np.asarray(u_track, dtype=np.int64)]
+        r_tracked_stracks = r_tracked_stracks[
+            tracks.state[r_tracked_stracks] == TrackState.Tracked
         ]
-        dists = matching.iou_distance(r_tracked_stracks, detections_second)
+        dists = self._distance(r_tracked_stracks, dets_second)
         matches, u_track, u_detection_second = matching.linear_assignment(
             dists, thresh=0.5
         )
-        for itracked, idet in matches:
-            track = r_tracked_stracks[itracked]
-            det = detections_second[idet]
-            if track.state == TrackState.Tracked:
-                track.update(det, self.frame_id)
-                activated_starcks.append(track)
-            else:
-                track.re_activate(det, self.frame_id, new_id=False)
-                refind_stracks.append(track)
-
-        for it in u_track:
-            track = r_tracked_stracks[it]
-            if not track.state == TrackState.Lost:
-                track.mark_lost()
-                lost_stracks.append(track)
+        matches = np.asarray(matches, dtype=np.int64).reshape(-1, 2)
+        tracks.correct(
+            r_tracked_stracks[matches[:, 0]],
+            dets_second[matches[:, 1]],
+            scores_second[matches[:, 1]],
+            self.frame_id,
+            self.kalman_filter,
+        )
+        lost = r_tracked_stracks[np.asarray(u_track, dtype=np.int64)]
+        tracks.state[lost] = TrackState.Lost
+        tracks.touch(lost)
 
         """Deal with unconfirmed tracks, usually tracks with only one beginning frame"""
-        detections = [detections[i] for i in u_detection]
-        dists = matching.iou_distance(unconfirmed, detections)
-        # if not self.args.mot20:
-        #     dists = matching.fuse_score(dists, detections)
+        u_detection = np.asarray(u_detection, dtype=np.int64)
+        dets = dets[u_detection]
+        scores_keep = scores_keep[u_detection]
+        dists = self._distance(unconfirmed, dets)
         matches, u_unconfirmed, u_detection = matching.linear_assignment(
             dists, thresh=0.7
         )
-        for itracked, idet in matches:
-            unconfirmed[itracked].update(detections[idet], self.frame_id)
-            activated_starcks.append(unconfirmed[itracked])
-        for it in u_unconfirmed:
-            track = unconfirmed[it]
-            track.mark_removed()
-            removed_stracks.append(track)
+        matches = np.asarray(matches, dtype=np.int64).reshape(-1, 2)
+        tracks.correct(
+            unconfirmed[matches[:, 0]],
+            dets[matches[:, 1]],
+            scores_keep[matches[:, 1]],
+            self.frame_id,
+            self.kalman_filter,
+        )
+        self.removed_stracks.extend(
+            tracks.remove(unconfirmed[np.asarray(u_unconfirmed, dtype=np.int64)])
+        )
 
         """ Step 4: Init new stracks"""
-        for inew in u_detection:
-            track = detections[inew]
-            if track.score < self.det_thresh:
-                continue
-            track.activate(self.kalman_filter, self.frame_id)
-            activated_starcks.append(track)
+        u_detection = np.asarray(u_detection, dtype=np.int64)
+        u_detection = u_detection[scores_keep[u_detection] >= self.det_thresh]
+        if len(u_detection) > 0:
+            mean, covariance = self.kalman_filter.multi_initiate(
+                tlwh_to_xyah(dets[u_detection])
+            )
+            tracks.add(
+                mean,
+                covariance,
+                [BaseTrack.next_id() for _ in u_detection],
+                scores_keep[u_detection],
+                self.frame_id,
+                activated=self.frame_id == 1,
+            )
+        # Re-found tracks rejoin the tracked ones after the new tracks
+        tracks.touch(refind_stracks)
+
         """ Step 5: Update state"""
-        for track in self.lost_stracks:
-            if self.frame_id - track.end_frame > self.max_time_lost:
-                track.mark_removed()
-                removed_stracks.append(track)
+        # Tracks lost before this frame and not re-found in it. Expired tracks
+        # are dropped right away; the original list bookkeeping kept them in
+        # `lost_stracks` one frame longer, where they could still be re-found.
+        lost_stracks = lost_stracks[tracks.state[lost_stracks] == TrackState.Lost]
+        expired = self.frame_id - tracks.frame_id[lost_stracks] > self.max_time_lost
+        self.removed_stracks.extend(tracks.remove(lost_stracks[expired]))
 
-        # print('Ramained match {} s'.format(t4-t3))
+        self._remove_duplicates()
 
-        self.tracked_stracks = [
-            t for t in self.tracked_stracks if t.state == TrackState.Tracked
-        ]
-        self.tracked_stracks = joint_stracks(self.tracked_stracks, activated_starcks)
-        self.tracked_stracks = joint_stracks(self.tracked_stracks, refind_stracks)
-        self.lost_stracks = sub_stracks(self.lost_stracks, self.tracked_stracks)
-        self.lost_stracks.extend(lost_stracks)
-        self.lost_stracks = sub_stracks(self.lost_stracks, self.removed_stracks)
-        self.removed_stracks.extend(removed_stracks)
-        self.tracked_stracks, self.lost_stracks = remove_duplicate_stracks(
-            self.tracked_stracks, self.lost_stracks
-        )
         # get scores of lost tracks
-        output_stracks = [track for track in self.tracked_stracks if track.is_activated]
+        output_stracks = [
+            tracks.views[row] for row in tracks.rows(TrackState.Tracked, activated=True)
+        ]
 
         return output_stracks
 
-
-def joint_stracks(tlista, tlistb):
-    exists = {}
-    res = []
-    for t in tlista:
-        exists[t.track_id] = 1
-        res.append(t)
-    for t in tlistb:
-        tid = t.track_id
-        if not exists.get(tid, 0):
-            exists[tid] = 1
-            res.append(t)
-    return res
-
-
-def sub_stracks(tlista, tlistb):
-    stracks = {}
-    for t in tlista:
-        stracks[t.track_id] = t
-    for t in tlistb:
-        tid = t.track_id
-        if stracks.get(tid, 0):
-            del stracks[tid]
-    return list(stracks.values())
-
-
-def remove_duplicate_stracks(stracksa, stracksb):
-    pdist = matching.iou_distance(stracksa, stracksb)
-    pairs = np.where(pdist < 0.15)
-    dupa, dupb = list(), list()
-    for p, q in zip(*pairs):
-        timep = stracksa[p].frame_id - stracksa[p].start_frame
-        timeq = stracksb[q].frame_id - stracksb[q].start_frame
-        if timep > timeq:
-            dupb.append(q)
+    @staticmethod
+    def _split(output_results):
+        """Scores and boxes of an (N, 5) or (N, 6) array of detections."""
+        if hasattr(output_results, "cpu"):
+            # A torch tensor, handled without importing torch
+            output_results = output_results.cpu().numpy()
+        output_results = np.asarray(output_results)
+        if output_results.shape[1] == 5:
+            scores = output_results[:, 4]
+            bboxes = output_results[:, :4]
         else:
-            dupa.append(p)
-    resa = [t for i, t in enumerate(stracksa) if not i in dupa]
-    resb = [t for i, t in enumerate(stracksb) if not i in dupb]
-    return resa, resb
+            scores = output_results[:, 4] * output_results[:, 5]
+            bboxes = output_results[:, :4]  # x1y1x2y2
+        return scores, bboxes
+
+    def _distance(self, rows, tlwhs):
+        """IoU cost between track rows and detections, gated with `track_gating`."""
+        dists = matching.iou_distance(self.tracks.tlbr(rows), tlwh_to_tlbr(tlwhs))
+        if not self.args.get("track_gating", False) or dists.size == 0:
+            return dists
+        gating_distance = self.kalman_filter.multi_gating_distance(
+            self.tracks.mean[rows], self.tracks.covariance[rows], tlwh_to_xyah(tlwhs)
+        )
+        # Outside the gate counts as no overlap, the assignment needs finite costs
+        dists[gating_distance > chi2inv95[4]] = 1.0
+        return dists
+
+    def _remove_duplicates(self):
+        """Drop the younger of a tracked and a lost track on the same face."""
+        tracks = self.tracks
+        tracked = tracks.rows(TrackState.Tracked)
+        lost = tracks.rows(TrackState.Lost)
+        if len(tracked) == 0 or len(lost) == 0:
+            return
+        pdist = matching.iou_distance(tracks.tlbr(tracked), tracks.tlbr(lost))
+        p, q = np.where(pdist < 0.15)
+        timep = tracks.frame_id[tracked[p]] - tracks.start_frame[tracked[p]]
+        timeq = tracks.frame_id[lost[q]] - tracks.start_frame[lost[q]]
+        duplicates = np.concatenate([lost[q[timep > timeq]], tracked[p[timep <= timeq]]])
+        # Duplicates vanish without counting as removed tracks
+        tracks.remove(np.unique(duplicates))
+
+    def propagate(self):
+        """
+        Advance one frame without detections.
+
+        Tracked and lost tracks move with the Kalman filter prediction, as at the
+        start of `update`, but nothing is matched, lost or removed. Used between
+        detection keyframes.
+
+        Returns:
+            list: The activated tracked tracks, like `update`.
+        """
+        self.frame_id += 1
+        tracks = self.tracks
+        tracks.predict(
+            np.concatenate([tracks.rows(TrackState.Tracked), tracks.rows(TrackState.Lost)]),
+            self.kalman_filter,
+        )
+        return [tracks.views[row] for row in tracks.rows(TrackState.Tracked, activated=True)]
+
+    def predicted_tlbrs(self):
+        """
+        Boxes the tracked tracks are predicted at in the next frame.
+
+        The tracks themselves are not changed, `update` or `propagate` still
+        applies the prediction.
+
+        Returns:
+            numpy.ndarray: Array of shape (N, 4) as x1, y1, x2, y2.
+        """
+        rows = self.tracks.rows(TrackState.Tracked)
+        if len(rows) == 0:
+            return np.empty((0, 4))
+
+        multi_mean, _ = self.kalman_filter.multi_predict(
+            self.tracks.mean[rows], self.tracks.covariance[rows]
+        )
+        return tlwh_to_tlbr(xyah_to_tlwh(multi_mean[:, :4]))
+
+    def position_uncertainty(self):
+        """
+        Largest predicted center standard deviation of the tracked tracks.
+
+        Returns:
+            float: The deviation relative to the box height, 0 without tracks.
+        """
+        rows = self.tracks.rows(TrackState.Tracked)
+        if len(rows) == 0:
+            return 0.0
+        covariance = self.tracks.covariance[rows]
+        std = np.sqrt(covariance[:, 0, 0] + covariance[:, 1, 1])
+        return float(np.max(std / np.maximum(self.tracks.mean[rows, 3], 1e-6)))
@@ -0,0 +1,46 @@
+import numpy as np
+
+
+class Detections(object):
+    """
+    Face detections of one frame, as the detector hands them to the tracker.
+
+    `boxes` is a float32 array of shape (N, 4) with x1, y1, x2, y2 and
+    `scores` a float32 array of shape (N,). Full-frame scans give boxes in
+    detector input pixels and ROI scans in frame pixels, which the tracker
+    tells apart by its `img_size` argument.
+    """
+
+    __slots__ = ("boxes", "scores")
+
+    def __init__(self, boxes, scores):
+        self.boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        self.scores = np.asarray(scores, dtype=np.float32).reshape(-1)
+        if len(self.boxes) != len(self.scores):
+            raise ValueError(
+                f"{len(self.boxes)} boxes do not match {len(self.scores)} scores"
+            )
+
+    @classmethod
+    def from_array(cls, det):
+        """
+        Detections from an (N, 5) array of x1, y1, x2, y2, score.
+
+        Args:
+            det (numpy.ndarray): The detector output.
+
+        Returns:
+            Detections: Boxes and scores, sharing memory with `det` if it is float32.
+        """
+        det = np.asarray(det, dtype=np.float32).reshape(-1, 5)
+        return cls(det[:, :4], det[:, 4])
+
+    def __len__(self):
+        return len(self.scores)
+
+    def to_array(self):
+        """The detections as an (N, 5) float32 array of x1, y1, x2, y2, score."""
+        return np.hstack((self.boxes, self.scores[:, None]))
+
+    def __repr__(self):
+        return "Detections({})".format(len(self))
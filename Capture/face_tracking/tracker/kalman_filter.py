@@ -86,6 +86,43 @@ class KalmanFilter(object):
         covariance = np.diag(np.square(std))
         return mean, covariance
 
+    def multi_initiate(self, measurement):
+        """Create tracks from unassociated measurements (Vectorized version).
+
+        Parameters
+        ----------
+        measurement : ndarray
+            The Nx4 dimensional matrix of bounding boxes (x, y, a, h).
+
+        Returns
+        -------
+        (ndarray, ndarray)
+            Returns the Nx8 mean matrix and Nx8x8 covariance matrices of the
+            new tracks. Unobserved velocities are initialized to 0 mean.
+
+        """
+        mean = np.zeros((len(measurement), 8))
+        mean[:, :4] = measurement
+
+        height = measurement[:, 3]
+        std = np.stack(
+            [
+                2 * self._std_weight_position * height,
+                2 * self._std_weight_position * height,
+                1e-2 * np.ones_like(height),
+                2 * self._std_weight_position * height,
+                10 * self._std_weight_velocity * height,
+                10 * self._std_weight_velocity * height,
+                1e-5 * np.ones_like(height),
+                10 * self._std_weight_velocity * height,
+            ],
+            axis=1,
+        )
+        covariance = np.zeros((len(measurement), 8, 8))
+        diag = np.arange(8)
+        covariance[:, diag, diag] = np.square(std)
+        return mean, covariance
+
     def predict(self, mean, covariance):
         """Run Kalman filter prediction step.
 
@@ -189,10 +226,10 @@ class KalmanFilter(object):
         ]
         sqr = np.square(np.r_[std_pos, std_vel]).T
 
-        motion_cov = []
-        for i in range(len(mean)):
-            motion_cov.append(np.diag(sqr[i]))
-        motion_cov = np.asarray(motion_cov)
+        # Stack of diagonal matrices, written in one go instead of per track
+        motion_cov = np.zeros((len(mean), 8, 8))
+        diag = np.arange(8)
+        motion_cov[:, diag, diag] = sqr
 
         mean = np.dot(mean, self._motion_mat.T)
         left = np.dot(self._motion_mat, covariance).transpose((1, 0, 2))
@@ -200,6 +237,40 @@ class KalmanFilter(object):
 
         return mean, covariance
 
+    def multi_project(self, mean, covariance):
+        """Project state distributions to measurement space (Vectorized version).
+
+        Parameters
+        ----------
+        mean : ndarray
+            The Nx8 dimensional mean matrix of the states.
+        covariance : ndarray
+            The Nx8x8 dimensional covariance matrices of the states.
+
+        Returns
+        -------
+        (ndarray, ndarray)
+            Returns the Nx4 projected means and Nx4x4 covariance matrices of
+            the given state estimates.
+
+        """
+        std = np.stack(
+            [
+                self._std_weight_position * mean[:, 3],
+                self._std_weight_position * mean[:, 3],
+                1e-1 * np.ones_like(mean[:, 3]),
+                self._std_weight_position * mean[:, 3],
+            ],
+            axis=1,
+        )
+
+        # The observation matrix selects the first four state dimensions
+        projected_mean = mean[:, :4].copy()
+        projected_cov = covariance[:, :4, :4].copy()
+        diag = np.arange(4)
+        projected_cov[:, diag, diag] += np.square(std)
+        return projected_mean, projected_cov
+
     def update(self, mean, covariance, measurement):
         """Run Kalman filter correction step.
 
@@ -238,6 +309,78 @@ class KalmanFilter(object):
         )
         return new_mean, new_covariance
 
+    def multi_update(self, mean, covariance, measurement):
+        """Run Kalman filter correction step (Vectorized version).
+
+        Parameters
+        ----------
+        mean : ndarray
+            The Nx8 dimensional mean matrix of the predicted states.
+        covariance : ndarray
+            The Nx8x8 dimensional covariance matrices of the states.
+        measurement : ndarray
+            The Nx4 dimensional matrix of measurements (x, y, a, h), one per
+            state.
+
+        Returns
+        -------
+        (ndarray, ndarray)
+            Returns the measurement-corrected state distributions.
+
+        """
+        projected_mean, projected_cov = self.multi_project(mean, covariance)
+
+        # K = P H^T S^-1, solved as S K^T = (P H^T)^T for all states at once
+        kalman_gain = np.linalg.solve(
+            projected_cov, covariance[:, :, :4].transpose((0, 2, 1))
+        ).transpose((0, 2, 1))
+        innovation = measurement - projected_mean
+
+        new_mean = mean + np.einsum("nij,nj->ni", kalman_gain, innovation)
+        new_covariance = covariance - np.matmul(
+            np.matmul(kalman_gain, projected_cov), kalman_gain.transpose((0, 2, 1))
+        )
+        return new_mean, new_covariance
+
+    def multi_gating_distance(
+        self, mean, covariance, measurements, only_position=False, metric="maha"
+    ):
+        """Compute gating distances between N states and M measurements
+        (Vectorized version of `gating_distance`).
+
+        Parameters
+        ----------
+        mean : ndarray
+            The Nx8 dimensional mean matrix of the states.
+        covariance : ndarray
+            The Nx8x8 dimensional covariance matrices of the states.
+        measurements : ndarray
+            An Mx4 dimensional matrix of M measurements in format (x, y, a, h).
+        only_position : Optional[bool]
+            If True, distance computation is done with respect to the bounding
+            box center position only.
+
+        Returns
+        -------
+        ndarray
+            Returns an NxM matrix, where element (i, j) is the squared distance
+            between state i and `measurements[j]`.
+        """
+        mean, covariance = self.multi_project(mean, covariance)
+        if only_position:
+            mean, covariance = mean[:, :2], covariance[:, :2, :2]
+            measurements = measurements[:, :2]
+
+        d = measurements[None, :, :] - mean[:, None, :]
+        if metric == "gaussian":
+            return np.sum(d * d, axis=2)
+        elif metric == "maha":
+            cholesky_factor = np.linalg.cholesky(covariance)
+            z = np.linalg.solve(cholesky_factor, d.transpose((0, 2, 1)))
+            return np.sum(z * z, axis=1)
+        else:
+            raise ValueError("invalid distance metric")
+
     def gating_distance(
         self, mean, covariance, measurements, only_position=False, metric="maha"
     ):
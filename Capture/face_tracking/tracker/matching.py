@@ -24,8 +24,9 @@ def linear_assignment(cost_matrix, thresh):
     matches = np.array(
         [[r, c] for r, c in zip(row_ind, col_ind) if cost_matrix[r, c] <= thresh]
     )
-    unmatched_a = np.array([i for i in range(cost_matrix.shape[0]) if i not in row_ind])
-    unmatched_b = np.array([i for i in range(cost_matrix.shape[1]) if i not in col_ind])
+    # Set differences instead of `not in` scans, which are quadratic in crowds
+    unmatched_a = np.setdiff1d(np.arange(cost_matrix.shape[0]), row_ind)
+    unmatched_b = np.setdiff1d(np.arange(cost_matrix.shape[1]), col_ind)
 
     return matches, tuple(unmatched_a), tuple(unmatched_b)
 
@@ -66,18 +67,31 @@ def ious(atlbrs, btlbrs):
 
     :rtype ious np.ndarray
     """
-    ious = np.zeros((len(atlbrs), len(btlbrs)), dtype=np.float64)
-    for i, box1 in enumerate(atlbrs):
-        for j, box2 in enumerate(btlbrs):
-            ious[i, j] = bbox_iou(box1, box2)
-    return ious
+    atlbrs = np.asarray(atlbrs, dtype=np.float64).reshape(-1, 4)
+    btlbrs = np.asarray(btlbrs, dtype=np.float64).reshape(-1, 4)
+
+    # Same convention as `bbox_iou`, broadcast over all (N, M) pairs
+    w = np.minimum(atlbrs[:, None, 2], btlbrs[None, :, 2])
+    w -= np.maximum(atlbrs[:, None, 0], btlbrs[None, :, 0])
+    np.maximum(w, 0.0, out=w)
+    h = np.minimum(atlbrs[:, None, 3], btlbrs[None, :, 3])
+    h -= np.maximum(atlbrs[:, None, 1], btlbrs[None, :, 1])
+    np.maximum(h, 0.0, out=h)
+    inter = w
+    inter *= h
+
+    area_a = (atlbrs[:, 2] - atlbrs[:, 0]) * (atlbrs[:, 3] - atlbrs[:, 1])
+    area_b = (btlbrs[:, 2] - btlbrs[:, 0]) * (btlbrs[:, 3] - btlbrs[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+    # Degenerate pairs have no overlap
+    return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
 
 
 def iou_distance(atracks, btracks):
     """
     Compute cost based on IoU
-    :type atracks: list[STrack]
-    :type btracks: list[STrack]
+    :type atracks: list[TrackView]
+    :type btracks: list[TrackView]
 
     :rtype cost_matrix np.ndarray
     """
@@ -99,8 +113,8 @@ def iou_distance(atracks, btracks):
 def v_iou_distance(atracks, btracks):
     """
     Compute cost based on IoU
-    :type atracks: list[STrack]
-    :type btracks: list[STrack]
+    :type atracks: list[TrackView]
+    :type btracks: list[TrackView]
 
     :rtype cost_matrix np.ndarray
     """
@@ -121,7 +135,7 @@ def v_iou_distance(atracks, btracks):
 
 def embedding_distance(tracks, detections, metric="cosine"):
     """
-    :param tracks: list[STrack]
+    :param tracks: list[TrackView]
     :param detections: list[BaseTrack]
     :param metric:
     :return: cost_matrix np.ndarray
@@ -150,11 +164,13 @@ def gate_cost_matrix(kf, cost_matrix, tracks, detections, only_position=False):
     gating_dim = 2 if only_position else 4
     gating_threshold = kalman_filter.chi2inv95[gating_dim]
     measurements = np.asarray([det.to_xyah() for det in detections])
-    for row, track in enumerate(tracks):
-        gating_distance = kf.gating_distance(
-            track.mean, track.covariance, measurements, only_position
-        )
-        cost_matrix[row, gating_distance > gating_threshold] = np.inf
+    gating_distance = kf.multi_gating_distance(
+        np.asarray([track.mean for track in tracks]),
+        np.asarray([track.covariance for track in tracks]),
+        measurements,
+        only_position,
+    )
+    cost_matrix[gating_distance > gating_threshold] = np.inf
     return cost_matrix
 
 
@@ -164,12 +180,15 @@ def fuse_motion(kf, cost_matrix, tracks, detections, only_position=False, lambda
     gating_dim = 2 if only_position else 4
     gating_threshold = kalman_filter.chi2inv95[gating_dim]
     measurements = np.asarray([det.to_xyah() for det in detections])
-    for row, track in enumerate(tracks):
-        gating_distance = kf.gating_distance(
-            track.mean, track.covariance, measurements, only_position, metric="maha"
-        )
-        cost_matrix[row, gating_distance > gating_threshold] = np.inf
-        cost_matrix[row] = lambda_ * cost_matrix[row] + (1 - lambda_) * gating_distance
+    gating_distance = kf.multi_gating_distance(
+        np.asarray([track.mean for track in tracks]),
+        np.asarray([track.covariance for track in tracks]),
+        measurements,
+        only_position,
+        metric="maha",
+    )
+    cost_matrix[gating_distance > gating_threshold] = np.inf
+    cost_matrix = lambda_ * cost_matrix + (1 - lambda_) * gating_distance
     return cost_matrix
 
 
@@ -0,0 +1,313 @@
+import numpy as np
+
+from .basetrack import TrackState
+
+# State of rows that hold no track
+FREE = -1
+
+
+def tlbr_to_tlwh(tlbrs):
+    # Subtract in the input precision, then widen to float64
+    ret = np.array(tlbrs).reshape(-1, 4)
+    ret[:, 2:] -= ret[:, :2]
+    return ret.astype(np.float64)
+
+
+def tlwh_to_tlbr(tlwhs):
+    ret = np.array(tlwhs, dtype=np.float64).reshape(-1, 4)
+    ret[:, 2:] += ret[:, :2]
+    return ret
+
+
+def tlwh_to_xyah(tlwhs):
+    ret = np.array(tlwhs, dtype=np.float64).reshape(-1, 4)
+    ret[:, :2] += ret[:, 2:] / 2
+    ret[:, 2] /= ret[:, 3]
+    return ret
+
+
+def xyah_to_tlwh(xyahs):
+    ret = np.array(xyahs, dtype=np.float64).reshape(-1, 4)
+    ret[:, 2] *= ret[:, 3]
+    ret[:, :2] -= ret[:, 2:] / 2
+    return ret
+
+
+class TrackTable(object):
+    """
+    Struct-of-arrays store of the tracker's live tracks.
+
+    Row i of every array belongs to one track, and `state` holds its
+    `TrackState`, or FREE for an unused row. Removed tracks give their row
+    back for reuse, so the table is as large as the most tracks alive at once,
+    not the session's history. Kalman steps run on index arrays of rows.
+
+    `order` keeps the order of the tracked and lost track lists the tracker
+    used to keep: a track moves to the end when it joins the tracked or the
+    lost tracks, and `rows` returns rows in that order. The Hungarian assignment breaks ties
+    by row order, so this keeps matches the same as before.
+
+    `views[i]` is the `TrackView` of row i. It stays the same object for the
+    track's whole life and is detached with a copy of its last values when
+    the track is removed.
+    """
+
+    def __init__(self, capacity=32):
+        self.mean = np.zeros((capacity, 8))
+        self.covariance = np.zeros((capacity, 8, 8))
+        self.track_id = np.zeros(capacity, dtype=np.int64)
+        self.score = np.zeros(capacity)
+        self.state = np.full(capacity, FREE, dtype=np.int8)
+        self.is_activated = np.zeros(capacity, dtype=bool)
+        self.frame_id = np.zeros(capacity, dtype=np.int64)
+        self.start_frame = np.zeros(capacity, dtype=np.int64)
+        self.tracklet_len = np.zeros(capacity, dtype=np.int64)
+        self.order = np.zeros(capacity, dtype=np.int64)
+        self.views = [None] * capacity
+        self._sequence = 0
+
+    def __len__(self):
+        return int(np.count_nonzero(self.state != FREE))
+
+    @property
+    def capacity(self):
+        return len(self.state)
+
+    def rows(self, state, activated=None):
+        """
+        Rows of the tracks in a state.
+
+        Args:
+            state (int): A `TrackState` value.
+            activated (bool): Only activated or unconfirmed tracks, None for both.
+
+        Returns:
+            numpy.ndarray: Row indices in list order.
+        """
+        mask = self.state == state
+        if activated is not None:
+            mask &= self.is_activated == activated
+        rows = np.flatnonzero(mask)
+        return rows[np.argsort(self.order[rows], kind="stable")]
+
+    def touch(self, rows):
+        """Move rows to the end of their state's list, in the given order."""
+        self.order[rows] = np.arange(self._sequence, self._sequence + len(rows))
+        self._sequence += len(rows)
+
+    def tlwh(self, rows):
+        """Boxes of rows as (N, 4) top left x, top left y, width, height."""
+        return xyah_to_tlwh(self.mean[rows, :4])
+
+    def tlbr(self, rows):
+        """Boxes of rows as (N, 4) x1, y1, x2, y2."""
+        return tlwh_to_tlbr(self.tlwh(rows))
+
+    def _grow(self, capacity):
+        for name in (
+            "mean",
+            "covariance",
+            "track_id",
+            "score",
+            "is_activated",
+            "frame_id",
+            "start_frame",
+            "tracklet_len",
+            "order",
+        ):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[: len(old)] = old
+            setattr(self, name, new)
+        state = np.full(capacity, FREE, dtype=np.int8)
+        state[: len(self.state)] = self.state
+        self.state = state
+        self.views.extend([None] * (capacity - len(self.views)))
+
+    def add(self, mean, covariance, track_ids, scores, frame_id, activated):
+        """
+        Store new tracks in free rows, growing the table if needed.
+
+        Args:
+            mean (numpy.ndarray): Array of shape (N, 8) of Kalman means.
+            covariance (numpy.ndarray): Array of shape (N, 8, 8) of covariances.
+            track_ids (list): IDs of the new tracks.
+            scores (numpy.ndarray): Detection scores.
+            frame_id (int): The current frame ID.
+            activated (bool): Whether the tracks are confirmed right away.
+
+        Returns:
+            numpy.ndarray: Rows of the new tracks.
+        """
+        count = len(mean)
+        free = np.flatnonzero(self.state == FREE)
+        if len(free) < count:
+            start = self.capacity
+            self._grow(max(2 * self.capacity, start + count))
+            free = np.concatenate([free, np.arange(start, self.capacity)])
+        rows = free[:count]
+
+        self.mean[rows] = mean
+        self.covariance[rows] = covariance
+        self.track_id[rows] = track_ids
+        self.score[rows] = scores
+        self.state[rows] = TrackState.Tracked
+        self.is_activated[rows] = activated
+        self.frame_id[rows] = frame_id
+        self.start_frame[rows] = frame_id
+        self.tracklet_len[rows] = 0
+        self.touch(rows)
+        for row in rows:
+            self.views[row] = TrackView(self, row)
+        return rows
+
+    def remove(self, rows, state=TrackState.Removed):
+        """
+        Free rows, detaching their views.
+
+        Args:
+            rows (numpy.ndarray): Rows to free.
+            state (int): State the detached views report.
+
+        Returns:
+            list: The detached `TrackView`s.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        self.state[rows] = state
+        views = []
+        for row in rows:
+            view = self.views[row]
+            view.detach()
+            views.append(view)
+            self.views[row] = None
+        self.state[rows] = FREE
+        return views
+
+    def copy_rows(self, rows):
+        """A new table holding copies of some rows, without views."""
+        table = TrackTable(capacity=len(rows))
+        for name in (
+            "mean",
+            "covariance",
+            "track_id",
+            "score",
+            "state",
+            "is_activated",
+            "frame_id",
+            "start_frame",
+            "tracklet_len",
+            "order",
+        ):
+            setattr(table, name, getattr(self, name)[rows].copy())
+        return table
+
+    def predict(self, rows, kalman_filter):
+        """Kalman prediction of rows, velocities of untracked rows are zeroed."""
+        if len(rows) == 0:
+            return
+        mean = self.mean[rows]
+        mean[self.state[rows] != TrackState.Tracked, 7] = 0
+        self.mean[rows], self.covariance[rows] = kalman_filter.multi_predict(
+            mean, self.covariance[rows]
+        )
+
+    def correct(self, rows, tlwhs, scores, frame_id, kalman_filter):
+        """
+        Kalman correction of matched rows with their detections.
+
+        Tracked rows extend their tracklet, lost rows are re-activated with
+        their old ID.
+
+        Args:
+            rows (numpy.ndarray): The matched rows.
+            tlwhs (numpy.ndarray): Array of shape (N, 4) of the matched detections.
+            scores (numpy.ndarray): Scores of the matched detections.
+            frame_id (int): The current frame ID.
+            kalman_filter (KalmanFilter): The filter.
+        """
+        if len(rows) == 0:
+            return
+        self.mean[rows], self.covariance[rows] = kalman_filter.multi_update(
+            self.mean[rows], self.covariance[rows], tlwh_to_xyah(tlwhs)
+        )
+        tracked = self.state[rows] == TrackState.Tracked
+        self.tracklet_len[rows] = np.where(tracked, self.tracklet_len[rows] + 1, 0)
+        self.state[rows] = TrackState.Tracked
+        self.is_activated[rows] = True
+        self.frame_id[rows] = frame_id
+        self.score[rows] = scores
+
+
+class TrackView(object):
+    """One track of a `TrackTable`, read through attributes like `tlbr` and `score`."""
+
+    __slots__ = ("table", "row")
+
+    def __init__(self, table, row):
+        self.table = table
+        self.row = row
+
+    def detach(self):
+        """Keep the current values after the table row is freed."""
+        self.table = self.table.copy_rows([self.row])
+        self.row = 0
+
+    @property
+    def track_id(self):
+        return int(self.table.track_id[self.row])
+
+    @property
+    def score(self):
+        return float(self.table.score[self.row])
+
+    @property
+    def state(self):
+        return int(self.table.state[self.row])
+
+    @property
+    def is_activated(self):
+        return bool(self.table.is_activated[self.row])
+
+    @property
+    def frame_id(self):
+        return int(self.table.frame_id[self.row])
+
+    @property
+    def start_frame(self):
+        return int(self.table.start_frame[self.row])
+
+    @property
+    def end_frame(self):
+        return self.frame_id
+
+    @property
+    def tracklet_len(self):
+        return int(self.table.tracklet_len[self.row])
+
+    @property
+    def mean(self):
+        return self.table.mean[self.row]
+
+    @property
+    def covariance(self):
+        return self.table.covariance[self.row]
+
+    @property
+    def tlwh(self):
+        """Get current position in bounding box format `(top left x, top left y,
+        width, height)`.
+        """
+        return xyah_to_tlwh(self.mean[:4])[0]
+
+    @property
+    def tlbr(self):
+        """Convert bounding box to format `(min x, min y, max x, max y)`, i.e.,
+        `(top left, bottom right)`.
+        """
+        return tlwh_to_tlbr(self.tlwh)[0]
+
+    def to_xyah(self):
+        return self.mean[:4].copy()
+
+    def __repr__(self):
+        return "OT_{}_({}-{})".format(self.track_id, self.start_frame, self.end_frame)
@@ -5,30 +5,56 @@ import cv2
 import numpy as np
 import torch
 import yaml
-from torchvision import transforms
 
-from face_alignment.alignment import norm_crop
-from face_detection.scrfd.detector import SCRFD
+from face_alignment.alignment import norm_crop_batch
+from face_detection.scrfd.detector import scrfd_from_config
 # from face_detection.yolov5_face.detector import Yolov5Face
-from face_recognition.arcface.model import iresnet_inference
-from face_recognition.arcface.utils import compare_encodings, read_features
+from face_recognition.arcface.gallery_store import GalleryStore
+from face_recognition.arcface.model import iresnet_from_config
+from face_recognition.arcface.preprocess import FacePreprocessor
+from face_recognition.arcface.utils import compare_encodings_batch
 from face_tracking.tracker.byte_tracker import BYTETracker
 from face_tracking.tracker.visualize import plot_tracking
 
+
+def load_config(file_name):
+    """
+    Load a YAML configuration file.
+
+    Args:
+        file_name (str): The path to the YAML configuration file.
+
+    Returns:
+        dict: The loaded configuration as a dictionary.
+    """
+    with open(file_name, "r") as stream:
+        try:
+            return yaml.safe_load(stream)
+        except yaml.YAMLError as exc:
+            print(exc)
+
+
 # Device configuration
 device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
+# Detector and recognizer settings live in the tracking config
+recognize_config = load_config("./face_tracking/config/config_tracking.yaml")
+
 # Face detector (choose one)
-detector = SCRFD(model_file="face_detection/scrfd/weights/scrfd_2.5g_bnkps.onnx")
+detector = scrfd_from_config(recognize_config)
 # detector = Yolov5Face(model_file="face_detection/yolov5_face/weights/yolov5n-face.pt")
 
 # Face recognizer
-recognizer = iresnet_inference(
-    model_name="r100", path="face_recognition/arcface/weights/arcface_r100.pth", device=device
-)
+recognizer = iresnet_from_config(recognize_config, device=device)
 
-# Load precomputed face features and names
-images_names, images_embs = read_features(feature_path="./datasets/face_features/feature")
+# Reusable preprocessing buffers shared by every recognizer backend
+face_preprocessor = FacePreprocessor()
+
+# Memory-map the enrolled face features and names
+gallery_store = GalleryStore.open_or_migrate(
+    "./datasets/face_features/gallery", features_path="./datasets/face_features/feature"
+)
+images_names, images_embs = gallery_store.names, gallery_store.embeddings
 
 # Mapping of face IDs to names
 id_face_mapping = {}
@@ -43,23 +69,6 @@ data_mapping = {
 }
 
 
-def load_config(file_name):
-    """
-    Load a YAML configuration file.
-
-    Args:
-        file_name (str): The path to the YAML configuration file.
-
-    Returns:
-        dict: The loaded configuration as a dictionary.
-    """
-    with open(file_name, "r") as stream:
-        try:
-            return yaml.safe_load(stream)
-        except yaml.YAMLError as exc:
-            print(exc)
-
-
 def process_tracking(frame, detector, tracker, args, frame_id, fps):
     """
     Process tracking for a frame.
@@ -121,57 +130,47 @@ def process_tracking(frame, detector, tracker, args, frame_id, fps):
 
 
 @torch.no_grad()
-def get_feature(face_image):
+def get_features(face_images):
     """
-    Extract features from a face image.
+    Extract features from a batch of face images in a single forward pass.
 
     Args:
-        face_image: The input face image.
+        face_images (list): The input face images.
 
     Returns:
-        numpy.ndarray: The extracted features.
+        numpy.ndarray: The extracted features, one normalized row per face.
     """
-    face_preprocess = transforms.Compose(
-        [
-            transforms.ToTensor(),
-            transforms.Resize((112, 112)),
-            transforms.Normalize(mean=[0.5, 0.5, 0.5], std=[0.5, 0.5, 0.5]),
-        ]
-    )
-
-    # Convert to RGB
-    face_image = cv2.cvtColor(face_image, cv2.COLOR_BGR2RGB)
+    # Convert all faces into one normalized RGB NCHW batch
+    batch = torch.from_numpy(face_preprocessor(face_images)).to(device)
 
-    # Preprocess image (BGR)
-    face_image = face_preprocess(face_image).unsqueeze(0).to(device)
+    # Inference to get all features at once
+    emb_img_faces = recognizer(batch).cpu().numpy()
 
-    # Inference to get feature
-    emb_img_face = recognizer(face_image).cpu().numpy()
-
-    # Convert to array
-    images_emb = emb_img_face / np.linalg.norm(emb_img_face)
+    # Normalize each row
+    images_emb = emb_img_faces / np.linalg.norm(emb_img_faces, axis=1, keepdims=True)
 
     return images_emb
 
 
-def recognition(face_image):
+def recognition_batch(face_images):
     """
-    Recognize a face image.
+    Recognize a batch of face images.
 
     Args:
-        face_image: The input face image.
+        face_images (list): The input face images.
 
     Returns:
-        tuple: A tuple containing the recognition score and name.
+        list: A list of (score, name) tuples, one per face image.
     """
-    # Get feature from face
-    query_emb = get_feature(face_image)
+    if len(face_images) == 0:
+        return []
+
+    # Get features from all faces
+    query_embs = get_features(face_images)
 
-    score, id_min = compare_encodings(query_emb, images_embs)
-    name = images_names[id_min]
-    score = score[0]
+    scores, id_mins = compare_encodings_batch(query_embs, images_embs)
 
-    return score, name
+    return [(score, images_names[id_min]) for score, id_min in zip(scores, id_mins)]
 
 
 def mapping_bbox(box1, box2):
@@ -256,26 +255,39 @@ def recognize():
         tracking_ids = data_mapping["tracking_ids"]
         tracking_bboxes = data_mapping["tracking_bboxes"]
 
+        # Pair each track with its detection
+        matched_ids = []
+        matched_landmarks = []
         for i in range(len(tracking_bboxes)):
             for j in range(len(detection_bboxes)):
                 mapping_score = mapping_bbox(box1=tracking_bboxes[i], box2=detection_bboxes[j])
                 if mapping_score > 0.9:
-                    face_alignment = norm_crop(img=raw_image, landmark=detection_landmarks[j])
-
-                    score, name = recognition(face_image=face_alignment)
-                    if name is not None:
-                        if score < 0.25:
-                            caption = "UN_KNOWN"
-                        else:
-                            caption = f"{name}:{score:.2f}"
-
-                    id_face_mapping[tracking_ids[i]] = caption
+                    matched_landmarks.append(detection_landmarks[j])
+                    matched_ids.append(tracking_ids[i])
 
                     detection_bboxes = np.delete(detection_bboxes, j, axis=0)
                     detection_landmarks = np.delete(detection_landmarks, j, axis=0)
 
                     break
 
+        # Nothing to align before the first frame or when no track matched
+        if matched_landmarks:
+            # Align every matched face with one vectorized transform estimate
+            face_alignments = norm_crop_batch(
+                img=raw_image, landmarks=np.asarray(matched_landmarks)
+            )
+
+            # Identify all matched tracks together
+            results = recognition_batch(face_images=face_alignments)
+            for tracking_id, (score, name) in zip(matched_ids, results):
+                if name is not None:
+                    if score < 0.25:
+                        caption = "UN_KNOWN"
+                    else:
+                        caption = f"{name}:{score:.2f}"
+
+                id_face_mapping[tracking_id] = caption
+
         if tracking_bboxes == []:
             print("Waiting for a person...")
 